@@ -0,0 +1 @@
+# DGAB benchmarks: python -m benchmarks.<name>
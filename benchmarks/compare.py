@@ -0,0 +1,60 @@
+"""Compare two benchmark result files (benchmarks.run output).
+
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json [--threshold 1.2]
+
+Prints new/old time ratio per scenario and stage; exit code 1 when any
+ratio exceeds the threshold (regression).
+"""
+import argparse
+import json
+import sys
+
+
+def scenario_key(scenario):
+    return scenario['generator'], scenario['n_rows'], scenario['n_groups']
+
+
+def compare(old_report, new_report, threshold=1.2, min_seconds=0.005):
+    """Rows (generator, n_rows, n_groups, stage, old, new, ratio); stages faster than
+    min_seconds in both runs are skipped as noise."""
+    old_scenarios = {scenario_key(scenario): scenario for scenario in old_report['scenarios']}
+    rows = []
+    for scenario in new_report['scenarios']:
+        old = old_scenarios.get(scenario_key(scenario))
+        if old is None:
+            continue
+        timings = {'total': (old['total_seconds'], scenario['total_seconds'])}
+        for name, stage in scenario['stages'].items():
+            if name in old['stages']:
+                timings[name] = (old['stages'][name]['seconds'], stage['seconds'])
+        for name, (old_seconds, new_seconds) in timings.items():
+            if max(old_seconds, new_seconds) < min_seconds:
+                continue
+            ratio = new_seconds / old_seconds if old_seconds else float('inf')
+            rows.append(scenario_key(scenario) + (name, old_seconds, new_seconds, ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare dgab benchmark results')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old_report = json.load(f)
+    with open(args.new) as f:
+        new_report = json.load(f)
+
+    print(f"{old_report['environment']['git_commit']} -> {new_report['environment']['git_commit']}")
+    rows = compare(old_report, new_report, args.threshold)
+    for generator, n_rows, n_groups, stage, old_seconds, new_seconds, ratio, regression in rows:
+        flag = '  РЕГРЕССИЯ' if regression else ''
+        print(f"{generator:>10} {n_rows:>11,} {n_groups:>2} {stage:>15}: "
+              f"{old_seconds:8.4f}s -> {new_seconds:8.4f}s  x{ratio:.2f}{flag}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Vectorized synthetic data generators for benchmarks.
+
+All generators take n_rows (1e4 .. 1e8), n_groups (2 .. 10) and a seed and
+return a DataFrame with a categorical 'group' column (int8 codes) and compact
+numeric dtypes. Rows are generated in blocks of GENERATION_BLOCK_ROWS, so the
+peak memory of generation is the result plus one block of temporaries.
+Group g gets effect (1 + lift * g) on the base parameter.
+"""
+import numpy as np
+import pandas as pd
+
+
+GENERATION_BLOCK_ROWS = 10_000_000
+
+
+def group_codes(rng, n_rows, n_groups):
+    """Random group assignment as int8 codes."""
+    return rng.integers(0, n_groups, n_rows, dtype=np.int8)
+
+
+def group_column(codes, n_groups):
+    return pd.Categorical.from_codes(codes, categories=[f'group_{idx}' for idx in range(n_groups)])
+
+
+def fill_blocks(n_rows, dtype, draw):
+    """Preallocate result and fill it block by block with draw(start, stop)."""
+    result = np.empty(n_rows, dtype=dtype)
+    for start in range(0, n_rows, GENERATION_BLOCK_ROWS):
+        stop = min(start + GENERATION_BLOCK_ROWS, n_rows)
+        result[start:stop] = draw(start, stop)
+    return result
+
+
+def make_discrete(n_rows, n_groups=2, seed=0, rate=3.0, lift=0.02):
+    """Counts per user (launches, clicks): Poisson(rate * (1 + lift * group))."""
+    rng = np.random.default_rng(seed)
+    codes = group_codes(rng, int(n_rows), n_groups)
+    rates = rate * (1 + lift * np.arange(n_groups))
+    values = fill_blocks(len(codes), np.int32, lambda start, stop: rng.poisson(rates[codes[start:stop]]))
+    return pd.DataFrame({'group': group_column(codes, n_groups), 'value': values})
+
+
+def make_binary_agg(n_rows, n_groups=2, seed=0, probability=0.1, lift=0.02, max_trials=20):
+    """Aggregated conversions: per row trials ~ U[1, max_trials], successes ~ Binomial(trials, p_group).
+
+    Use with metric_config=BINARY_AGG_CONFIG.
+    """
+    rng = np.random.default_rng(seed)
+    codes = group_codes(rng, int(n_rows), n_groups)
+    probabilities = probability * (1 + lift * np.arange(n_groups))
+    trials = fill_blocks(len(codes), np.int32, lambda start, stop: rng.integers(1, max_trials + 1, stop - start))
+    successes = fill_blocks(len(codes), np.int32,
+                            lambda start, stop: rng.binomial(trials[start:stop], probabilities[codes[start:stop]]))
+    return pd.DataFrame({'group': group_column(codes, n_groups), 'trials': trials, 'successes': successes})
+
+
+def make_continuous(n_rows, n_groups=2, seed=0, mu=3.0, sigma=1.0, lift=0.02):
+    """Heavy-tailed amounts (revenue, latency): lognormal, mean shifted by lift per group."""
+    rng = np.random.default_rng(seed)
+    codes = group_codes(rng, int(n_rows), n_groups)
+    mus = mu + np.log1p(lift * np.arange(n_groups))
+    values = fill_blocks(len(codes), np.float64,
+                         lambda start, stop: rng.lognormal(mus[codes[start:stop]], sigma))
+    return pd.DataFrame({'group': group_column(codes, n_groups), 'value': values})
+
+
+BINARY_AGG_CONFIG = {'trials_col_name': 'trials', 'successes_col_name': 'successes'}
+
+GENERATORS = {
+    'discrete': make_discrete,
+    'binary_agg': make_binary_agg,
+    'continuous': make_continuous,
+}
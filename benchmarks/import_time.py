@@ -0,0 +1,89 @@
+"""Import-time benchmark and headless import check.
+
+Every measurement runs in a fresh interpreter, so module caches of the
+current process do not hide import costs.
+
+    python -m benchmarks.import_time [--repeat 5] [--budget 1.0] [--output import_time.json]
+
+Exit code 1 when median `import dgab` time exceeds the budget or a headless
+analysis imports plotting / notebook modules.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+IMPORT_TIME_BUDGET_S = 1.0
+FORBIDDEN_HEADLESS_MODULES = ['plotly', 'IPython']
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import dgab
+print(time.perf_counter() - start)
+"""
+
+HEADLESS_SNIPPET = """
+import json, sys
+import numpy as np, pandas as pd
+import dgab
+
+df = pd.DataFrame({'group': np.repeat(['A', 'B', 'C'], 200), 'clicks': np.arange(600) % 7})
+result = dgab.analyze(df, 'discrete', 'group', 'clicks', show=False)
+result.html
+binary = pd.DataFrame({'group': ['A', 'B'], 'trials': [1000, 1000], 'successes': [100, 120]})
+dgab.analyze(binary, 'binary_agg', 'group',
+             metric_config={'trials_col_name': 'trials', 'successes_col_name': 'successes'}, show=False).html
+print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))
+"""
+
+
+def run_snippet(snippet):
+    output = subprocess.run([sys.executable, '-c', snippet], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return output.strip().splitlines()[-1]
+
+
+def measure_import_time(repeat=5):
+    """Wall time of `import dgab` in fresh interpreters, seconds."""
+    return [float(run_snippet(IMPORT_SNIPPET)) for _ in range(repeat)]
+
+
+def headless_modules():
+    """Top-level packages imported by a stats-only analyze(show=False) run."""
+    return json.loads(run_snippet(HEADLESS_SNIPPET))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=IMPORT_TIME_BUDGET_S)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    timings = measure_import_time(args.repeat)
+    forbidden = [name for name in FORBIDDEN_HEADLESS_MODULES if name in headless_modules()]
+    report = {
+        'benchmark': 'import_time',
+        'python': sys.version.split()[0],
+        'import_seconds': timings,
+        'import_seconds_median': statistics.median(timings),
+        'budget_seconds': args.budget,
+        'forbidden_headless_imports': forbidden,
+        'passed': statistics.median(timings) <= args.budget and not forbidden
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
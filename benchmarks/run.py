@@ -0,0 +1,195 @@
+"""Time and peak memory of analyze() and its stages on synthetic data.
+
+    python -m benchmarks.run --types discrete binary_agg continuous \
+        --sizes 1e4 1e5 1e6 --groups 2 5 10 --repeat 3 --output results.json
+
+Stages: validation, transformation (per-group statistics), analyze (full
+call with show=False), then the lazily computed parts of the result:
+confints, pairwise_tests, omnibus, comprehensive, plotting, report.
+Time is the minimum over --repeat runs without tracing; peak memory comes
+from one extra run under tracemalloc (allocations above the stage start).
+Results are written as JSON with environment metadata and the git commit;
+compare two files with `python -m benchmarks.compare`.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import dgab
+from dgab.utils.validations import validate_inputs
+from dgab.utils.transformations import aggregate_binary_counts
+from dgab.utils.group_stats import factorize_groups, compute_group_stats
+from .generators import GENERATORS, BINARY_AGG_CONFIG
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+# data_type passed to analyze() for each generator
+ANALYZE_DATA_TYPE = {'discrete': 'discrete', 'binary_agg': 'binary_agg', 'continuous': 'continuous'}
+
+RESULT_STAGES = ['confints', 'pairwise_tests', 'omnibus', 'comprehensive', 'plotting', 'report']
+
+
+def analyze_kwargs(generator_type):
+    data_type = ANALYZE_DATA_TYPE[generator_type]
+    if data_type == 'binary_agg':
+        return {'data_type': data_type, 'group_col': 'group', 'metric_config': BINARY_AGG_CONFIG}
+    return {'data_type': data_type, 'group_col': 'group', 'metric_col': 'value'}
+
+
+def pipeline(dataframe, generator_type, plot=True):
+    """Stage name -> callable, in execution order; later stages use earlier results."""
+    kwargs = analyze_kwargs(generator_type)
+    data_type = kwargs['data_type']
+    state = {}
+
+    def transformation():
+        if data_type == 'binary_agg':
+            return aggregate_binary_counts(dataframe, 'group', BINARY_AGG_CONFIG)
+        codes, groups = factorize_groups(dataframe, 'group')
+        return compute_group_stats(dataframe, 'group', 'value', codes, groups)
+
+    def run_analyze():
+        state['result'] = dgab.analyze(dataframe, show=False, **kwargs)
+
+    stages = [
+        ('validation', lambda: validate_inputs(dataframe, data_type, 'group', kwargs.get('metric_col'),
+                                               'proportion' if data_type == 'binary_agg' else 'mean',
+                                               metric_config=kwargs.get('metric_config'))),
+        ('transformation', transformation),
+        ('analyze', run_analyze),
+        ('confints', lambda: (state['result'].group_stats, state['result'].differences)),
+        ('pairwise_tests', lambda: state['result'].pairwise),
+        ('omnibus', lambda: state['result'].omnibus),
+        ('comprehensive', lambda: state['result'].comprehensive),
+        ('plotting', lambda: state['result'].figure),
+        ('report', lambda: state['result'].html),
+    ]
+    return [(name, func) for name, func in stages if plot or name != 'plotting']
+
+
+def time_stages(dataframe, generator_type, plot=True):
+    timings = {}
+    for name, func in pipeline(dataframe, generator_type, plot):
+        start = time.perf_counter()
+        func()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def trace_stages(dataframe, generator_type, plot=True):
+    """Peak traced allocation per stage, MB above memory in use at stage start."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for name, func in pipeline(dataframe, generator_type, plot):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            func()
+            peaks[name] = (tracemalloc.get_traced_memory()[1] - current) / 2 ** 20
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def run_scenario(generator_type, n_rows, n_groups, repeat=3, seed=0, plot=True, memory=True):
+    start = time.perf_counter()
+    dataframe = GENERATORS[generator_type](n_rows, n_groups, seed=seed)
+    generation_seconds = time.perf_counter() - start
+
+    runs = [time_stages(dataframe, generator_type, plot) for _ in range(repeat)]
+    peaks = trace_stages(dataframe, generator_type, plot) if memory else {}
+
+    stages = {
+        name: {
+            'seconds': min(run[name] for run in runs),
+            'seconds_all': [run[name] for run in runs],
+            'peak_mb': peaks.get(name)
+        }
+        for name in runs[0]
+    }
+    return {
+        'generator': generator_type,
+        'data_type': ANALYZE_DATA_TYPE[generator_type],
+        'n_rows': int(n_rows),
+        'n_groups': int(n_groups),
+        'input_mb': dataframe.memory_usage(deep=True).sum() / 2 ** 20,
+        'generation_seconds': generation_seconds,
+        # analyze() plus everything it computes lazily: the cost of a full report
+        'total_seconds': sum(stages[name]['seconds'] for name in ['analyze'] + RESULT_STAGES if name in stages),
+        'stages': stages
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import scipy
+
+    return {
+        'git_commit': git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='dgab analyze() benchmark')
+    parser.add_argument('--types', nargs='+', default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument('--sizes', nargs='+', default=['1e4', '1e5', '1e6'],
+                        help='rows per scenario, e.g. 1e4 1e6 1e8')
+    parser.add_argument('--groups', nargs='+', type=int, default=[2, 5])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-plot', action='store_true', help='skip the plotting stage')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--output', default=None,
+                        help='JSON file (default: benchmarks/results/<commit>.json)')
+    args = parser.parse_args(argv)
+
+    scenarios = []
+    for generator_type in args.types:
+        for size in args.sizes:
+            for n_groups in args.groups:
+                scenario = run_scenario(generator_type, int(float(size)), n_groups, args.repeat,
+                                        args.seed, not args.no_plot, not args.no_memory)
+                scenarios.append(scenario)
+                print(f"{generator_type:>10} rows={scenario['n_rows']:>11,} groups={n_groups:>2} "
+                      f"total={scenario['total_seconds']:.3f}s "
+                      + ' '.join(f"{name}={stage['seconds']:.3f}s" for name, stage in scenario['stages'].items()),
+                      flush=True)
+
+    report = {'benchmark': 'analyze', 'environment': environment(), 'scenarios': scenarios}
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{report['environment']['git_commit'] or 'local'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Результаты сохранены: {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,17 @@
 # DGAB - A/B Testing Library
 
-from .core import analyze, how
\ No newline at end of file
+from .core import analyze, analyze_incremental, analyze_many, analyze_portfolio, how
+from .utils.routing import build_plan, AnalysisPlan
+from .utils.result import AnalysisResult
+from .utils.profiling import StageProfiler
+from .utils.corrections import adjust_pvalues
+from .utils.export import render_reports, export_results, comparisons_frame, groups_frame
+from .utils.sketches import QuantileSketch
+from .utils.power import sample_size_grid, mde_grid, sample_size_eta
+from .utils.accumulators import (
+    GroupStatsAccumulator,
+    MomentsAccumulator,
+    BinaryCountsAccumulator,
+    FrequencyAccumulator,
+    SketchAccumulator,
+)
@@ -1,50 +1,75 @@
+import dataclasses
 import json
 import os
 import pandas as pd
 import numpy as np
-from scipy import stats
-import statsmodels.stats.api as sms
-from IPython.display import HTML
-from .utils.confints import confint_group_statistic, confint_difference
-from .utils.stat_tests import welch_ttest, anova_test, pairwise_tests_with_correction, chi2_test
-from .utils.visualizations import plot_discrete, plot_binary_agg
-from .utils.reports import generate_html_report, build_comprehensive_table
-from .utils.validations import validate_inputs
-from .utils.transformations import aggregate_to_individual_binary
+from .utils.validations import (
+    validate_rows, validate_many_inputs, validate_group_stats, validate_portfolio_rows, validate_experiment_groups
+)
+from .utils import corrections
+from .utils.transformations import aggregate_binary_counts
+from .utils.group_stats import (
+    MAX_FREQUENCY_SPAN, GroupedData, factorize_groups, compute_group_stats, compute_weighted_group_stats,
+    compute_group_samples, compute_frequency_table, compute_group_stats_many, compute_group_comoments,
+    frequency_weight_col
+)
+from .utils.routing import load_methods_route, get_route, build_plan
+from .utils.result import AnalysisResult
+from .utils.streaming import stream_group_stats
+from .utils.accumulators import GroupStatsAccumulator, accumulator_group_stats
+from .utils.incremental import DEFAULT_STATE_PATH, update_state, save_state
+from .utils.profiling import make_profiler
+from .utils.portfolio import factorize_cells, cell_stats, portfolio_comparisons
+from .utils.cuped import cuped_adjust
+from .utils.sketches import compute_group_sketches
 
 
 # Утилиты для определения конфигурации теста
 
+def display(obj):
+    """IPython display, imported on first use: headless runs never load IPython."""
+    from IPython.display import display as ipython_display
+
+    ipython_display(obj)
+
+
 def count_groups(dataframe, group_col):
     """Count unique groups in the group column."""
     unique_grps_cnt = dataframe[group_col].nunique()
     return unique_grps_cnt
 
 def get_test_config(data_type, unique_grps_cnt, statistic, dependency):
-    json_path = os.path.join(os.path.dirname(__file__), '..', 'methods_route.json')
-    with open(json_path, 'r') as f:
-        methods_route = json.load(f)
-    
-    group_key = "2" if unique_grps_cnt == 2 else "multiple"
-    test_config = methods_route[data_type][group_key][statistic][dependency]
-    
-    return test_config
+    """Read-only test configuration from the cached routing table."""
+    return get_route(data_type, unique_grps_cnt, statistic, dependency).config
 
 
 # EDA-функции
 
 ## EDA-1 Отображение информации о конфигурации теста
-def display_test_info(data_type, unique_grps_cnt, test_config, significance_level, confidence_level, dataframe, group_col, metric_col, statistic, dependency, metric_config=None):
+def display_test_info(data_type, unique_grps_cnt, test_config, significance_level, confidence_level, dataframe, group_col, metric_col, statistic, dependency, metric_config=None, group_names=None):
     data_type_ru = {'discrete': 'дискретные', 'binary_agg': 'бинарные', 'continuous': 'непрерывные'}
-    test_name_ru = {'welch_ttest': 'T-тест Уэлча', 'anova': 'ANOVA', 'chi2': 'Хи-квадрат'}
-    correction_ru = {'bonferroni': 'Бонферрони', None: 'нет'}
+    test_name_ru = {'welch_ttest': 'T-тест Уэлча', 'anova': 'ANOVA', 'chi2': 'Хи-квадрат', 'msprt_test': 'mSPRT (последовательный)', 'bootstrap_test': 'Пуассоновский бутстрап', 'sketch_quantile_test': 'Порядковые статистики (скетч)'}
+    correction_ru = {
+        'bonferroni': 'Бонферрони',
+        'holm': 'Холм',
+        'hochberg': 'Хохберг',
+        'benjamini_hochberg': 'Бенджамини-Хохберг',
+        'benjamini_yekutieli': 'Бенджамини-Иекутиели',
+        None: 'нет'
+    }
     dependency_ru = {'independent': 'независимые', 'dependent': 'зависимые'}
-    statistic_ru = {'mean': 'среднее', 'proportion': 'пропорция'}
+    statistic_ru = {'mean': 'среднее', 'proportion': 'пропорция', 'median': 'медиана', 'p90': '90-й перцентиль', 'p95': '95-й перцентиль'}
     confint_method_ru = {
         't_ci': 'T-распределение',
         'welch_ci': 'Уэлча',
         'wilson_ci': 'Уилсона',
         'newcombe_wilson_ci': 'Ньюкомба-Уилсона',
+        'msprt_ci': 'mSPRT (всегда валидный)',
+        'msprt_diff_ci': 'mSPRT (всегда валидный)',
+        'bootstrap_ci': 'бутстрап (перцентильный)',
+        'bootstrap_diff_ci': 'бутстрап (перцентильный)',
+        'sketch_quantile_ci': 'порядковые статистики (скетч)',
+        'sketch_quantile_diff_ci': 'порядковые статистики (скетч, перцентильный)',
         None: 'нет'
     }
     
@@ -63,7 +88,8 @@ def display_test_info(data_type, unique_grps_cnt, test_config, significance_leve
     else:
         print(f"Колонка с метрикой: {metric_col}")
     
-    group_names = sorted(dataframe[group_col].unique())
+    if group_names is None:
+        group_names = sorted(dataframe[group_col].unique())
     print(f"Названия групп: {group_names}")
     
     if unique_grps_cnt == 2:
@@ -85,34 +111,18 @@ def display_test_info(data_type, unique_grps_cnt, test_config, significance_leve
 
 
 
-def run_eda_analysis(
-        dataframe,
-        test_config,
-        group_col,
-        metric_col,
-        unique_grps_cnt,
-        significance_level,
-        confidence_level,
-        data_type,
-        statistic,
-        dependency,
-        metric_config=None
-    ):
-    display_test_info(data_type, unique_grps_cnt, test_config, significance_level, confidence_level, dataframe, group_col, metric_col, statistic, dependency, metric_config)
+def run_eda_analysis(result):
+    """Print test configuration and group statistics, show distribution plot."""
+    plan = result.plan
+    statistic = plan.statistic
+    display_test_info(plan.data_type, result.unique_grps_cnt, result.route.config, plan.significance_level, plan.confidence_level, result.dataframe, plan.group_col, plan.metric_col, statistic, plan.dependency, plan.metric_config, group_names=list(result.sufficient_stats.index))
     print()
     
-    confint_method = test_config['confint_method']['statistic_value']
-    confint_params = test_config['confint_params']['statistic_value']
-    
-    group_stats_df = confint_group_statistic(
-        dataframe, group_col, metric_col, data_type, statistic,
-        confint_method, confint_params, significance_level, confidence_level
-    )
-    group_stats_df = group_stats_df.sort_values(statistic, ascending=False)
+    group_stats_df = result.group_stats.sort_values(statistic, ascending=False)
 
     # Reorder columns for binary_agg to show: group, trials, successes, proportion, ci
-    if data_type == 'binary_agg':
-        confidence_level_int = int(confidence_level * 100)
+    if plan.data_type == 'binary_agg':
+        confidence_level_int = int(plan.confidence_level * 100)
         ci_col = f'ci_{confidence_level_int}'
         column_order = ['group', 'trials', 'successes', statistic, ci_col]
         group_stats_df = group_stats_df[column_order]
@@ -121,10 +131,10 @@ def run_eda_analysis(
     display(group_stats_df)
     print()
     
-    viz_function = globals()[test_config['visualization_function']]
-    fig = viz_function(dataframe, group_col, metric_col)
-    fig.show()
-    print()
+    fig = result.figure
+    if fig is not None:
+        fig.show()
+        print()
     
     return fig
 
@@ -133,81 +143,47 @@ def run_eda_analysis(
 
 # Стат-тест функции
 
-def run_statistical_test(
-        dataframe,
-        test_config,
-        group_col,
-        metric_col,
-        unique_grps_cnt,
-        significance_level,
-        confidence_level,
-        data_type,
-        statistic
-    ):
-    """Route to appropriate statistical test based on test_config."""
+def run_statistical_test(result):
+    """Print omnibus, pairwise and summary test results."""
     print("Результаты статистических тестов:")
     print()
     
-    groups = sorted(dataframe[group_col].unique())
-    
-    omnibus_result = None
-    omnibus_test = test_config['omnibus_test']
-    if omnibus_test:
-        omnibus_func = globals()[f"{omnibus_test}_test"]
-        omnibus_result = omnibus_func(dataframe, group_col, metric_col, significance_level)
-        omnibus_result['test_name'] = omnibus_test
-        
-        print(f"Общий тест: {omnibus_test}")
+    omnibus_result = result.omnibus
+    if omnibus_result:
+        print(f"Общий тест: {omnibus_result['test_name']}")
         print(f"Статистика: {omnibus_result['statistic']:.4f}")
         print(f"P-value: {omnibus_result['pvalue']:.6f}")
         print(f"Значимый: {'Да' if omnibus_result['significant'] else 'Нет'}")
         print()
     
-    test_func = globals()[test_config['test_name']]
-    correction_method = test_config['multiple_comparison_correction']
-    
-    group_stats_df = confint_group_statistic(
-        dataframe, group_col, metric_col, data_type, statistic,
-        test_config['confint_method']['statistic_value'],
-        test_config['confint_params']['statistic_value'],
-        significance_level, confidence_level
-    )
-    
-    diff_df = confint_difference(
-        dataframe, group_col, metric_col, data_type, statistic,
-        test_config['confint_method']['difference'],
-        test_config['confint_params']['difference'],
-        significance_level, confidence_level
-    )
-    
-    pairwise_df = pairwise_tests_with_correction(
-        dataframe, group_col, metric_col, test_func,
-        correction_method, significance_level
-    )
-    
     print("Попарные сравнения:")
-    display(pairwise_df)
+    display(result.pairwise)
     print()
     
-    comprehensive_results = build_comprehensive_table(group_stats_df, diff_df, pairwise_df, statistic, significance_level, confidence_level)
+    comprehensive_results = result.comprehensive
     
     print("Сводная таблица результатов:")
-    print(f"Сортировка: significant desc, group1_{statistic} desc, abs_difference asc")
+    print(f"Сортировка: significant desc, group1_{result.plan.statistic} desc, abs_difference asc")
     display(comprehensive_results)
     print()
     
-    return group_stats_df, comprehensive_results, omnibus_result
+    return result.group_stats, comprehensive_results, omnibus_result
+
+
+def display_report(result):
+    """Display HTML report."""
+    from IPython.display import HTML
+
+    display(HTML(result.html))
 
 
 # Функция запуска анализа
 
 def how(data_type=None):
     """Show how to prepare data and use analyze() function for specific data_type."""
-    json_path = os.path.join(os.path.dirname(__file__), '..', 'methods_route.json')
-    with open(json_path, 'r') as f:
-        methods_route = json.load(f)
+    methods_route = load_methods_route()
     
-    implemented_types = ['discrete', 'binary_agg']
+    implemented_types = ['discrete', 'continuous', 'binary_agg']
     available_types = [dt for dt in methods_route.keys() if dt in implemented_types]
     
     if data_type is None:
@@ -259,6 +235,161 @@ def how(data_type=None):
 
 def analyze(
         dataframe,
+        data_type=None,
+        group_col=None,
+        metric_col=None,
+        statistic='mean',
+        dependency='independent',
+        significance_level=0.01,
+        confidence_level=0.99,
+        metric_config=None,
+        plan=None,
+        show=True,
+        chunksize=1_000_000,
+        sequential=False,
+        weight_col=None,
+        frequency=False,
+        profile=False,
+        trusted=False,
+        covariate_col=None
+    ):
+    """Run full A/B test analysis and return AnalysisResult.
+
+    plan: AnalysisPlan from build_plan(); when given, data_type, group_col,
+    metric_col, statistic, dependency, levels and metric_config are taken from it
+    and parameter validation / route resolution are not repeated.
+    show: print tables, show figure and HTML report (notebook mode). With
+    show=False nothing is rendered; result parts are computed on access.
+
+    dataframe may also be a CSV/Parquet path or an iterable of DataFrame chunks:
+    statistics are then accumulated chunk by chunk (chunksize rows per file read)
+    with memory bounded by chunk size. Plots that need raw rows are not built
+    in this mode.
+
+    dataframe may also be an accumulator (MomentsAccumulator, BinaryCountsAccumulator,
+    FrequencyAccumulator, SketchAccumulator), e.g. merged from partitions or restored from a snapshot;
+    data_type, group_col, metric_col and metric_config default to its own.
+
+    statistic 'median'/'p90' (discrete) use a Poisson bootstrap over per-group
+    frequency tables; resampling settings are in the route 'test_params'/'confint_params'.
+    statistic 'median'/'p95' (continuous) run on a mergeable quantile sketch per
+    group (QuantileSketch, bounded memory, also chunk by chunk and in
+    SketchAccumulator); the distribution plot is drawn from the sketches.
+
+    sequential: use always-valid mSPRT tests and confidence sequences, so results
+    may be checked at every data update (continuous monitoring) without peeking bias.
+
+    weight_col (discrete): dataframe is a frequency table, each row stands for
+    weight_col identical observations (e.g. a warehouse export of value counts).
+    frequency (discrete): collapse rows to a (group, value, count) table first,
+    True - always, 'auto' - for integer metrics spanning at most MAX_FREQUENCY_SPAN
+    values. Statistics, tests, intervals and the plot then work on the table
+    (result.dataframe), so cost after the first pass scales with distinct values.
+
+    trusted: data comes from validated tables - only columns and the number of
+    groups are checked, row-level checks (NaN, negative counts, successes <=
+    trials, weights) are skipped. Invalid rows then give wrong results silently.
+
+    covariate_col (mean routes): pre-period value of the metric (or another
+    covariate) per row for CUPED. Covariate moments and the co-moment are
+    accumulated with the metric moments (also chunk by chunk and in accumulators),
+    tests and intervals run on the adjusted metric y - theta * (x - mean(x)).
+    theta and the variance reduction: result.sufficient_stats.attrs.
+
+    profile: record wall time, CPU time and peak memory of every stage
+    (validation, transformation, intervals, tests, figure, report) in
+    result.profile; True or a StageProfiler instance (e.g. with a callback or
+    shared between calls). result.profile.to_frame() / save_chrome_trace(path).
+    """
+    profiler = make_profiler(profile)
+    if isinstance(dataframe, GroupStatsAccumulator):
+        data_type = data_type or dataframe.data_type
+        group_col = group_col or dataframe.group_col
+        metric_col = metric_col or dataframe.metric_col
+        metric_config = metric_config or dataframe.metric_config
+        covariate_col = covariate_col or dataframe.covariate_col
+
+    if plan is None:
+        if data_type is None or group_col is None:
+            raise ValueError("Укажите data_type и group_col или передайте plan, собранный build_plan()")
+        with profiler.stage('build_plan'):
+            plan = build_plan(data_type, group_col, metric_col, statistic, dependency,
+                              significance_level, confidence_level, metric_config, sequential, covariate_col)
+
+    if isinstance(dataframe, GroupStatsAccumulator):
+        with profiler.stage('transformation'):
+            group_stats = accumulator_group_stats(dataframe, plan.sample_required)
+            validate_group_stats(group_stats)
+            if plan.covariate_col is not None:
+                group_stats = cuped_adjust(group_stats)
+        result = AnalysisResult(plan, plan.route(len(group_stats)), group_stats, profiler=profiler)
+        if show:
+            result.show()
+        return result
+
+    if not isinstance(dataframe, pd.DataFrame):
+        with profiler.stage('transformation'):
+            group_stats = stream_group_stats(dataframe, plan.data_type, plan.group_col, plan.metric_col,
+                                             plan.metric_config, chunksize, plan.sample_required,
+                                             plan.covariate_col)
+            if plan.covariate_col is not None:
+                group_stats = cuped_adjust(group_stats)
+        result = AnalysisResult(plan, plan.route(len(group_stats)), group_stats, profiler=profiler)
+        if show:
+            result.show()
+        return result
+
+    # Parameters are validated by build_plan; rows in one pass that also factorizes groups
+    with profiler.stage('validation'):
+        codes, groups = validate_rows(dataframe, plan.data_type, plan.group_col, plan.metric_col,
+                                      plan.metric_config, weight_col, trusted=trusted,
+                                      covariate_col=plan.covariate_col)
+
+    # Per-group sufficient statistics computed once and shared by every stage:
+    # binary_agg stays on counts, other types are reduced in one pass over factorized groups
+    with profiler.stage('transformation'):
+        grouped = None
+        if plan.data_type == 'binary_agg':
+            group_stats = aggregate_binary_counts(dataframe, plan.group_col, plan.metric_config, codes, groups)
+        else:
+            # A frequency table drops the covariate: CUPED stays on rows
+            if weight_col is None and frequency and plan.covariate_col is None:
+                table = compute_frequency_table(dataframe, plan.group_col, plan.metric_col, codes, groups,
+                                                max_span=MAX_FREQUENCY_SPAN if frequency == 'auto' else None)
+                if table is not None:
+                    dataframe, weight_col = table, frequency_weight_col(plan.group_col, plan.metric_col)
+                    codes, groups = factorize_groups(dataframe, plan.group_col)
+
+            if plan.covariate_col is not None:
+                group_stats = cuped_adjust(compute_group_comoments(dataframe, plan.group_col, plan.metric_col,
+                                                                   plan.covariate_col, codes, groups))
+            elif weight_col is None:
+                group_stats = compute_group_stats(dataframe, plan.group_col, plan.metric_col, codes, groups)
+            else:
+                group_stats = compute_weighted_group_stats(dataframe, plan.group_col, plan.metric_col, weight_col,
+                                                           codes, groups)
+                validate_group_stats(group_stats)
+            # Group order for raw-value consumers (samples, plot), sorted on first use and shared
+            grouped = GroupedData(dataframe, plan.group_col, codes, groups)
+
+        route = plan.route(len(group_stats))
+        if route.config.get('sample_required', False) and plan.data_type == 'continuous':
+            group_stats = group_stats.join(compute_group_sketches(dataframe, plan.group_col, plan.metric_col,
+                                                                  grouped=grouped))
+        elif route.config.get('sample_required', False):
+            group_stats = group_stats.join(compute_group_samples(dataframe, plan.group_col, plan.metric_col,
+                                                                 weight_col, grouped=grouped))
+    result = AnalysisResult(plan, route, group_stats, dataframe, weight_col, grouped=grouped, profiler=profiler)
+
+    if show:
+        result.show()
+    return result
+
+
+def analyze_incremental(
+        dataframe,
+        experiment_id,
+        watermark_col,
         data_type,
         group_col,
         metric_col=None,
@@ -266,25 +397,158 @@ def analyze(
         dependency='independent',
         significance_level=0.01,
         confidence_level=0.99,
-        metric_config=None
+        metric_config=None,
+        state_path=DEFAULT_STATE_PATH,
+        show=True,
+        chunksize=1_000_000,
+        sequential=False,
+        profile=False,
+        covariate_col=None
     ):
-    # Set default statistic based on data type BEFORE validation
-    if data_type == 'binary_agg' and statistic == 'mean':
-        statistic = 'proportion'
+    """Analyze a running experiment, folding in only rows added since the previous run.
 
-    validate_inputs(dataframe, data_type, group_col, metric_col, statistic, dependency, significance_level, metric_config)
+    Per-group state and the largest watermark_col value seen (date, timestamp or
+    number) are kept in state_path under experiment_id. Each run reads the state,
+    adds rows with watermark_col greater than the stored value, recomputes tests,
+    intervals and report from the state and saves it back, so daily cost depends
+    on new rows only. dataframe may be the new partition or the full cumulative
+    data, a CSV/Parquet path or an iterable of chunks.
 
-    # Transform binary aggregated data to individual observations
-    if data_type == 'binary_agg':
-        dataframe = aggregate_to_individual_binary(dataframe, group_col, metric_config)
-        metric_col = 'binary_outcome'  # Update metric column to transformed data
+    Plots that need raw rows are not built (only new rows are seen).
+    With sequential=True every run is an always-valid interim look (mSPRT).
+    profile: as in analyze(), plus the update_state and save_state stages.
+    covariate_col: CUPED covariate, its moments are kept in the state (see analyze()).
+    """
+    profiler = make_profiler(profile)
+    plan = build_plan(data_type, group_col, metric_col, statistic, dependency,
+                      significance_level, confidence_level, metric_config, sequential, covariate_col)
 
-    unique_grps_cnt = count_groups(dataframe, group_col)
-    test_config = get_test_config(data_type, unique_grps_cnt, statistic, dependency)
-    
-    fig = run_eda_analysis(dataframe, test_config, group_col, metric_col, unique_grps_cnt, significance_level, confidence_level, data_type, statistic, dependency, metric_config)
-    
-    group_stats_df, comprehensive_results, omnibus_result = run_statistical_test(dataframe, test_config, group_col, metric_col, unique_grps_cnt, significance_level, confidence_level, data_type, statistic)
-    
-    html_report = generate_html_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, unique_grps_cnt, omnibus_result=omnibus_result)
-    display(HTML(html_report))
\ No newline at end of file
+    with profiler.stage('update_state'):
+        accumulator, watermark, new_rows = update_state(
+            dataframe, experiment_id, watermark_col, plan.data_type, plan.group_col,
+            plan.metric_col, plan.metric_config, state_path, chunksize, plan.sample_required,
+            plan.covariate_col
+        )
+    result = analyze(accumulator, plan=plan, show=False, profile=profiler)
+    with profiler.stage('save_state'):
+        save_state(state_path, experiment_id, accumulator, watermark)
+
+    if show:
+        print(f"Эксперимент '{experiment_id}': добавлено строк - {new_rows}, водяной знак - {watermark}")
+        result.show()
+    return result
+
+
+def analyze_many(
+        dataframe,
+        group_col,
+        metrics=None,
+        data_type='discrete',
+        statistic='mean',
+        dependency='independent',
+        significance_level=0.01,
+        confidence_level=0.99,
+        cross_metric_correction='bonferroni',
+        trusted=False
+    ):
+    """Analyze many metric columns of one experiment and return one combined table.
+
+    The frame is validated and the group column factorized once, moments of all
+    metrics are computed in one columnar pass. Each metric gets the routed tests
+    with per-metric correction (corrected_pvalue); cross_metric_pvalue corrects
+    all pairwise p-values of all metrics as one family.
+
+    metrics: list of metric columns; by default all numeric columns except group_col.
+    Only routes on sufficient statistics are supported (mean, proportion);
+    quantile routes need per-group samples, use analyze() per metric.
+    trusted: skip row-level checks (see analyze()).
+    """
+    if metrics is None:
+        metrics = [col for col in dataframe.select_dtypes(include='number').columns if col != group_col]
+
+    codes, groups = validate_many_inputs(dataframe, data_type, group_col, metrics, statistic, dependency,
+                                         significance_level, trusted)
+
+    plan = build_plan(data_type, group_col, None, statistic, dependency,
+                      significance_level, confidence_level)
+    if plan.sample_required:
+        raise ValueError(f"analyze_many() работает по достаточным статистикам: статистика '{statistic}' "
+                         f"не поддерживается, используйте analyze() для каждой метрики")
+
+    stats_by_metric = compute_group_stats_many(dataframe, group_col, metrics, codes, groups)
+    route = plan.route(len(groups))
+
+    tables = []
+    for metric_col in metrics:
+        metric_plan = dataclasses.replace(plan, metric_col=metric_col)
+        result = AnalysisResult(metric_plan, route, stats_by_metric[metric_col], dataframe)
+        table = result.comprehensive.copy()
+        table.insert(0, 'metric', metric_col)
+        tables.append(table)
+
+    combined = pd.concat(tables, ignore_index=True)
+
+    if cross_metric_correction:
+        correction_func = getattr(corrections, f"{cross_metric_correction}_correction")
+        pvalues = combined['pvalue'].to_numpy(dtype=float)
+        cross_metric_pvalues = correction_func(pvalues, len(groups), significance_level, n_comparisons=len(pvalues))
+        combined['cross_metric_pvalue'] = cross_metric_pvalues
+        combined['cross_metric_significant'] = cross_metric_pvalues < significance_level
+
+    return combined
+
+
+def analyze_portfolio(
+        dataframe,
+        experiment_col,
+        group_col,
+        metric_col=None,
+        data_type='discrete',
+        statistic='mean',
+        dependency='independent',
+        significance_level=0.01,
+        confidence_level=0.99,
+        metric_config=None,
+        sequential=False,
+        weight_col=None,
+        segments=None,
+        trusted=False
+    ):
+    """Analyze many experiments stored in one long frame and return one tidy table.
+
+    Rows of all experiments are validated once and (experiment, group) cells
+    are factorized together, so per-cell statistics take one pass over the data.
+    Routed tests, difference intervals and group intervals are then called once
+    with arrays of all pairs of all experiments; the multiple comparison
+    correction is applied within each experiment, omnibus tests (ANOVA, chi2)
+    are computed for all experiments at once. Experiments may have different
+    numbers of groups (2..10): 2-group and multi-group routes are run separately.
+
+    segments: columns to slice by (e.g. ['country', 'platform']); every
+    (experiment, segment values) slice is analyzed as a separate experiment in
+    the same pass. experiment_col may be None to slice one experiment.
+
+    Returns DataFrame in the export schema (dgab.utils.export.COMPARISON_COLUMNS,
+    segment columns after 'experiment'), one row per pair of groups, ordered by
+    experiment and segments.
+    Only routes on sufficient statistics are supported (mean, proportion);
+    quantile routes need per-group samples, use analyze() per experiment.
+    weight_col (discrete): rows are a frequency table. trusted: see analyze().
+    """
+    plan = build_plan(data_type, group_col, metric_col, statistic, dependency,
+                      significance_level, confidence_level, metric_config, sequential)
+    if plan.sample_required:
+        raise ValueError(f"analyze_portfolio() работает по достаточным статистикам: статистика '{statistic}' "
+                         f"не поддерживается, используйте analyze() для каждого эксперимента")
+
+    segments = list(segments or [])
+    key_cols = ([experiment_col] if experiment_col is not None else []) + segments
+    validate_portfolio_rows(dataframe, plan.data_type, key_cols, plan.group_col, plan.metric_col,
+                            plan.metric_config, weight_col, trusted)
+    cell_codes, column_codes, keys, cell_experiment, cell_groups = factorize_cells(dataframe, key_cols,
+                                                                                  plan.group_col)
+    validate_experiment_groups(column_codes, keys, cell_experiment)
+
+    stats = cell_stats(dataframe, plan.data_type, plan.metric_col, plan.metric_config,
+                       cell_codes, len(cell_groups), weight_col)
+    return portfolio_comparisons(plan, stats, keys, experiment_col, cell_experiment, cell_groups, segments)
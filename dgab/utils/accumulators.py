@@ -0,0 +1,275 @@
+import json
+import zlib
+import pandas as pd
+import numpy as np
+from .group_stats import (
+    factorize_groups, compute_group_stats, compute_weighted_group_stats, compute_group_samples,
+    compute_group_comoments, merge_group_stats, frequency_weight_col, COMOMENT_COLUMNS
+)
+from .sketches import QuantileSketch, compute_group_sketches, merge_sketches
+from .transformations import aggregate_binary_counts
+from .validations import validate_chunk
+
+
+SNAPSHOT_VERSION = 1
+
+
+class GroupStatsAccumulator:
+    """Mergeable per-group state that analyze() can run from.
+
+    update(chunk) folds rows in, merge(other) combines partial states computed on
+    other partitions/processes, to_json()/to_bytes() produce a compact snapshot
+    restored with GroupStatsAccumulator.from_json()/from_bytes().
+    covariate_col: also accumulate covariate moments for CUPED (moments only).
+    """
+    kind = None
+    data_type = None
+    covariate_supported = False
+
+    def __init__(self, group_col, metric_col=None, metric_config=None, covariate_col=None):
+        if covariate_col is not None and not self.covariate_supported:
+            raise ValueError(f"{type(self).__name__} не поддерживает covariate_col: используйте MomentsAccumulator")
+        self.group_col = group_col
+        self.metric_col = metric_col
+        self.metric_config = dict(metric_config) if metric_config else None
+        self.covariate_col = covariate_col
+        self.state = None
+
+    def __repr__(self):
+        groups = [] if self.state is None else list(self.group_stats.index)
+        return f"{type(self).__name__}(group_col='{self.group_col}', groups={groups})"
+
+    def update(self, chunk):
+        """Validate chunk and fold it into the state."""
+        if isinstance(chunk, pd.DataFrame) and chunk.empty:
+            return self
+        validate_chunk(chunk, self.data_type, self.group_col, self.metric_col, self.metric_config, self.covariate_col)
+        self.state = self.merge_states(self.state, self.reduce(chunk))
+        return self
+
+    def merge(self, other):
+        """Fold state of another accumulator of the same kind and columns into this one."""
+        if (type(other) is not type(self) or other.group_col != self.group_col
+                or other.metric_col != self.metric_col or other.metric_config != self.metric_config
+                or other.covariate_col != self.covariate_col):
+            raise ValueError(f"Нельзя объединить {other!r} с {self!r}: разные типы или колонки")
+        self.state = self.merge_states(self.state, other.state)
+        return self
+
+    @property
+    def group_stats(self):
+        """Per-group sufficient statistics table (count, sum, m2, min, max)."""
+        if self.state is None:
+            raise ValueError("Аккумулятор пуст - нет данных для анализа")
+        return self.state
+
+    def reduce(self, chunk):
+        raise NotImplementedError
+
+    def merge_states(self, left, right):
+        return merge_group_stats(left, right)
+
+    def state_to_dict(self):
+        state = self.group_stats
+        return {
+            'groups': state.index.tolist(),
+            **{col: state[col].tolist() for col in state.columns}
+        }
+
+    def state_from_dict(self, payload):
+        columns = ['count', 'sum', 'm2', 'min', 'max'] + [col for col in COMOMENT_COLUMNS if col in payload]
+        state = pd.DataFrame({col: payload[col] for col in columns},
+                             index=pd.Index(payload['groups'], name=self.group_col))
+        state['count'] = state['count'].astype(np.int64)
+        return state
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'version': SNAPSHOT_VERSION,
+            'group_col': self.group_col,
+            'metric_col': self.metric_col,
+            'metric_config': self.metric_config,
+            'covariate_col': self.covariate_col,
+            'state': None if self.state is None else self.state_to_dict()
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def to_bytes(self):
+        """zlib-compressed JSON snapshot."""
+        return zlib.compress(self.to_json().encode('utf-8'))
+
+    @classmethod
+    def from_dict(cls, payload):
+        accumulator_cls = ACCUMULATOR_KINDS.get(payload.get('kind'))
+        if accumulator_cls is None:
+            raise ValueError(f"Неизвестный тип снимка: {payload.get('kind')}. Доступные: {list(ACCUMULATOR_KINDS)}")
+        if cls is not GroupStatsAccumulator and accumulator_cls is not cls:
+            raise ValueError(f"Снимок типа '{payload['kind']}' нельзя загрузить как {cls.__name__}")
+        accumulator = accumulator_cls(payload['group_col'], payload['metric_col'], payload['metric_config'],
+                                      payload.get('covariate_col'))
+        if payload['state'] is not None:
+            accumulator.state = accumulator.state_from_dict(payload['state'])
+        return accumulator
+
+    @classmethod
+    def from_json(cls, snapshot):
+        return cls.from_dict(json.loads(snapshot))
+
+    @classmethod
+    def from_bytes(cls, snapshot):
+        return cls.from_json(zlib.decompress(snapshot).decode('utf-8'))
+
+
+class MomentsAccumulator(GroupStatsAccumulator):
+    """Count, sum, m2, min, max per group for mean-based routes (discrete and continuous data).
+
+    With covariate_col also covariate moments and the co-moment (CUPED).
+    """
+    kind = 'moments'
+    data_type = 'discrete'
+    covariate_supported = True
+
+    def reduce(self, chunk):
+        if self.covariate_col is not None:
+            return compute_group_comoments(chunk, self.group_col, self.metric_col, self.covariate_col)
+        return compute_group_stats(chunk, self.group_col, self.metric_col)
+
+
+class BinaryCountsAccumulator(GroupStatsAccumulator):
+    """Trials and successes per group for binary_agg data."""
+    kind = 'binary_counts'
+    data_type = 'binary_agg'
+
+    def __init__(self, group_col, metric_col=None, metric_config=None, covariate_col=None):
+        if not metric_config:
+            raise ValueError("Для типа 'binary_agg' требуется параметр metric_config с 'trials_col_name' и 'successes_col_name'")
+        super().__init__(group_col, metric_col, metric_config, covariate_col)
+
+    def reduce(self, chunk):
+        return aggregate_binary_counts(chunk, self.group_col, self.metric_config)
+
+
+class FrequencyAccumulator(GroupStatsAccumulator):
+    """Frequency table (group, value) -> number of observations for discrete data.
+
+    Size depends on number of distinct values, statistics are exact.
+    """
+    kind = 'frequency'
+    data_type = 'discrete'
+
+    def reduce(self, chunk):
+        return chunk.groupby([self.group_col, self.metric_col]).size()
+
+    def merge_states(self, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        return left.add(right, fill_value=0).astype(np.int64)
+
+    @property
+    def weight_col(self):
+        return frequency_weight_col(self.group_col, self.metric_col)
+
+    @property
+    def frequency_table(self):
+        """DataFrame with columns group_col, metric_col and weight_col (counts)."""
+        if self.state is None:
+            raise ValueError("Аккумулятор пуст - нет данных для анализа")
+        return self.state.rename(self.weight_col).reset_index()
+
+    @property
+    def group_stats(self):
+        return compute_weighted_group_stats(self.frequency_table, self.group_col, self.metric_col, self.weight_col)
+
+    @property
+    def group_samples(self):
+        """Sorted distinct values and counts per group (see compute_group_samples)."""
+        return compute_group_samples(self.frequency_table, self.group_col, self.metric_col, self.weight_col)
+
+    def state_to_dict(self):
+        table = self.frequency_table
+        return {
+            'groups': table[self.group_col].tolist(),
+            'values': table[self.metric_col].tolist(),
+            'counts': table[self.weight_col].tolist()
+        }
+
+    def state_from_dict(self, payload):
+        index = pd.MultiIndex.from_arrays([payload['groups'], payload['values']],
+                                          names=[self.group_col, self.metric_col])
+        return pd.Series(payload['counts'], index=index, dtype=np.int64)
+
+
+class SketchAccumulator(GroupStatsAccumulator):
+    """Moments and a quantile sketch per group for continuous data.
+
+    Size per group is bounded by the sketch compression (see QuantileSketch),
+    not by the number of rows or distinct values; quantile routes and the
+    distribution plot run from the merged sketches.
+    """
+    kind = 'sketch'
+    data_type = 'continuous'
+
+    def reduce(self, chunk):
+        codes, groups = factorize_groups(chunk, self.group_col)
+        state = compute_group_stats(chunk, self.group_col, self.metric_col, codes, groups)
+        state['sketch'] = compute_group_sketches(chunk, self.group_col, self.metric_col, codes, groups)['sketch']
+        return state
+
+    def merge_states(self, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        merged = merge_group_stats(left.drop(columns='sketch'), right.drop(columns='sketch'))
+        merged['sketch'] = [merge_sketches(left_sketch, right_sketch) for left_sketch, right_sketch
+                            in zip(left['sketch'].reindex(merged.index), right['sketch'].reindex(merged.index))]
+        return merged
+
+    def state_to_dict(self):
+        state = self.group_stats
+        return {
+            'groups': state.index.tolist(),
+            **{col: state[col].tolist() for col in state.columns if col != 'sketch'},
+            'sketches': [sketch.to_dict() for sketch in state['sketch']]
+        }
+
+    def state_from_dict(self, payload):
+        state = super().state_from_dict(payload)
+        state['sketch'] = [QuantileSketch.from_dict(sketch) for sketch in payload['sketches']]
+        return state
+
+
+ACCUMULATOR_KINDS = {
+    accumulator_cls.kind: accumulator_cls
+    for accumulator_cls in [MomentsAccumulator, BinaryCountsAccumulator, FrequencyAccumulator, SketchAccumulator]
+}
+
+
+def make_accumulator(data_type, group_col, metric_col=None, metric_config=None, sample_required=False,
+                     covariate_col=None):
+    """Default accumulator for data type: counts for binary_agg, sketches (continuous) or
+    frequency table (discrete) when the route needs per-group samples, moments otherwise."""
+    if data_type == 'binary_agg':
+        return BinaryCountsAccumulator(group_col, metric_col, metric_config, covariate_col)
+    if sample_required and data_type == 'continuous':
+        return SketchAccumulator(group_col, metric_col, metric_config, covariate_col)
+    if sample_required:
+        return FrequencyAccumulator(group_col, metric_col, metric_config, covariate_col)
+    return MomentsAccumulator(group_col, metric_col, metric_config, covariate_col)
+
+
+def accumulator_group_stats(accumulator, sample_required=False):
+    """Statistics table of accumulator, with per-group samples joined when required
+    (sketches of SketchAccumulator are already in the table)."""
+    group_stats = accumulator.group_stats
+    if sample_required and 'sketch' not in group_stats.columns:
+        if not isinstance(accumulator, FrequencyAccumulator):
+            raise ValueError(f"Для выбранной статистики нужны выборки по группам: используйте "
+                             f"FrequencyAccumulator или SketchAccumulator вместо {type(accumulator).__name__}")
+        group_stats = group_stats.join(accumulator.group_samples)
+    return group_stats
@@ -0,0 +1,255 @@
+import numpy as np
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+# Upper bound on resamples per batch: batch layout (and seeds) must not depend on n_jobs
+MAX_BATCH_RESAMPLES = 500
+
+
+def weighted_quantile(values, weights, quantile):
+    """Quantile of a frequency table (sorted distinct values, counts per value).
+
+    Same result as np.quantile (method 'linear') on the expanded data: position
+    h = (N - 1) * q between order statistics floor(h) and floor(h) + 1.
+    values/weights may be 1-D (one sample) or weights 2-D (one resample per row).
+
+    https://numpy.org/doc/stable/reference/generated/numpy.quantile.html
+    """
+    values = np.asarray(values, dtype=float)
+    cumulative = np.cumsum(weights, axis=-1)
+    total = cumulative[..., -1]
+    position = (total - 1) * quantile
+    lower = np.floor(position)
+    fraction = position - lower
+
+    # Order statistic k (0-based) is the first value with cumulative count > k
+    lower_idx = np.sum(cumulative <= lower[..., None], axis=-1)
+    upper_idx = np.sum(cumulative <= (lower + 1)[..., None], axis=-1)
+    last = len(values) - 1
+    lower_value = values[np.minimum(lower_idx, last)]
+    upper_value = values[np.minimum(upper_idx, last)]
+    with np.errstate(invalid='ignore'):
+        result = lower_value + fraction * (upper_value - lower_value)
+    return np.where(total > 0, result, np.nan)[()]
+
+
+def resample_quantile_batch(values, weights, quantile, n_resamples, seed_sequence, block_size=None):
+    """One batch of Poisson bootstrap replicates of a quantile, O(sqrt(n_values)) per replicate.
+
+    Every observation gets weight ~ Poisson(1), so a distinct value seen c times
+    gets Poisson(c). Instead of drawing all weights, values are split into blocks
+    of ~sqrt(n) and only block totals are drawn (sum of Poissons is Poisson);
+    the block holding the needed order statistic is then split with
+    Multinomial(block total, counts / block count), which is the exact
+    conditional distribution. The result is the same in distribution as drawing
+    every weight.
+
+    https://arxiv.org/abs/1602.05822
+    https://numpy.org/doc/stable/reference/random/generated/numpy.random.Generator.multinomial.html
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n_values = len(values)
+    block_size = block_size or max(1, int(np.ceil(np.sqrt(n_values))))
+    n_blocks = -(-n_values // block_size)
+
+    padded = np.zeros(n_blocks * block_size)
+    padded[:n_values] = weights
+    padded = padded.reshape(n_blocks, block_size)
+    block_weights = padded.sum(axis=1)
+    block_probs = padded / block_weights[:, None]
+
+    totals = rng.poisson(block_weights, size=(n_resamples, n_blocks))
+    cumulative = np.cumsum(totals, axis=1)
+    total = cumulative[:, -1]
+    position = (total - 1) * quantile
+    lower = np.floor(position)
+    fraction = position - lower
+    rows = np.arange(n_resamples)
+
+    def locate(rank):
+        # Block holding order statistic `rank` (0-based) and rank inside that block
+        block_idx = np.minimum(np.sum(cumulative <= rank[:, None], axis=1), n_blocks - 1)
+        in_block = totals[rows, block_idx]
+        return block_idx, in_block, rank - (cumulative[rows, block_idx] - in_block)
+
+    def value_at(block_idx, counts, rank):
+        within = np.sum(np.cumsum(counts, axis=1) <= rank[:, None], axis=1)
+        return values[np.minimum(block_idx * block_size + np.minimum(within, block_size - 1), n_values - 1)]
+
+    lower_block, lower_total, lower_rank = locate(lower)
+    upper_block, upper_total, upper_rank = locate(lower + 1)
+    lower_counts = rng.multinomial(lower_total, block_probs[lower_block])
+    # Both order statistics in one block must come from the same split of that block
+    upper_counts = lower_counts.copy()
+    other_block = upper_block != lower_block
+    if other_block.any():
+        upper_counts[other_block] = rng.multinomial(upper_total[other_block], block_probs[upper_block[other_block]])
+
+    lower_value = value_at(lower_block, lower_counts, lower_rank)
+    upper_value = value_at(upper_block, upper_counts, upper_rank)
+    result = lower_value + fraction * (upper_value - lower_value)
+    return np.where(total > 0, result, np.nan)
+
+
+def resample_quantile_batches(values, weights, quantile, batch_sizes, batch_seeds):
+    """Run several batches in order (one process pool task)."""
+    return np.concatenate([resample_quantile_batch(values, weights, quantile, size, batch_seed)
+                           for size, batch_seed in zip(batch_sizes, batch_seeds)])
+
+
+def bootstrap_quantile(values, weights, quantile=0.5, n_resamples=2000, seed=None,
+                       n_jobs=1, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, executor=None):
+    """Poisson bootstrap distribution of a quantile for one group.
+
+    values/weights: sorted distinct values and their counts (see compute_group_samples).
+    Resamples are drawn in batches sized to fit memory_budget_mb; each batch has
+    its own child of SeedSequence(seed), so the result is reproducible and does
+    not depend on n_jobs. With n_jobs > 1 batches are split between worker
+    processes, each worker gets the sample once. executor: process pool to
+    reuse (see ResamplingSession), otherwise one is started for this call.
+
+    https://numpy.org/doc/stable/reference/random/parallel.html
+    https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+    # Block totals, their cumulative sums and two within-block splits, 8 bytes per cell
+    block_size = max(1, int(np.ceil(np.sqrt(len(values)))))
+    bytes_per_resample = (2 * (-(-len(values) // block_size)) + 4 * block_size) * 8 * 2
+    batch_size = int(max(1, min(n_resamples, MAX_BATCH_RESAMPLES,
+                                memory_budget_mb * 2 ** 20 // bytes_per_resample)))
+    batch_sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    batch_seeds = seed_sequence.spawn(len(batch_sizes))
+
+    if n_jobs == 1 or len(batch_sizes) == 1:
+        return resample_quantile_batches(values, weights, quantile, batch_sizes, batch_seeds)
+
+    n_tasks = min(n_jobs, len(batch_sizes))
+    bounds = np.linspace(0, len(batch_sizes), n_tasks + 1).astype(int)
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=n_tasks) as executor:
+            return run_batch_tasks(executor, values, weights, quantile, batch_sizes, batch_seeds, bounds)
+    return run_batch_tasks(executor, values, weights, quantile, batch_sizes, batch_seeds, bounds)
+
+
+def run_batch_tasks(executor, values, weights, quantile, batch_sizes, batch_seeds, bounds):
+    """Submit batch ranges [bounds[i], bounds[i + 1]) to executor and join results in batch order."""
+    tasks = [executor.submit(resample_quantile_batches, values, weights, quantile,
+                             batch_sizes[bounds[i]:bounds[i + 1]], batch_seeds[bounds[i]:bounds[i + 1]])
+             for i in range(len(bounds) - 1)]
+    return np.concatenate([task.result() for task in tasks])
+
+
+def group_samples_of(group_stats):
+    """(values, weights) per group from a statistics row or per-pair arrays of rows."""
+    values = group_stats['values']
+    if isinstance(values, np.ndarray) and values.dtype == object:
+        return list(zip(values, group_stats['weights']))
+    return [(values, group_stats['weights'])]
+
+
+def pair_groups(sources1, sources2):
+    """Distinct groups of per-pair arrays and each pair's positions among them.
+
+    Groups are identified by their sample objects and listed in order of first
+    appearance, which is the sorted group order for group_pairs().
+    Returns (group sources, left positions, right positions).
+    """
+    positions, sources = {}, []
+    left, right = [], []
+    for source1, source2 in zip(sources1, sources2):
+        for source, side in ((source1, left), (source2, right)):
+            key = id(source[0] if isinstance(source, tuple) else source)
+            if key not in positions:
+                positions[key] = len(sources)
+                sources.append(source)
+            side.append(positions[key])
+    return sources, np.array(left, dtype=int), np.array(right, dtype=int)
+
+
+def bootstrap_quantile_difference(group1_stats, group2_stats, quantile=0.5, n_resamples=2000, seed=None,
+                                  n_jobs=1, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, session=None):
+    """Bootstrap replicates of quantile1 - quantile2 for every pair (n_pairs x n_resamples).
+
+    Every group is resampled once with its own child of SeedSequence(seed)
+    (groups in pair_groups() order) and each pair takes the difference of its
+    groups' replicate rows: K groups cost K resamplings, not K*(K-1).
+    session: ResamplingSession keeping group replicates and the process pool
+    between calls, so the test and the interval of a pair see the same replicates.
+    """
+    session = session or ResamplingSession()
+    samples, left, right = pair_groups(group_samples_of(group1_stats), group_samples_of(group2_stats))
+    seeds = np.random.SeedSequence(seed).spawn(len(samples))
+    replicates = []
+    for (values, weights), group_seed in zip(samples, seeds):
+        params = ('bootstrap', quantile, n_resamples, seed_key(group_seed), memory_budget_mb)
+        replicates.append(session.group_replicates(params, values, lambda: bootstrap_quantile(
+            values, weights, quantile, n_resamples, group_seed, n_jobs, memory_budget_mb, session.pool(n_jobs))))
+    replicates = np.array(replicates)
+    return replicates[left] - replicates[right]
+
+
+def seed_key(seed_sequence):
+    """Hashable identity of a SeedSequence child."""
+    return seed_sequence.entropy, seed_sequence.spawn_key
+
+
+def replicate_pvalue(replicates):
+    """Two-sided p-value from replicates of a difference (one pair per row).
+
+    Twice the smaller share of replicates on either side of zero, with +1
+    smoothing so it is never 0. Replicates equal to zero count half on each
+    side (mid-p): discrete quantiles tie at zero often, and counting ties on
+    both sides would push p-values towards 1. Without ties pvalue < alpha
+    exactly when zero is outside the (1 - alpha) percentile interval of the
+    same replicates (up to the smoothing); with ties the interval may end at
+    zero while the test rejects.
+
+    https://en.wikipedia.org/wiki/Mid-p-value
+    """
+    n_resamples = replicates.shape[1]
+    ties = np.sum(replicates == 0, axis=1)
+    below = np.sum(replicates < 0, axis=1) + ties / 2
+    above = np.sum(replicates > 0, axis=1) + ties / 2
+    return np.minimum(1.0, 2 * (np.minimum(below, above) + 1) / (n_resamples + 1))
+
+
+class ResamplingSession:
+    """Resampling state shared by the tests and intervals of one analysis.
+
+    Replicates are kept per group sample and parameters, so every group is
+    resampled once per analysis and the test and the difference interval of
+    a route see the same replicates. Groups are identified by their sample
+    objects ('values' or 'sketch'), which are kept with the replicates. With
+    n_jobs > 1 one process pool is started on first use and reused by every
+    group; it is shut down by close() or when the session is garbage collected.
+    """
+
+    def __init__(self):
+        self.replicates = {}
+        self.executor = None
+
+    def pool(self, n_jobs):
+        """Shared process pool for n_jobs > 1, None for sequential runs."""
+        if n_jobs == 1:
+            return None
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=n_jobs)
+            weakref.finalize(self, self.executor.shutdown, wait=False)
+        return self.executor
+
+    def group_replicates(self, params, source, draw):
+        """draw() for the group sample source once per params, then from memory."""
+        key = (id(source),) + params
+        if key not in self.replicates:
+            self.replicates[key] = source, draw()
+        return self.replicates[key][1]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
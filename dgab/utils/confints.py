@@ -1,149 +1,236 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-import statsmodels.stats.api as sms
+from .group_stats import moments_mean_var, group_pairs
+from .sequential import mixture_variance, msprt_radius
+from .bootstrap import bootstrap_quantile, bootstrap_quantile_difference
+from .sketches import group_quantile, pair_quantiles, group_sketches_of, sketch_quantile_difference
 
 
-def t_ci(data, significance_level=0.01, confidence_level=0.99, **kwargs):
-    """T-distribution confidence interval for mean.
+def t_ci(group_stats, significance_level=0.01, confidence_level=0.99, **kwargs):
+    """T-distribution confidence interval for mean from group sufficient statistics.
 
     https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.t.html
     """
-    mean = np.mean(data)
-    sem = stats.sem(data)
-    df = len(data) - 1
+    from scipy import stats
+
+    mean, var = moments_mean_var(group_stats)
+    count = np.asarray(group_stats['count'], dtype=float)
+    sem = np.sqrt(var / count)
+    df = count - 1
     ci = stats.t.interval(confidence_level, df, loc=mean, scale=sem)
     return ci[0], ci[1]
 
 
-def welch_ci(group1_data, group2_data, significance_level=0.01, confidence_level=0.99, **kwargs):
+def welch_ci(group1_stats, group2_stats, significance_level=0.01, confidence_level=0.99, **kwargs):
     """Welch's confidence interval for difference of means (unequal variances).
 
+    Computed from sufficient statistics with Welch-Satterthwaite degrees of freedom,
+    same as statsmodels CompareMeans.tconfint_diff(usevar='unequal').
+
     https://www.statsmodels.org/dev/generated/statsmodels.stats.weightstats.CompareMeans.html
     https://www.statsmodels.org/dev/generated/statsmodels.stats.weightstats.CompareMeans.tconfint_diff.html#statsmodels.stats.weightstats.CompareMeans.tconfint_diff
     """
-    cm = sms.CompareMeans(sms.DescrStatsW(group1_data), sms.DescrStatsW(group2_data))
+    from scipy import stats
+
+    mean1, var1 = moments_mean_var(group1_stats)
+    mean2, var2 = moments_mean_var(group2_stats)
+    count1 = np.asarray(group1_stats['count'], dtype=float)
+    count2 = np.asarray(group2_stats['count'], dtype=float)
+
+    sem1_sq = var1 / count1
+    sem2_sq = var2 / count2
+    std_diff = np.sqrt(sem1_sq + sem2_sq)
+    df = (sem1_sq + sem2_sq) ** 2 / (sem1_sq ** 2 / (count1 - 1) + sem2_sq ** 2 / (count2 - 1))
+
     alpha = 1 - confidence_level
-    ci = cm.tconfint_diff(alpha=alpha, usevar='unequal')
-    return ci[0], ci[1]
+    t_crit = stats.t.ppf(1 - alpha / 2, df)
+    difference = mean1 - mean2
+    return difference - t_crit * std_diff, difference + t_crit * std_diff
 
 
-def confint_group_statistic(dataframe, group_col, metric_col, data_type, statistic,
+def confint_group_statistic(group_stats, data_type, statistic,
                            confint_method, confint_params, significance_level=0.01, confidence_level=0.99):
-    """Calculate confidence intervals for group statistics."""
-    method_func = globals()[confint_method]
+    """Calculate confidence intervals for group statistics.
+
+    group_stats: per-group sufficient statistics (count, sum, m2) indexed by group.
+    confint_method: interval function or its name in this module.
+    """
+    method_func = confint_method if callable(confint_method) else globals()[confint_method]
     results = []
 
     confidence_level_int = int(confidence_level * 100)
     ci_column_name = f'ci_{confidence_level_int}'
 
-    for group in dataframe[group_col].unique():
-        group_data = dataframe[dataframe[group_col] == group][metric_col]
-
+    for group, row in group_stats.iterrows():
         if statistic == 'mean' or statistic == 'proportion':
-            stat_value = group_data.mean()
+            stat_value = row['sum'] / row['count']
+        else:
+            stat_value = group_quantile(row, confint_params['quantile'])
 
-        ci_lower, ci_upper = method_func(group_data, significance_level=significance_level, confidence_level=confidence_level, **confint_params)
+        ci_lower, ci_upper = method_func(row, significance_level=significance_level, confidence_level=confidence_level, **confint_params)
 
         result = {
             'group': group,
-            'count': len(group_data),
+            'count': int(row['count']),
             statistic: stat_value,
             ci_column_name: [np.around(ci_lower, 4), np.around(ci_upper, 4)]
         }
 
         # For binary_agg, add trials and successes columns
         if data_type == 'binary_agg':
-            trials = len(group_data)
-            successes = int(sum(group_data))
-            result['trials'] = trials
-            result['successes'] = successes
+            result['trials'] = int(row['count'])
+            result['successes'] = int(row['sum'])
 
         results.append(result)
 
     return pd.DataFrame(results)
 
 
-def confint_difference(dataframe, group_col, metric_col, data_type, statistic,
+def confint_difference(group_stats, data_type, statistic,
                       confint_method, confint_params, significance_level=0.01, confidence_level=0.99):
-    """Calculate confidence intervals for differences between groups."""
-    method_func = globals()[confint_method]
-    groups = sorted(dataframe[group_col].unique())
-    results = []
+    """Calculate confidence intervals for differences between groups.
+
+    group_stats: per-group sufficient statistics (count, sum, m2) indexed by group.
+    Intervals for all pairs are computed at once from per-pair statistics arrays.
+    confint_method: interval function or its name in this module.
+    """
+    method_func = confint_method if callable(confint_method) else globals()[confint_method]
+    groups1, groups2, group1_stats, group2_stats = group_pairs(group_stats)
 
     confidence_level_int = int(confidence_level * 100)
     ci_column_name = f'ci_{confidence_level_int}'
-    
-    if len(groups) == 2:
-        group1, group2 = groups
-        group1_data = dataframe[dataframe[group_col] == group1][metric_col]
-        group2_data = dataframe[dataframe[group_col] == group2][metric_col]
-        
-        if statistic == 'mean' or statistic == 'proportion':
-            difference = group2_data.mean() - group1_data.mean()
-        
-        ci_lower, ci_upper = method_func(group1_data, group2_data,
-                                       significance_level=significance_level,
-                                       confidence_level=confidence_level,
-                                       **confint_params)
-        
-        results.append({
-            'group1': group1,
-            'group2': group2,
-            'difference': difference,
-            ci_column_name: [np.around(ci_lower, 4), np.around(ci_upper, 4)]
-        })
-    
+
+    if statistic == 'mean' or statistic == 'proportion':
+        difference = group2_stats['sum'] / group2_stats['count'] - group1_stats['sum'] / group1_stats['count']
     else:
-        for i in range(len(groups)):
-            for j in range(i+1, len(groups)):
-                group1, group2 = groups[i], groups[j]
-                group1_data = dataframe[dataframe[group_col] == group1][metric_col]
-                group2_data = dataframe[dataframe[group_col] == group2][metric_col]
-                
-                if statistic == 'mean' or statistic == 'proportion':
-                    difference = group2_data.mean() - group1_data.mean()
-                
-                ci_lower, ci_upper = method_func(group1_data, group2_data,
-                                               significance_level=significance_level,
-                                               **confint_params)
-                
-                results.append({
-                    'group1': group1,
-                    'group2': group2,
-                    'difference': difference,
-                    ci_column_name: [np.around(ci_lower, 4), np.around(ci_upper, 4)]
-                })
+        quantile = confint_params['quantile']
+        difference = pair_quantiles(group2_stats, quantile) - pair_quantiles(group1_stats, quantile)
 
-    return pd.DataFrame(results)
+    ci_lower, ci_upper = method_func(group1_stats, group2_stats,
+                                   significance_level=significance_level,
+                                   confidence_level=confidence_level,
+                                   **confint_params)
+    ci_lower = np.around(np.broadcast_to(ci_lower, difference.shape), 4)
+    ci_upper = np.around(np.broadcast_to(ci_upper, difference.shape), 4)
+
+    return pd.DataFrame({
+        'group1': groups1,
+        'group2': groups2,
+        'difference': difference,
+        ci_column_name: [[lower, upper] for lower, upper in zip(ci_lower, ci_upper)]
+    })
 
 
-def wilson_ci(data, significance_level=0.01, confidence_level=0.99, **kwargs):
-    """Wilson confidence interval for proportions.
+def wilson_ci(group_stats, significance_level=0.01, confidence_level=0.99, **kwargs):
+    """Wilson confidence interval for proportions from trials (count) and successes (sum).
 
     https://www.statsmodels.org/stable/generated/statsmodels.stats.proportion.proportion_confint.html
     """
     from statsmodels.stats.proportion import proportion_confint
 
-    successes = sum(data)
-    trials = len(data)
+    successes = group_stats['sum']
+    trials = group_stats['count']
     alpha = 1 - confidence_level
 
     ci_lower, ci_upper = proportion_confint(successes, trials, alpha=alpha, method='wilson')
     return ci_lower, ci_upper
 
 
-def newcombe_wilson_ci(group1_data, group2_data, significance_level=0.01, confidence_level=0.99, **kwargs):
-    """Newcombe-Wilson confidence interval for difference between proportions.
+def newcombe_wilson_ci(group1_stats, group2_stats, significance_level=0.01, confidence_level=0.99, **kwargs):
+    """Newcombe-Wilson confidence interval for difference between proportions from counts.
 
     https://www.statsmodels.org/stable/generated/statsmodels.stats.proportion.confint_proportions_2indep.html
     """
     from statsmodels.stats.proportion import confint_proportions_2indep
 
-    count1, nobs1 = sum(group1_data), len(group1_data)
-    count2, nobs2 = sum(group2_data), len(group2_data)
+    count1, nobs1 = group1_stats['sum'], group1_stats['count']
+    count2, nobs2 = group2_stats['sum'], group2_stats['count']
     alpha = 1 - confidence_level
 
     ci_lower, ci_upper = confint_proportions_2indep(count1, nobs1, count2, nobs2,
                                                   method='newcombe', alpha=alpha)
-    return ci_lower, ci_upper
\ No newline at end of file
+    return ci_lower, ci_upper
+
+def msprt_ci(group_stats, significance_level=0.01, confidence_level=0.99, mixing_sd=0.1, **kwargs):
+    """Always-valid confidence sequence for mean (mSPRT inversion, normal mixture).
+
+    Covers the true mean at every look simultaneously with confidence_level.
+
+    https://arxiv.org/abs/1512.04922
+    """
+    mean, var = moments_mean_var(group_stats)
+    variance = var / np.asarray(group_stats['count'], dtype=float)
+    radius = msprt_radius(variance, mixture_variance(var, var, mixing_sd), 1 - confidence_level)
+    return mean - radius, mean + radius
+
+
+def msprt_diff_ci(group1_stats, group2_stats, significance_level=0.01, confidence_level=0.99, mixing_sd=0.1, **kwargs):
+    """Always-valid confidence sequence for difference of means, matching msprt_test.
+
+    https://arxiv.org/abs/1512.04922
+    """
+    mean1, var1 = moments_mean_var(group1_stats)
+    mean2, var2 = moments_mean_var(group2_stats)
+    variance = var1 / np.asarray(group1_stats['count'], dtype=float) + var2 / np.asarray(group2_stats['count'], dtype=float)
+    radius = msprt_radius(variance, mixture_variance(var1, var2, mixing_sd), 1 - confidence_level)
+    difference = mean1 - mean2
+    return difference - radius, difference + radius
+
+
+def bootstrap_ci(group_stats, significance_level=0.01, confidence_level=0.99, quantile=0.5,
+                 n_resamples=2000, seed=42, n_jobs=1, memory_budget_mb=256, session=None, **kwargs):
+    """Percentile Poisson bootstrap confidence interval for a group quantile.
+
+    session: ResamplingSession of the analysis, its process pool is reused for n_jobs > 1.
+
+    https://arxiv.org/abs/1602.05822
+    """
+    replicates = bootstrap_quantile(group_stats['values'], group_stats['weights'], quantile,
+                                    n_resamples, seed, n_jobs, memory_budget_mb,
+                                    session.pool(n_jobs) if session is not None else None)
+    alpha = 1 - confidence_level
+    return np.nanquantile(replicates, alpha / 2), np.nanquantile(replicates, 1 - alpha / 2)
+
+
+def bootstrap_diff_ci(group1_stats, group2_stats, significance_level=0.01, confidence_level=0.99, quantile=0.5,
+                      n_resamples=2000, seed=42, n_jobs=1, memory_budget_mb=256, session=None, **kwargs):
+    """Percentile Poisson bootstrap interval for quantile1 - quantile2, same replicates as bootstrap_test.
+
+    session: ResamplingSession of the analysis; replicates already drawn by
+    bootstrap_test with the same parameters are reused, not resampled.
+
+    https://arxiv.org/abs/1602.05822
+    """
+    replicates = bootstrap_quantile_difference(group1_stats, group2_stats, quantile, n_resamples,
+                                               seed, n_jobs, memory_budget_mb, session)
+    alpha = 1 - confidence_level
+    return np.nanquantile(replicates, alpha / 2, axis=1), np.nanquantile(replicates, 1 - alpha / 2, axis=1)
+
+
+def sketch_quantile_ci(group_stats, significance_level=0.01, confidence_level=0.99, quantile=0.5, **kwargs):
+    """Distribution-free interval for a group quantile from its sketch (continuous data).
+
+    Bounds are the sketch quantiles at the alpha/2 and 1 - alpha/2 levels of
+    the order statistic distribution Beta(k, n + 1 - k), k = (n - 1) * quantile + 1,
+    so no resampling is needed.
+
+    https://en.wikipedia.org/wiki/Order_statistic#Probability_distributions_of_order_statistics
+    """
+    from scipy import stats
+
+    sketch = group_sketches_of(group_stats)[0]
+    count = sketch.count
+    k = (count - 1) * quantile + 1
+    alpha = 1 - confidence_level
+    levels = stats.beta.ppf([alpha / 2, 1 - alpha / 2], k, count + 1 - k)
+    ranks, values = sketch.knots()
+    lower, upper = np.interp(levels * count - 0.5, ranks, values)
+    return lower, upper
+
+
+def sketch_quantile_diff_ci(group1_stats, group2_stats, significance_level=0.01, confidence_level=0.99,
+                            quantile=0.5, n_resamples=2000, seed=42, session=None, **kwargs):
+    """Percentile interval for quantile1 - quantile2 from sketches, same replicates as sketch_quantile_test."""
+    replicates = sketch_quantile_difference(group1_stats, group2_stats, quantile, n_resamples, seed, session)
+    alpha = 1 - confidence_level
+    return np.nanquantile(replicates, alpha / 2, axis=1), np.nanquantile(replicates, 1 - alpha / 2, axis=1)
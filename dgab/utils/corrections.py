@@ -1,13 +1,142 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
 
 
-def bonferroni_correction(p_values, n_groups, significance_level):
+# Methods of adjust_pvalues(); route 'multiple_comparison_correction' names a <method>_correction function
+CORRECTION_METHODS = ['bonferroni', 'holm', 'hochberg', 'benjamini_hochberg', 'benjamini_yekutieli']
+
+
+def family_accumulate(values, codes, n_families, ufunc):
+    """Running ufunc (fmax/fmin) within contiguous families, NaN skipped.
+
+    One family is a single NumPy accumulate; many families use the grouped
+    cumulative max/min of pandas (one Cython pass, exact).
+
+    https://pandas.pydata.org/docs/reference/api/pandas.core.groupby.SeriesGroupBy.cummax.html
+    """
+    if n_families == 1:
+        return ufunc.accumulate(values)
+    grouped = pd.Series(values).groupby(codes, sort=False)
+    return (grouped.cummax() if ufunc is np.fmax else grouped.cummin()).to_numpy()
+
+
+def adjust_pvalues(p_values, method='holm', families=None, n_comparisons=None):
+    """Adjusted p-values for multiple comparisons, each family corrected separately.
+
+    families: family label of every p-value (metric, segment, experiment, ...);
+    None - all p-values are one family. n_comparisons: family size to use
+    instead of the number of p-values in the family. NaN p-values stay NaN and
+    count in the family size.
+    method: 'bonferroni', 'holm' (step-down FWER), 'hochberg' (step-up FWER,
+    independent or positively dependent tests), 'benjamini_hochberg' (FDR),
+    'benjamini_yekutieli' (FDR under any dependence).
+
+    All families are sorted at once (p-values, then a stable sort by family)
+    and step-down/step-up minima are running max/min within families, so
+    there is no Python loop over families or hypotheses.
+
+    https://www.statsmodels.org/stable/generated/statsmodels.stats.multitest.multipletests.html
+    """
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f"Неизвестная коррекция: '{method}'. Доступные: {CORRECTION_METHODS}")
+
+    p_values = np.asarray(p_values, dtype=float).ravel()
+    n = len(p_values)
+    if n == 0:
+        return p_values.copy()
+
+    if families is None:
+        codes, n_families = np.zeros(n, dtype=np.intp), 1
+    else:
+        codes, labels = pd.factorize(np.asarray(families).ravel(), use_na_sentinel=False)
+        n_families = len(labels)
+    sizes = np.bincount(codes, minlength=n_families)
+    family_size = np.full(n_families, n_comparisons, dtype=float) if n_comparisons else sizes.astype(float)
+
+    if method == 'bonferroni':
+        return np.minimum(p_values * family_size[codes], 1.0)
+
+    # Ascending p-values within families (NaN last), families in code order; order of
+    # tied p-values does not matter, they get equal adjusted values
+    order = np.argsort(p_values)
+    if n_families > 1:
+        family_codes = codes[order].astype(np.min_scalar_type(n_families - 1))
+        order = order[np.argsort(family_codes, kind='stable')]
+    sorted_p = p_values[order]
+    sorted_codes = codes[order]
+    rank = np.arange(1, n + 1) - np.r_[0, np.cumsum(sizes)][:-1][sorted_codes]
+    m = family_size[sorted_codes]
+
+    if method == 'holm':
+        adjusted = family_accumulate((m - rank + 1) * sorted_p, sorted_codes, n_families, np.fmax)
+    else:
+        if method == 'hochberg':
+            scaled = (m - rank + 1) * sorted_p
+        else:
+            scaled = m / rank * sorted_p
+            if method == 'benjamini_yekutieli':
+                harmonic = np.cumsum(1.0 / np.arange(1, int(family_size.max()) + 1))
+                scaled = scaled * harmonic[m.astype(np.int64) - 1]
+        # Step-up: running minimum from the largest p-value of every family
+        adjusted = family_accumulate(scaled[::-1], sorted_codes[::-1], n_families, np.fmin)[::-1]
+
+    adjusted = np.minimum(adjusted, 1.0)
+    adjusted[np.isnan(sorted_p)] = np.nan
+    result = np.empty(n)
+    result[order] = adjusted
+    return result
+
+
+def route_family_size(n_groups, n_comparisons, families):
+    """Family size of a route correction: explicit, or K*(K-1)/2 group pairs of one family."""
+    if n_comparisons is None and families is None and n_groups is not None:
+        return n_groups * (n_groups - 1) // 2
+    return n_comparisons
+
+
+def bonferroni_correction(p_values, n_groups=None, significance_level=None, n_comparisons=None, families=None):
     """Bonferroni correction for multiple comparisons.
-    
+
+    Family size defaults to the number of group pairs; pass n_comparisons
+    to correct a different family (e.g. all pairs across several metrics)
+    or families to correct every family by its own size.
+
+    https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.false_discovery_control.html
+    """
+    return adjust_pvalues(p_values, 'bonferroni', families, route_family_size(n_groups, n_comparisons, families))
+
+
+def holm_correction(p_values, n_groups=None, significance_level=None, n_comparisons=None, families=None):
+    """Holm step-down correction (FWER), uniformly more powerful than Bonferroni.
+
+    https://www.statsmodels.org/stable/generated/statsmodels.stats.multitest.multipletests.html
+    """
+    return adjust_pvalues(p_values, 'holm', families, route_family_size(n_groups, n_comparisons, families))
+
+
+def hochberg_correction(p_values, n_groups=None, significance_level=None, n_comparisons=None, families=None):
+    """Hochberg step-up correction (FWER) for independent or positively dependent tests.
+
+    https://www.statsmodels.org/stable/generated/statsmodels.stats.multitest.multipletests.html
+    """
+    return adjust_pvalues(p_values, 'hochberg', families, route_family_size(n_groups, n_comparisons, families))
+
+
+def benjamini_hochberg_correction(p_values, n_groups=None, significance_level=None, n_comparisons=None,
+                                  families=None):
+    """Benjamini-Hochberg adjusted p-values (false discovery rate).
+
+    https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.false_discovery_control.html
+    """
+    return adjust_pvalues(p_values, 'benjamini_hochberg', families,
+                          route_family_size(n_groups, n_comparisons, families))
+
+
+def benjamini_yekutieli_correction(p_values, n_groups=None, significance_level=None, n_comparisons=None,
+                                   families=None):
+    """Benjamini-Yekutieli adjusted p-values (false discovery rate under any dependence).
+
     https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.false_discovery_control.html
     """
-    n_comparisons = n_groups * (n_groups - 1) // 2
-    corrected_pvalues = [min(p * n_comparisons, 1.0) for p in p_values]
-    return corrected_pvalues
\ No newline at end of file
+    return adjust_pvalues(p_values, 'benjamini_yekutieli', families,
+                          route_family_size(n_groups, n_comparisons, families))
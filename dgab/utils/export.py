@@ -0,0 +1,225 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .reports import generate_batch_report
+
+
+# Bumped when columns are renamed or removed; new columns are appended
+EXPORT_SCHEMA_VERSION = 1
+
+EXPERIMENT_COLUMNS = [
+    'experiment', 'data_type', 'statistic', 'dependency', 'test_name', 'correction',
+    'significance_level', 'confidence_level'
+]
+
+GROUP_COLUMNS = EXPERIMENT_COLUMNS + ['group', 'count', 'value', 'ci_lower', 'ci_upper']
+
+# difference = group2_value - group1_value, interval for the same direction
+COMPARISON_COLUMNS = EXPERIMENT_COLUMNS + [
+    'group1', 'group2',
+    'group1_count', 'group1_value', 'group1_ci_lower', 'group1_ci_upper',
+    'group2_count', 'group2_value', 'group2_ci_lower', 'group2_ci_upper',
+    'difference', 'difference_ci_lower', 'difference_ci_upper',
+    'pvalue', 'corrected_pvalue', 'significant',
+    'omnibus_test', 'omnibus_pvalue', 'omnibus_significant'
+]
+
+EXPORT_FORMATS = ['json', 'csv', 'parquet']
+
+
+def named_results(results):
+    """(name, AnalysisResult) pairs from a dict, a list of pairs or a list of results (named by position)."""
+    if isinstance(results, dict):
+        return list(results.items())
+    if hasattr(results, 'plan'):
+        return [(None, results)]
+    return [item if isinstance(item, tuple) else (str(idx), item) for idx, item in enumerate(results)]
+
+
+def experiment_fields(experiment, result):
+    plan, config = result.plan, result.route.config
+    return {
+        'experiment': experiment,
+        'data_type': plan.data_type,
+        'statistic': plan.statistic,
+        'dependency': plan.dependency,
+        'test_name': config['test_name'],
+        'correction': config['multiple_comparison_correction'],
+        'significance_level': plan.significance_level,
+        'confidence_level': plan.confidence_level
+    }
+
+
+def ci_bounds(intervals):
+    bounds = np.array([list(ci) for ci in intervals], dtype=float).reshape(-1, 2)
+    return bounds[:, 0], bounds[:, 1]
+
+
+def group_columns(result):
+    """Per-group columns of one result (GROUP_COLUMNS without experiment fields) as arrays."""
+    group_stats = result.group_stats
+    ci_lower, ci_upper = ci_bounds(group_stats[f'ci_{int(result.plan.confidence_level * 100)}'])
+    return {
+        'group': group_stats['group'].astype(str).to_numpy(dtype=object),
+        'count': group_stats['count'].to_numpy(dtype=np.int64),
+        'value': group_stats[result.plan.statistic].to_numpy(dtype=float),
+        'ci_lower': ci_lower,
+        'ci_upper': ci_upper
+    }
+
+
+def comparison_columns(result, groups=None):
+    """Per-pair columns of one result (COMPARISON_COLUMNS without experiment fields) as arrays.
+
+    Pairs are aligned with groups and differences by positions from dict lookups,
+    not by DataFrame indexing: per-result cost is what makes 1,000 results slow.
+    """
+    groups = groups or group_columns(result)
+    position = {group: idx for idx, group in enumerate(groups['group'])}
+    pairwise = result.pairwise
+    group1 = pairwise['group1'].astype(str).to_numpy(dtype=object)
+    group2 = pairwise['group2'].astype(str).to_numpy(dtype=object)
+    idx1 = np.array([position[group] for group in group1], dtype=int)
+    idx2 = np.array([position[group] for group in group2], dtype=int)
+
+    differences = result.differences
+    diff_lower, diff_upper = ci_bounds(differences[f'ci_{int(result.plan.confidence_level * 100)}'])
+    diff_position = {pair: idx for idx, pair in enumerate(zip(differences['group1'].astype(str),
+                                                              differences['group2'].astype(str)))}
+    diff_idx = np.array([diff_position[pair] for pair in zip(group1, group2)], dtype=int)
+
+    n_pairs = len(pairwise)
+    omnibus = result.omnibus or {}
+    columns = {'group1': group1, 'group2': group2}
+    for prefix, idx in (('group1', idx1), ('group2', idx2)):
+        for column in ('count', 'value', 'ci_lower', 'ci_upper'):
+            columns[f'{prefix}_{column}'] = groups[column][idx]
+    columns.update({
+        'difference': differences['difference'].to_numpy(dtype=float)[diff_idx],
+        # Interval functions return group1 - group2, 'difference' is group2 - group1
+        'difference_ci_lower': -diff_upper[diff_idx],
+        'difference_ci_upper': -diff_lower[diff_idx],
+        'pvalue': pairwise['pvalue'].to_numpy(dtype=float),
+        'corrected_pvalue': (pairwise['corrected_pvalue'].to_numpy(dtype=float) if 'corrected_pvalue' in pairwise
+                             else np.full(n_pairs, np.nan)),
+        'significant': pairwise['significant'].to_numpy(dtype=bool),
+        'omnibus_test': np.full(n_pairs, omnibus.get('test_name'), dtype=object),
+        'omnibus_pvalue': np.full(n_pairs, float(omnibus['pvalue']) if omnibus else np.nan),
+        'omnibus_significant': np.full(n_pairs, bool(omnibus['significant']) if omnibus else None, dtype=object)
+    })
+    return columns
+
+
+def combine(parts, columns):
+    """One DataFrame from (experiment fields, column arrays) parts, built once."""
+    data = {}
+    for column in columns:
+        if column in EXPERIMENT_COLUMNS:
+            data[column] = np.concatenate([
+                np.full(len(next(iter(arrays.values()))), fields[column], dtype=object) for fields, arrays in parts
+            ]) if parts else []
+        else:
+            data[column] = np.concatenate([arrays[column] for _, arrays in parts]) if parts else []
+    frame = pd.DataFrame(data, columns=columns)
+    for column in ('significance_level', 'confidence_level'):
+        frame[column] = frame[column].astype(float)
+    return frame
+
+
+def groups_frame(results):
+    """Group rows of many results (dict name -> AnalysisResult or list) in one table, GROUP_COLUMNS."""
+    parts = [(experiment_fields(name, result), group_columns(result)) for name, result in named_results(results)]
+    return combine(parts, GROUP_COLUMNS)
+
+
+def comparisons_frame(results):
+    """Comparison rows of many results (dict name -> AnalysisResult or list) in one table, COMPARISON_COLUMNS."""
+    parts = [(experiment_fields(name, result), comparison_columns(result)) for name, result in named_results(results)]
+    return combine(parts, COMPARISON_COLUMNS)
+
+
+def json_value(value):
+    """NumPy scalars to Python, NaN to None (valid JSON)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def column_records(columns, names):
+    return [{name: json_value(value) for name, value in zip(names, row)}
+            for row in zip(*(columns[name] for name in names))]
+
+
+def experiment_record(experiment, result):
+    """One result as a JSON-serializable dict: experiment fields, omnibus test, groups and comparisons."""
+    omnibus = result.omnibus
+    groups = group_columns(result)
+    comparisons = comparison_columns(result, groups)
+    return {
+        **experiment_fields(experiment, result),
+        'omnibus': None if not omnibus else {
+            'test_name': omnibus['test_name'],
+            'statistic': json_value(omnibus['statistic']),
+            'pvalue': json_value(omnibus['pvalue']),
+            'significant': json_value(omnibus['significant'])
+        },
+        'groups': column_records(groups, list(groups)),
+        'comparisons': column_records(comparisons, [name for name in comparisons if not name.startswith('omnibus_')])
+    }
+
+
+def results_to_json(results):
+    """Many results as one JSON-serializable document with the schema version."""
+    return {
+        'schema_version': EXPORT_SCHEMA_VERSION,
+        'experiments': [experiment_record(name, result) for name, result in named_results(results)]
+    }
+
+
+def export_results(results, path, format=None, table='comparisons'):
+    """Write results of many experiments to JSON, CSV or Parquet.
+
+    format: 'json', 'csv' or 'parquet' (default: from the file extension).
+    JSON holds experiments with nested groups and comparisons; CSV and Parquet
+    hold one flat table - table='comparisons' (COMPARISON_COLUMNS, one row per
+    pair) or 'groups' (GROUP_COLUMNS, one row per group).
+    Parquet needs pyarrow or fastparquet.
+
+    https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.to_parquet.html
+    """
+    format = format or os.path.splitext(path)[1].lstrip('.').lower()
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат экспорта: '{format}'. Доступные: {EXPORT_FORMATS}")
+    if table not in ('comparisons', 'groups'):
+        raise ValueError(f"Неизвестная таблица: '{table}'. Доступные: ['comparisons', 'groups']")
+
+    if format == 'json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results_to_json(results), f, ensure_ascii=False)
+        return path
+
+    frame = comparisons_frame(results) if table == 'comparisons' else groups_frame(results)
+    if format == 'csv':
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_parquet(path, index=False)
+    return path
+
+
+def render_reports(results, path=None, title='Результаты A/B тестов'):
+    """Render many results into one HTML document with CSS embedded once.
+
+    Returns the HTML; with path also writes it to the file.
+    """
+    document = generate_batch_report(
+        [(name, result.report_body) for name, result in named_results(results)], title
+    )
+    if path is not None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(document)
+    return document
@@ -0,0 +1,427 @@
+import pandas as pd
+import numpy as np
+from functools import cached_property
+
+
+# Largest max - min + 1 of an integer metric collapsed with frequency='auto'
+MAX_FREQUENCY_SPAN = 1000
+
+
+def factorize_groups(dataframe, group_col):
+    """Encode group column as integer codes 0..K-1 (sorted group order).
+
+    https://pandas.pydata.org/docs/reference/api/pandas.factorize.html
+    """
+    codes, groups = pd.factorize(dataframe[group_col], sort=True)
+    return codes, groups
+
+
+class GroupedData:
+    """Rows of a frame ordered by group once; every group is a contiguous slice.
+
+    The order is a stable argsort of the group codes (radix sort for int8/int16
+    codes, O(N)) computed on first use; rows keep their order within a group.
+    Rows of groups[i] are offsets[i]:offsets[i + 1] of every column returned by
+    column(), so group(col, i) is a view, not a copy. Sorted columns are cached,
+    so all consumers of raw values (samples, frequency tables, plots) share one
+    sort and one gather per column instead of masking the frame per group.
+
+    https://numpy.org/doc/stable/reference/generated/numpy.argsort.html
+    """
+
+    def __init__(self, dataframe, group_col, codes=None, groups=None):
+        if codes is None:
+            codes, groups = factorize_groups(dataframe, group_col)
+        self.dataframe = dataframe
+        self.group_col = group_col
+        self.codes = codes
+        self.groups = groups
+        self.offsets = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(groups)))]
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.groups)
+
+    @cached_property
+    def order(self):
+        codes = self.codes.astype(np.min_scalar_type(max(len(self.groups) - 1, 0)), copy=False)
+        return np.argsort(codes, kind='stable')
+
+    @property
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def take(self, values):
+        """Any per-row array in group order (one gather, not cached)."""
+        return np.asarray(values)[self.order]
+
+    def column(self, col):
+        """Column as float array in group order (one gather, cached)."""
+        if col not in self._columns:
+            self._columns[col] = self.take(self.dataframe[col].to_numpy(dtype=float))
+        return self._columns[col]
+
+    def group(self, col, idx):
+        """Values of groups[idx] as a view of column(col)."""
+        return self.column(col)[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def split(self, col):
+        """Per-group views of column(col)."""
+        values = self.column(col)
+        return [values[self.offsets[idx]:self.offsets[idx + 1]] for idx in range(len(self.groups))]
+
+    def reduce(self, ufunc, values, empty):
+        """ufunc.reduceat over group slices of values (column name or array in group order).
+
+        Groups without rows get `empty`.
+        """
+        if isinstance(values, str):
+            values = self.column(values)
+        sizes = self.sizes
+        result = np.full(len(self.groups), empty, dtype=float)
+        present = sizes > 0
+        if present.any():
+            result[present] = ufunc.reduceat(values, self.offsets[:-1][present])
+        return result
+
+
+def compute_group_stats(dataframe, group_col, metric_col, codes=None, groups=None):
+    """Per-group sufficient statistics in one vectorized pass over the data.
+
+    The group column is factorized once (or pre-computed codes are reused),
+    then count, sum, squared deviations, min and max are accumulated with
+    np.bincount / ufunc.at instead of masking the frame per group.
+    Squares are taken around a common shift (first observation) to avoid
+    catastrophic cancellation in sum(x^2) - sum(x)^2 / n.
+
+    Returns DataFrame indexed by sorted group names with columns:
+        count: number of observations
+        sum: sum of metric values
+        m2: sum of squared deviations from the group mean
+        min, max: extreme metric values
+
+    https://numpy.org/doc/stable/reference/generated/numpy.bincount.html
+    """
+    if codes is None:
+        codes, groups = factorize_groups(dataframe, group_col)
+    n_groups = len(groups)
+    values = dataframe[metric_col].to_numpy(dtype=float)
+
+    shift = values[0] if len(values) else 0.0
+    shifted = values - shift
+    count = np.bincount(codes, minlength=n_groups)
+    shifted_sum = np.bincount(codes, weights=shifted, minlength=n_groups)
+    shifted_sum_sq = np.bincount(codes, weights=shifted * shifted, minlength=n_groups)
+
+    min_values = np.full(n_groups, np.inf)
+    max_values = np.full(n_groups, -np.inf)
+    np.minimum.at(min_values, codes, values)
+    np.maximum.at(max_values, codes, values)
+
+    m2 = np.maximum(shifted_sum_sq - shifted_sum ** 2 / count, 0.0)
+
+    return pd.DataFrame({
+        'count': count.astype(np.int64),
+        'sum': shifted_sum + shift * count,
+        'm2': m2,
+        'min': min_values,
+        'max': max_values
+    }, index=pd.Index(groups, name=group_col))
+
+
+def compute_weighted_group_stats(dataframe, group_col, metric_col, weight_col, codes=None, groups=None):
+    """Per-group sufficient statistics of a frequency table (value, count) per row.
+
+    Each row stands for weight_col identical observations, so the result equals
+    compute_group_stats() on the expanded data:
+    count = sum(w), sum = sum(w * x), m2 = sum(w * (x - mean)^2).
+
+    https://numpy.org/doc/stable/reference/generated/numpy.bincount.html
+    """
+    if codes is None:
+        codes, groups = factorize_groups(dataframe, group_col)
+    n_groups = len(groups)
+    values = dataframe[metric_col].to_numpy(dtype=float)
+    weights = dataframe[weight_col].to_numpy(dtype=float)
+
+    count = np.bincount(codes, weights=weights, minlength=n_groups)
+    total = np.bincount(codes, weights=weights * values, minlength=n_groups)
+    mean = total / count
+    deviations = values - mean[codes]
+    m2 = np.bincount(codes, weights=weights * deviations * deviations, minlength=n_groups)
+
+    # Rows with zero weight do not contribute to min/max
+    present = weights > 0
+    min_values = np.full(n_groups, np.inf)
+    max_values = np.full(n_groups, -np.inf)
+    np.minimum.at(min_values, codes[present], values[present])
+    np.maximum.at(max_values, codes[present], values[present])
+
+    return pd.DataFrame({
+        'count': np.rint(count).astype(np.int64),
+        'sum': total,
+        'm2': m2,
+        'min': min_values,
+        'max': max_values
+    }, index=pd.Index(groups, name=group_col))
+
+
+# Covariate moments and metric-covariate co-moment per group (CUPED)
+COMOMENT_COLUMNS = ['covariate_sum', 'covariate_m2', 'comoment']
+
+
+def compute_group_comoments(dataframe, group_col, metric_col, covariate_col, codes=None, groups=None):
+    """Per-group sufficient statistics of a metric and a pre-period covariate in one pass.
+
+    Columns of compute_group_stats() plus:
+        covariate_sum: sum of covariate values
+        covariate_m2: sum of squared deviations of the covariate from the group mean
+        comoment: sum of (covariate - its mean) * (metric - its mean)
+    Like m2, the cross sums are taken around a common shift (first observation).
+    Tables merge with merge_group_stats(), so CUPED works on chunks and partitions.
+
+    https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Covariance
+    """
+    if codes is None:
+        codes, groups = factorize_groups(dataframe, group_col)
+    n_groups = len(groups)
+    group_stats = compute_group_stats(dataframe, group_col, metric_col, codes, groups)
+
+    values = dataframe[metric_col].to_numpy(dtype=float)
+    covariate = dataframe[covariate_col].to_numpy(dtype=float)
+    metric_shift = values[0] if len(values) else 0.0
+    covariate_shift = covariate[0] if len(covariate) else 0.0
+    shifted = values - metric_shift
+    shifted_covariate = covariate - covariate_shift
+
+    count = group_stats['count'].to_numpy(dtype=float)
+    shifted_sum = group_stats['sum'].to_numpy() - metric_shift * count
+    covariate_sum = np.bincount(codes, weights=shifted_covariate, minlength=n_groups)
+    covariate_sum_sq = np.bincount(codes, weights=shifted_covariate * shifted_covariate, minlength=n_groups)
+    cross_sum = np.bincount(codes, weights=shifted_covariate * shifted, minlength=n_groups)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        group_stats['covariate_sum'] = covariate_sum + covariate_shift * count
+        group_stats['covariate_m2'] = np.maximum(covariate_sum_sq - covariate_sum ** 2 / count, 0.0)
+        group_stats['comoment'] = cross_sum - covariate_sum * shifted_sum / count
+    return group_stats
+
+
+def compute_group_samples(dataframe, group_col, metric_col, weight_col=None, codes=None, groups=None,
+                          grouped=None):
+    """Per-group sample as a frequency table: sorted distinct values and their counts.
+
+    Used by routes that need the distribution, not only moments (median,
+    quantiles, bootstrap). Rows are put in group order once (GroupedData,
+    shared with other raw-data consumers when passed as grouped), then each
+    group slice is sorted by value and equal values are collapsed, so discrete
+    metrics shrink to a few values per group.
+    weight_col: rows are already a frequency table (value, count).
+
+    Returns DataFrame indexed by sorted group names with object columns
+    'values' and 'weights' (one array per group).
+
+    https://numpy.org/doc/stable/reference/generated/numpy.unique.html
+    """
+    if grouped is None:
+        grouped = GroupedData(dataframe, group_col, codes, groups)
+    samples_values, samples_weights = [], []
+    for idx in range(len(grouped)):
+        values = grouped.group(metric_col, idx)
+        if weight_col is None:
+            values = np.sort(values)
+            weights = np.ones(len(values))
+        else:
+            weights = grouped.group(weight_col, idx)
+            present = weights > 0
+            order = np.argsort(values[present], kind='stable')
+            values, weights = values[present][order], weights[present][order]
+        starts = np.flatnonzero(np.r_[True, np.diff(values) != 0]) if len(values) else np.array([], dtype=int)
+        samples_values.append(values[starts])
+        samples_weights.append(np.add.reduceat(weights, starts) if len(starts) else weights)
+
+    return pd.DataFrame({
+        'values': samples_values,
+        'weights': samples_weights
+    }, index=pd.Index(grouped.groups, name=group_col))
+
+
+def frequency_weight_col(group_col, metric_col):
+    """Count column of a frequency table: 'count', prefixed with '_' while it names group_col or metric_col."""
+    weight_col = 'count'
+    while weight_col in (group_col, metric_col):
+        weight_col = f'_{weight_col}'
+    return weight_col
+
+
+def compute_frequency_table(dataframe, group_col, metric_col, codes=None, groups=None,
+                            max_span=None, weight_col=None, grouped=None):
+    """Collapse rows to a (group, value, count) frequency table sorted by group and value.
+
+    Integer metrics with max - min + 1 <= max_span are counted in one pass with
+    np.bincount over (group code, value) keys; otherwise rows are put in group
+    order once and sorted within groups (compute_group_samples, grouped is reused). With max_span set, None is returned for metrics
+    that are not integer or span more values. Counts go to weight_col (default
+    frequency_weight_col(), never one of the table's other columns).
+
+    https://numpy.org/doc/stable/reference/generated/numpy.bincount.html
+    """
+    if grouped is not None:
+        codes, groups = grouped.codes, grouped.groups
+    elif codes is None:
+        codes, groups = factorize_groups(dataframe, group_col)
+    metric = dataframe[metric_col]
+    weight_col = weight_col or frequency_weight_col(group_col, metric_col)
+
+    if pd.api.types.is_integer_dtype(metric) and len(metric):
+        # Offsets in int64: span and values - min overflow narrow dtypes (int8 -100..100)
+        values = metric.to_numpy().astype(np.int64)
+        min_value = values.min()
+        span = int(values.max() - min_value) + 1
+        if max_span is None or span <= max_span:
+            counts = np.bincount(codes * span + (values - min_value), minlength=len(groups) * span)
+            keys = np.flatnonzero(counts)
+            return pd.DataFrame({
+                group_col: np.asarray(groups)[keys // span],
+                metric_col: keys % span + min_value,
+                weight_col: counts[keys]
+            })
+    if max_span is not None:
+        return None
+
+    samples = compute_group_samples(dataframe, group_col, metric_col, codes=codes, groups=groups, grouped=grouped)
+    return pd.DataFrame({
+        group_col: np.repeat(samples.index.to_numpy(), samples['values'].map(len).to_numpy()),
+        metric_col: np.concatenate(samples['values'].tolist()),
+        weight_col: np.concatenate(samples['weights'].tolist()).astype(np.int64)
+    })
+
+
+def compute_group_stats_many(dataframe, group_col, metric_cols, codes=None, groups=None,
+                             block_values=1 << 21, grouped=None):
+    """Per-group sufficient statistics for many metric columns in one pass.
+
+    Rows are processed in blocks of about block_values numbers: a group
+    indicator matrix (K x rows) is multiplied by the block (rows x metrics),
+    giving sums and shifted sums of squares for all metrics at once. min/max
+    are reduced over contiguous group slices of the rows put in group order
+    once (GroupedData), not over a mask per group.
+
+    Returns dict metric -> DataFrame with the same columns as compute_group_stats.
+
+    https://numpy.org/doc/stable/reference/generated/numpy.matmul.html
+    """
+    if grouped is None:
+        grouped = GroupedData(dataframe, group_col, codes, groups)
+    codes, groups = grouped.codes, grouped.groups
+    n_groups = len(groups)
+    values = dataframe[list(metric_cols)].to_numpy(dtype=float)
+    n_rows, n_metrics = values.shape
+
+    shift = values[0] if n_rows else np.zeros(n_metrics)
+    group_ids = np.arange(n_groups)[:, None]
+    shifted_sum = np.zeros((n_groups, n_metrics))
+    shifted_sum_sq = np.zeros((n_groups, n_metrics))
+
+    step = max(1024, block_values // max(n_metrics, 1))
+    for start in range(0, n_rows, step):
+        block = values[start:start + step] - shift
+        indicator = (codes[start:start + step][None, :] == group_ids).astype(float)
+        shifted_sum += indicator @ block
+        shifted_sum_sq += indicator @ (block * block)
+
+    count = np.bincount(codes, minlength=n_groups)
+    index = pd.Index(groups, name=group_col)
+    result = {}
+    for metric_idx, metric_col in enumerate(metric_cols):
+        metric_sum = shifted_sum[:, metric_idx]
+        ordered = grouped.take(values[:, metric_idx])
+        result[metric_col] = pd.DataFrame({
+            'count': count.astype(np.int64),
+            'sum': metric_sum + shift[metric_idx] * count,
+            'm2': np.maximum(shifted_sum_sq[:, metric_idx] - metric_sum ** 2 / count, 0.0),
+            'min': grouped.reduce(np.minimum, ordered, np.inf),
+            'max': grouped.reduce(np.maximum, ordered, -np.inf)
+        }, index=index)
+    return result
+
+
+def merge_group_stats(left, right):
+    """Combine two statistics tables (e.g. from different chunks) into one.
+
+    Groups are aligned by index; m2 is combined with Chan et al. parallel update:
+    m2 = m2_a + m2_b + delta^2 * n_a * n_b / n, delta = mean_b - mean_a,
+    so merging partial results gives the same moments as one pass over all rows.
+
+    https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    index = left.index.union(right.index)
+    fill = {'count': 0, 'sum': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf,
+            **{col: 0.0 for col in COMOMENT_COLUMNS}}
+    left = left.reindex(index).fillna(fill)
+    right = right.reindex(index).fillna(fill)
+
+    count_left = left['count'].to_numpy(dtype=float)
+    count_right = right['count'].to_numpy(dtype=float)
+    count = count_left + count_right
+    both = (count_left > 0) & (count_right > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = count_left * count_right / count
+        delta = right['sum'].to_numpy() / count_right - left['sum'].to_numpy() / count_left
+        cross_term = np.where(both, delta ** 2 * weight, 0.0)
+
+    merged = pd.DataFrame({
+        'count': count.astype(np.int64),
+        'sum': left['sum'].to_numpy() + right['sum'].to_numpy(),
+        'm2': left['m2'].to_numpy() + right['m2'].to_numpy() + cross_term,
+        'min': np.minimum(left['min'].to_numpy(), right['min'].to_numpy()),
+        'max': np.maximum(left['max'].to_numpy(), right['max'].to_numpy())
+    }, index=index)
+
+    if 'comoment' in left.columns:
+        # Same update for the covariate and the co-moment: C = C_a + C_b + delta_x * delta_y * n_a * n_b / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta_covariate = (right['covariate_sum'].to_numpy() / count_right
+                               - left['covariate_sum'].to_numpy() / count_left)
+            merged['covariate_sum'] = left['covariate_sum'].to_numpy() + right['covariate_sum'].to_numpy()
+            merged['covariate_m2'] = (left['covariate_m2'].to_numpy() + right['covariate_m2'].to_numpy()
+                                      + np.where(both, delta_covariate ** 2 * weight, 0.0))
+            merged['comoment'] = (left['comoment'].to_numpy() + right['comoment'].to_numpy()
+                                  + np.where(both, delta_covariate * delta * weight, 0.0))
+    return merged.sort_index()
+
+
+def moments_mean_var(group_stats):
+    """Mean and sample variance (ddof=1) from sufficient statistics.
+
+    Works with a single row of the statistics table as well as with
+    arrays of rows, so callers can evaluate many groups or pairs at once.
+    """
+    count = np.asarray(group_stats['count'], dtype=float)
+    mean = np.asarray(group_stats['sum'], dtype=float) / count
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = np.asarray(group_stats['m2'], dtype=float) / (count - 1)
+    return mean, var
+
+
+def group_pairs(group_stats):
+    """All K*(K-1)/2 group pairs (i < j, sorted group order) as aligned arrays.
+
+    Returns group1 names, group2 names and two dicts of statistics arrays
+    (column -> values for the left/right group of every pair), so pairwise
+    tests and intervals are evaluated for all pairs in one broadcast.
+
+    https://numpy.org/doc/stable/reference/generated/numpy.triu_indices.html
+    """
+    group_stats = group_stats.sort_index()
+    left, right = np.triu_indices(len(group_stats), k=1)
+    columns = {col: group_stats[col].to_numpy() for col in group_stats.columns}
+
+    group1_stats = {col: values[left] for col, values in columns.items()}
+    group2_stats = {col: values[right] for col, values in columns.items()}
+    return group_stats.index[left], group_stats.index[right], group1_stats, group2_stats
@@ -0,0 +1,120 @@
+import datetime
+import json
+import os
+import pandas as pd
+import numpy as np
+from .accumulators import GroupStatsAccumulator, make_accumulator
+from .streaming import iter_chunks
+
+
+DEFAULT_STATE_PATH = 'dgab_state.json'
+
+
+def watermark_to_json(value):
+    """JSON-friendly watermark: numbers as is, dates/timestamps as ISO strings with a marker."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, np.datetime64)):
+        return {'timestamp': pd.Timestamp(value).isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def watermark_from_json(payload):
+    if isinstance(payload, dict):
+        return pd.Timestamp(payload['timestamp'])
+    return payload
+
+
+def watermark_marks(marks):
+    """Watermark column comparable with the stored watermark.
+
+    datetime.date objects (object dtype) become datetime64: the stored
+    watermark is restored as pd.Timestamp, which does not compare with dates.
+    """
+    if marks.dtype == object and len(marks) and isinstance(marks.iloc[0], datetime.date):
+        return pd.to_datetime(marks)
+    return marks
+
+
+def read_state_file(state_path):
+    """All experiments stored in the state file ({} if file does not exist)."""
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+
+def load_state(state_path, experiment_id):
+    """Accumulator and watermark persisted for experiment_id, (None, None) if absent."""
+    entry = read_state_file(state_path).get(str(experiment_id))
+    if entry is None:
+        return None, None
+    accumulator = GroupStatsAccumulator.from_dict(entry['accumulator'])
+    return accumulator, watermark_from_json(entry['watermark'])
+
+
+def save_state(state_path, experiment_id, accumulator, watermark):
+    """Store accumulator snapshot and watermark for experiment_id.
+
+    Other experiments in the file are kept. The file is written to a temporary
+    path and moved into place, so an interrupted run leaves the previous state intact.
+
+    https://docs.python.org/3/library/os.html#os.replace
+    """
+    states = read_state_file(state_path)
+    states[str(experiment_id)] = {
+        'watermark': watermark_to_json(watermark),
+        'accumulator': accumulator.to_dict()
+    }
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(states, f)
+    os.replace(tmp_path, state_path)
+
+
+def update_state(source, experiment_id, watermark_col, data_type, group_col, metric_col=None,
+                 metric_config=None, state_path=DEFAULT_STATE_PATH, chunksize=1_000_000,
+                 sample_required=False, covariate_col=None):
+    """Fold rows newer than the stored watermark into the persisted accumulator.
+
+    Only rows with watermark_col strictly greater than the watermark of the
+    previous run are used, so passing the full cumulative data or only the new
+    partition gives the same state. Rows arriving later with an old watermark
+    value are not picked up: load a partition only when it is complete.
+
+    Returns (accumulator, watermark, new_rows). The state file is not written here.
+    """
+    # merge() rejects state stored for another data type or other columns
+    accumulator = make_accumulator(data_type, group_col, metric_col, metric_config, sample_required, covariate_col)
+    stored_accumulator, stored_watermark = load_state(state_path, experiment_id)
+    if stored_accumulator is not None:
+        accumulator.merge(stored_accumulator)
+
+    if data_type == 'binary_agg':
+        columns = [group_col, metric_config['trials_col_name'], metric_config['successes_col_name'], watermark_col]
+    else:
+        columns = [group_col, metric_col, watermark_col] + ([covariate_col] if covariate_col is not None else [])
+
+    if isinstance(source, pd.DataFrame):
+        if watermark_col not in source.columns:
+            raise ValueError(f"Колонка '{watermark_col}' не найдена в DataFrame")
+        source = [source]
+
+    watermark = stored_watermark
+    new_rows = 0
+    for chunk in iter_chunks(source, columns, chunksize):
+        marks = watermark_marks(chunk[watermark_col])
+        if stored_watermark is not None:
+            newer = (marks > stored_watermark).to_numpy()
+            chunk, marks = chunk[newer], marks[newer]
+        if chunk.empty:
+            continue
+        accumulator.update(chunk)
+        new_rows += len(chunk)
+        chunk_max = marks.max()
+        if watermark is None or chunk_max > watermark:
+            watermark = chunk_max
+
+    return accumulator, watermark, new_rows
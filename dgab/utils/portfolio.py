@@ -0,0 +1,269 @@
+import pandas as pd
+import numpy as np
+
+from .export import COMPARISON_COLUMNS
+from .group_stats import compute_group_stats, compute_weighted_group_stats
+from .transformations import aggregate_binary_counts
+
+
+STATS_COLUMNS = ['count', 'sum', 'm2', 'min', 'max']
+
+
+def factorize_cells(dataframe, key_cols, group_col):
+    """Encode (experiment, group) cells as integer codes 0..C-1 in hash passes, rows are not sorted.
+
+    key_cols: columns that identify one analyzed experiment - the experiment
+    column and/or segment columns (country, platform, ...), every slice is
+    analyzed as a separate experiment. Each column is factorized separately and
+    the codes are combined into one mixed-radix int64 key, so cells are sorted
+    by key columns, then by group, and the cells of every experiment are contiguous.
+    Returns row cell codes, row codes of every key column and of group_col
+    (dict column -> codes, -1 for NaN), key values of every experiment
+    (dict column -> array), cell experiment codes and cell group names.
+
+    https://pandas.pydata.org/docs/reference/api/pandas.factorize.html
+    """
+    column_codes, column_uniques = {}, {}
+    keys, radix = np.zeros(len(dataframe), dtype=np.int64), 1
+    for col in key_cols + [group_col]:
+        codes, uniques = pd.factorize(dataframe[col], sort=True)
+        column_codes[col], column_uniques[col] = codes, np.asarray(uniques, dtype=object)
+        size = max(len(uniques), 1)
+        if radix * size >= 2 ** 62:
+            # Compact the key before it overflows (many high-cardinality segments)
+            keys, compact = pd.factorize(keys, sort=True)
+            keys, radix = keys.astype(np.int64), len(compact)
+        keys = keys * size + codes
+        radix *= size
+
+    cell_codes, cell_keys = pd.factorize(keys, sort=True)
+    n_group_names = max(len(column_uniques[group_col]), 1)
+    cell_experiment, _ = pd.factorize(cell_keys // n_group_names, sort=True)
+
+    # Key values of every experiment from the codes of one of its rows (no column is materialized)
+    cell_row = np.zeros(len(cell_keys), dtype=np.int64)
+    cell_row[cell_codes[::-1]] = np.arange(len(cell_codes))[::-1]
+    experiment_row = cell_row[np.r_[0, np.flatnonzero(np.diff(cell_experiment)) + 1]] if len(cell_row) else cell_row
+    cell_groups = column_uniques[group_col][column_codes[group_col][cell_row]]
+    experiment_keys = {col: column_uniques[col][column_codes[col][experiment_row]] for col in key_cols}
+    return cell_codes, column_codes, experiment_keys, cell_experiment, cell_groups
+
+
+def cell_stats(dataframe, data_type, metric_col, metric_config, cell_codes, n_cells, weight_col=None):
+    """Per-cell sufficient statistics (count, sum, m2, min, max) as arrays, one pass over the rows."""
+    cells = np.arange(n_cells)
+    if data_type == 'binary_agg':
+        stats = aggregate_binary_counts(dataframe, None, metric_config, cell_codes, cells)
+    elif weight_col is None:
+        stats = compute_group_stats(dataframe, None, metric_col, cell_codes, cells)
+    else:
+        stats = compute_weighted_group_stats(dataframe, None, metric_col, weight_col, cell_codes, cells)
+    return {col: stats[col].to_numpy() for col in STATS_COLUMNS}
+
+
+def experiment_pairs(cell_experiment, n_experiments):
+    """All within-experiment cell pairs (i < j) as (left, right) cell indices.
+
+    Cells of an experiment are contiguous, so the pairs of all experiments with
+    k groups are one triu_indices(k) broadcast over their offsets; pairs come
+    out ordered by experiment, then as in group_pairs().
+
+    https://numpy.org/doc/stable/reference/generated/numpy.triu_indices.html
+    """
+    sizes = np.bincount(cell_experiment, minlength=n_experiments)
+    offsets = np.r_[0, np.cumsum(sizes)][:-1]
+    lefts, rights = [], []
+    for size in np.unique(sizes):
+        if size < 2:
+            continue
+        starts = offsets[sizes == size][:, None]
+        left, right = np.triu_indices(size, k=1)
+        lefts.append((starts + left).ravel())
+        rights.append((starts + right).ravel())
+    if not lefts:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    left, right = np.concatenate(lefts), np.concatenate(rights)
+    order = np.lexsort((right, left))
+    return left[order], right[order]
+
+
+def anova_by_experiment(stats, cell_experiment, n_experiments, significance_level):
+    """One-way ANOVA of every experiment at once (same formulas as stat_tests.anova_test)."""
+    from scipy import stats as scipy_stats
+
+    count = stats['count'].astype(float)
+    total_count = np.bincount(cell_experiment, weights=count, minlength=n_experiments)
+    grand_mean = np.bincount(cell_experiment, weights=stats['sum'], minlength=n_experiments) / total_count
+    n_cells = np.bincount(cell_experiment, minlength=n_experiments)
+
+    mean = stats['sum'] / count
+    ss_between = np.bincount(cell_experiment, weights=count * (mean - grand_mean[cell_experiment]) ** 2,
+                             minlength=n_experiments)
+    ss_within = np.bincount(cell_experiment, weights=stats['m2'], minlength=n_experiments)
+    df_between = n_cells - 1
+    df_within = total_count - n_cells
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = (ss_between / df_between) / (ss_within / df_within)
+    pvalue = scipy_stats.f.sf(statistic, df_between, df_within)
+    return statistic, pvalue
+
+
+def chi2_by_experiment(stats, cell_experiment, n_experiments, significance_level):
+    """Chi-square test of independence of every experiment at once (groups x [failures, successes]).
+
+    Omnibus routes have 3+ groups (dof >= 2), so there is no Yates correction,
+    as in scipy.stats.chi2_contingency.
+
+    https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.chi2_contingency.html
+    """
+    from scipy import stats as scipy_stats
+
+    trials = stats['count'].astype(float)
+    successes = stats['sum'].astype(float)
+    total_trials = np.bincount(cell_experiment, weights=trials, minlength=n_experiments)
+    success_rate = np.bincount(cell_experiment, weights=successes, minlength=n_experiments) / total_trials
+    n_cells = np.bincount(cell_experiment, minlength=n_experiments)
+
+    expected_successes = trials * success_rate[cell_experiment]
+    expected_failures = trials - expected_successes
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = ((successes - expected_successes) ** 2 / expected_successes
+                 + (successes - expected_successes) ** 2 / expected_failures)
+    statistic = np.bincount(cell_experiment, weights=terms, minlength=n_experiments)
+    pvalue = scipy_stats.chi2.sf(statistic, n_cells - 1)
+    return statistic, pvalue
+
+
+# Omnibus tests computed for all experiments in one pass; other tests run per experiment
+VECTORIZED_OMNIBUS = {
+    'anova': anova_by_experiment,
+    'chi2': chi2_by_experiment
+}
+
+
+def omnibus_by_experiment(route, stats, cell_experiment, n_experiments, experiments_mask, significance_level):
+    """Omnibus p-values per experiment (NaN where experiments_mask is False)."""
+    pvalues = np.full(n_experiments, np.nan)
+    omnibus_test = route.config['omnibus_test']
+    if omnibus_test in VECTORIZED_OMNIBUS:
+        _, all_pvalues = VECTORIZED_OMNIBUS[omnibus_test](stats, cell_experiment, n_experiments,
+                                                          significance_level)
+        pvalues[experiments_mask] = all_pvalues[experiments_mask]
+        return pvalues
+
+    offsets = np.r_[0, np.cumsum(np.bincount(cell_experiment, minlength=n_experiments))]
+    for experiment in np.flatnonzero(experiments_mask):
+        cells = slice(offsets[experiment], offsets[experiment + 1])
+        experiment_stats = pd.DataFrame({col: values[cells] for col, values in stats.items()})
+        pvalues[experiment] = route.omnibus_func(experiment_stats, significance_level)['pvalue']
+    return pvalues
+
+
+def route_comparisons(plan, route, stats, cell_experiment, cell_groups, left, right, n_experiments):
+    """COMPARISON_COLUMNS arrays (without experiment fields) for pairs of one route.
+
+    Tests and interval functions are called once with arrays of all pairs,
+    the group interval function once with arrays of all cells in the pairs.
+    """
+    significance_level, confidence_level = plan.significance_level, plan.confidence_level
+    group1_stats = {col: values[left] for col, values in stats.items()}
+    group2_stats = {col: values[right] for col, values in stats.items()}
+    pair_experiment = cell_experiment[left]
+
+    test_result = route.test_func(group1_stats, group2_stats, significance_level, **route.test_params)
+    pvalues = np.broadcast_to(np.asarray(test_result['pvalue'], dtype=float), left.shape)
+    diff_lower, diff_upper = route.diff_confint_func(group1_stats, group2_stats,
+                                                     significance_level=significance_level,
+                                                     confidence_level=confidence_level,
+                                                     **route.diff_confint_params)
+
+    cells = np.unique(np.r_[left, right])
+    cell_lower, cell_upper = route.confint_func({col: values[cells] for col, values in stats.items()},
+                                                significance_level=significance_level,
+                                                confidence_level=confidence_level,
+                                                **route.confint_params)
+    ci_lower = np.full(len(cell_experiment), np.nan)
+    ci_upper = np.full(len(cell_experiment), np.nan)
+    ci_lower[cells] = np.around(cell_lower, 4)
+    ci_upper[cells] = np.around(cell_upper, 4)
+    value = stats['sum'] / stats['count']
+
+    if route.correction_func is not None:
+        # Every experiment is a separate family, all corrected in one vectorized call
+        corrected = np.asarray(route.correction_func(pvalues, None, significance_level, families=pair_experiment))
+        significant = corrected < significance_level
+    else:
+        corrected = np.full(len(pvalues), np.nan)
+        significant = pvalues < significance_level
+
+    n_pairs = len(left)
+    omnibus_test = route.config['omnibus_test']
+    if omnibus_test:
+        mask = np.zeros(n_experiments, dtype=bool)
+        mask[pair_experiment] = True
+        omnibus_pvalues = omnibus_by_experiment(route, stats, cell_experiment, n_experiments, mask,
+                                                significance_level)[pair_experiment]
+        omnibus_significant = (omnibus_pvalues < significance_level).astype(object)
+    else:
+        omnibus_pvalues = np.full(n_pairs, np.nan)
+        omnibus_significant = np.full(n_pairs, None, dtype=object)
+
+    columns = {'group1': cell_groups[left], 'group2': cell_groups[right]}
+    for prefix, idx in (('group1', left), ('group2', right)):
+        columns[f'{prefix}_count'] = stats['count'][idx].astype(np.int64)
+        columns[f'{prefix}_value'] = value[idx]
+        columns[f'{prefix}_ci_lower'] = ci_lower[idx]
+        columns[f'{prefix}_ci_upper'] = ci_upper[idx]
+    columns.update({
+        'difference': value[right] - value[left],
+        # Interval functions return group1 - group2, 'difference' is group2 - group1
+        'difference_ci_lower': -np.around(np.broadcast_to(diff_upper, left.shape), 4),
+        'difference_ci_upper': -np.around(np.broadcast_to(diff_lower, left.shape), 4),
+        'pvalue': pvalues,
+        'corrected_pvalue': corrected,
+        'significant': significant,
+        'omnibus_test': np.full(n_pairs, omnibus_test, dtype=object),
+        'omnibus_pvalue': omnibus_pvalues,
+        'omnibus_significant': omnibus_significant,
+        'test_name': np.full(n_pairs, route.config['test_name'], dtype=object),
+        'correction': np.full(n_pairs, route.config['multiple_comparison_correction'], dtype=object)
+    })
+    return pair_experiment, columns
+
+
+def portfolio_comparisons(plan, stats, keys, experiment_col, cell_experiment, cell_groups, segments=()):
+    """One COMPARISON_COLUMNS table for all experiments: a row per within-experiment pair.
+
+    keys: key column values of every experiment (see factorize_cells); segment
+    columns are inserted after 'experiment', which is None without experiment_col.
+    """
+    n_experiments = cell_experiment[-1] + 1
+    experiment_sizes = np.bincount(cell_experiment, minlength=n_experiments)
+    left, right = experiment_pairs(cell_experiment, n_experiments)
+    cell_groups = np.asarray(cell_groups).astype(str).astype(object)
+
+    two_groups = experiment_sizes[cell_experiment[left]] == 2
+    parts = []
+    for n_groups, mask in ((2, two_groups), (3, ~two_groups)):
+        if mask.any():
+            parts.append(route_comparisons(plan, plan.route(n_groups), stats, cell_experiment, cell_groups,
+                                           left[mask], right[mask], n_experiments))
+
+    # Back to experiment order: pairs of both routes were selected by mask from one ordered sequence
+    order = np.argsort(np.concatenate([np.flatnonzero(two_groups), np.flatnonzero(~two_groups)]), kind='stable')
+    pair_experiment = np.concatenate([part[0] for part in parts])[order]
+    data = {
+        'experiment': (np.asarray(keys[experiment_col], dtype=object)[pair_experiment] if experiment_col
+                       else np.full(len(pair_experiment), None, dtype=object)),
+        **{segment: keys[segment][pair_experiment] for segment in segments},
+        'data_type': plan.data_type,
+        'statistic': plan.statistic,
+        'dependency': plan.dependency,
+        'significance_level': float(plan.significance_level),
+        'confidence_level': float(plan.confidence_level)
+    }
+    for column in parts[0][1]:
+        data[column] = np.concatenate([part[1][column] for part in parts])[order]
+    columns = COMPARISON_COLUMNS[:1] + list(segments) + COMPARISON_COLUMNS[1:]
+    return pd.DataFrame(data, columns=columns)
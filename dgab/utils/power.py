@@ -0,0 +1,235 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+from .routing import get_route
+
+
+# Pairwise tests the planner has a power model for
+POWER_TESTS = ['welch_ttest']
+
+# Grid axes in output column order: the effect axis is mde or sample_size
+GRID_AXES = ['baseline', 'std', 'effect_axis', 'n_groups', 'significance_level', 'power']
+
+
+def planning_routes(data_type, statistic, dependency, n_groups):
+    """Routes analyze() would run for every number of groups, checked for a power model."""
+    from .validations import validate_parameters, validate_group_count
+
+    if data_type == 'binary_agg' and statistic == 'mean':
+        statistic = 'proportion'
+    validate_parameters(data_type, statistic, dependency)
+    routes = {}
+    for groups in np.unique(n_groups):
+        validate_group_count(groups)
+        route = get_route(data_type, int(groups), statistic, dependency)
+        if route.config['test_name'] not in POWER_TESTS:
+            raise ValueError(f"Планирование не поддерживается для теста '{route.config['test_name']}' "
+                             f"({data_type}/{statistic}/{dependency}). Доступные тесты: {POWER_TESTS}")
+        routes[int(groups)] = route
+    return statistic, routes
+
+
+def comparison_alpha(routes, n_groups, significance_level):
+    """Per-comparison significance level under the route multiple comparison correction.
+
+    The route correction function (e.g. bonferroni_correction) is applied to a
+    tiny p-value with the number of groups, so its family size (K*(K-1)/2
+    pairs) and scaling are the ones analyze() uses: the smallest p-value of
+    the family must be below significance_level / scale to be significant.
+    """
+    scale = np.ones(len(n_groups))
+    for groups, route in routes.items():
+        if route.correction_func is not None:
+            tiny = 1e-12
+            scale[n_groups == groups] = route.correction_func(np.array([tiny]), groups)[0] / tiny
+    return significance_level / scale
+
+
+def effect_variances(statistic, baseline, std, effect):
+    """Per-group variances of the metric in control and treatment."""
+    if statistic == 'proportion':
+        treatment = baseline + effect
+        with np.errstate(invalid='ignore'):
+            valid = (baseline > 0) & (baseline < 1) & (treatment > 0) & (treatment < 1)
+        return (np.where(valid, baseline * (1 - baseline), np.nan),
+                np.where(valid, treatment * (1 - treatment), np.nan))
+    return std ** 2, std ** 2
+
+
+def welch_sample_size(effect, var1, var2, alpha, power, iterations=4):
+    """Observations per group for a two-sided Welch t-test with equal group sizes.
+
+    Starts from the normal approximation n = (z_{1-alpha/2} + z_power)^2 (var1 + var2) / effect^2
+    and refines it with t quantiles at Welch-Satterthwaite degrees of freedom,
+    all scenarios at once.
+
+    https://www.statsmodels.org/stable/generated/statsmodels.stats.power.TTestIndPower.html
+    """
+    from scipy import stats
+
+    variance = var1 + var2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        size = (stats.norm.ppf(1 - alpha / 2) + stats.norm.ppf(power)) ** 2 * variance / effect ** 2
+        for _ in range(iterations):
+            df = variance ** 2 * (np.maximum(size, 2) - 1) / (var1 ** 2 + var2 ** 2)
+            size = (stats.t.ppf(1 - alpha / 2, df) + stats.t.ppf(power, df)) ** 2 * variance / effect ** 2
+    return np.ceil(np.maximum(size, 2))
+
+
+def welch_detectable_effect(statistic, baseline, std, size, alpha, power, iterations=20):
+    """Smallest increase detectable by the Welch t-test with size observations per group.
+
+    effect = (t_{1-alpha/2} + t_power) * sqrt((var1 + var2) / size) at
+    Welch-Satterthwaite degrees of freedom. Means have equal variances, so it
+    is closed-form; for proportions the treatment variance depends on the
+    effect and the equation is solved by fixed-point iteration, all scenarios
+    at once.
+    """
+    from scipy import stats
+
+    effect = np.zeros(len(size))
+    for _ in range(iterations if statistic == 'proportion' else 1):
+        var1, var2 = effect_variances(statistic, baseline, std, effect)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df = (var1 + var2) ** 2 * (size - 1) / (var1 ** 2 + var2 ** 2)
+        critical = stats.t.ppf(1 - alpha / 2, df) + stats.t.ppf(power, df)
+        effect = critical * np.sqrt((var1 + var2) / size)
+    return effect
+
+
+def scenario_grid(effect_name, **axes):
+    """Cartesian product of scalar or list parameters as flat arrays (one row per scenario)."""
+    names = [effect_name if name == 'effect_axis' else name for name in GRID_AXES]
+    values = [np.atleast_1d(np.asarray(axes[name], dtype=float)) for name in names]
+    mesh = np.meshgrid(*values, indexing='ij')
+    return {name: axis.ravel() for name, axis in zip(names, mesh)}
+
+
+def grid_frame(data_type, statistic, routes, grid, alpha):
+    """Scenario columns plus the route that analyze() would run."""
+    configs = [routes[int(groups)].config for groups in grid['n_groups']]
+    frame = pd.DataFrame({
+        'data_type': data_type,
+        'statistic': statistic,
+        'test_name': [config['test_name'] for config in configs],
+        'correction': [config['multiple_comparison_correction'] for config in configs],
+        **grid,
+        'comparison_alpha': alpha
+    })
+    frame['n_groups'] = frame['n_groups'].astype(np.int64)
+    return frame
+
+
+def sample_size_grid(baseline, mde, n_groups=2, significance_level=0.01, power=0.8, data_type='discrete',
+                     statistic='mean', dependency='independent', std=None, relative=True):
+    """Required observations per group for a grid of planning scenarios.
+
+    Every parameter of baseline, std, mde, n_groups, significance_level and
+    power may be a scalar or a list; the grid is their Cartesian product,
+    evaluated with NumPy broadcasting (thousands of scenarios in milliseconds).
+    The test and the multiple comparison correction come from the same
+    methods_route.json route analyze() runs for that number of groups, so
+    with K groups each of the K*(K-1)/2 pairs is sized at the corrected level
+    (comparison_alpha). Groups are assumed to be of equal size.
+
+    baseline: control mean (discrete, continuous) or conversion (binary_agg).
+    std: metric standard deviation, required for means; binary variance
+    follows from the proportions. mde: minimal detectable effect, relative to
+    baseline (relative=True, 0.05 = +5%) or absolute. Proportions outside
+    (0, 1) give NaN.
+
+    Returns DataFrame, one row per scenario: route columns, the grid, effect
+    (absolute), comparison_alpha, sample_size (per group) and total_sample_size.
+    """
+    statistic, routes = planning_routes(data_type, statistic, dependency, np.atleast_1d(n_groups))
+    if statistic != 'proportion' and std is None:
+        raise ValueError("Для планирования по среднему нужен std - стандартное отклонение метрики")
+
+    grid = scenario_grid('mde', baseline=baseline, std=np.nan if std is None else std, mde=mde,
+                         n_groups=n_groups, significance_level=significance_level, power=power)
+    effect = grid['mde'] * grid['baseline'] if relative else grid['mde']
+    alpha = comparison_alpha(routes, grid['n_groups'], grid['significance_level'])
+    var1, var2 = effect_variances(statistic, grid['baseline'], grid['std'], effect)
+    sample_size = welch_sample_size(np.abs(effect), var1, var2, alpha, grid['power'])
+
+    frame = grid_frame(data_type, statistic, routes, grid, alpha)
+    frame.insert(frame.columns.get_loc('comparison_alpha'), 'effect', effect)
+    frame['sample_size'] = sample_size
+    frame['total_sample_size'] = sample_size * frame['n_groups']
+    return frame
+
+
+def mde_grid(sample_size, baseline, n_groups=2, significance_level=0.01, power=0.8, data_type='discrete',
+             statistic='mean', dependency='independent', std=None, iterations=20):
+    """Minimal detectable effect for a grid of planning scenarios and observations per group.
+
+    Inverse of sample_size_grid (same routes, corrections and power model):
+    sample_size (per group) is one more grid axis, baseline, std, n_groups,
+    significance_level and power as in sample_size_grid. Returns the
+    smallest increase detectable with the given power (see
+    welch_detectable_effect); NaN when no proportion increase is detectable.
+
+    Returns DataFrame, one row per scenario: route columns, the grid,
+    comparison_alpha, mde (absolute) and relative_mde (share of baseline).
+    """
+    statistic, routes = planning_routes(data_type, statistic, dependency, np.atleast_1d(n_groups))
+    if statistic != 'proportion' and std is None:
+        raise ValueError("Для планирования по среднему нужен std - стандартное отклонение метрики")
+
+    grid = scenario_grid('sample_size', baseline=baseline, std=np.nan if std is None else std,
+                         sample_size=sample_size, n_groups=n_groups, significance_level=significance_level,
+                         power=power)
+    size = grid['sample_size']
+    alpha = comparison_alpha(routes, grid['n_groups'], grid['significance_level'])
+
+    effect = welch_detectable_effect(statistic, grid['baseline'], grid['std'], size, alpha, grid['power'],
+                                     iterations)
+    frame = grid_frame(data_type, statistic, routes, grid, alpha)
+    frame['sample_size'] = frame['sample_size'].astype(np.int64)
+    frame['mde'] = effect
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame['relative_mde'] = effect / grid['baseline']
+    return frame
+
+
+def group_counts_of(source):
+    """Observations per group from AnalysisResult, accumulator, Series, mapping or array."""
+    if hasattr(source, 'sufficient_stats'):
+        source = source.sufficient_stats['count']
+    elif hasattr(source, 'group_stats') and not isinstance(source, pd.DataFrame):
+        source = source.group_stats['count']
+    if isinstance(source, dict):
+        source = pd.Series(source)
+    return np.asarray(source, dtype=float).ravel()
+
+
+def sample_size_eta(group_counts, elapsed, required):
+    """Time left until every group reaches the required sample size at the current traffic rate.
+
+    group_counts: observations per group so far (AnalysisResult, accumulator,
+    Series, dict or array); elapsed: time since the start (number of days,
+    hours, ... or timedelta); required: observations per group, scalar or one
+    per scenario (e.g. sample_size_grid()['sample_size']).
+    Each group is assumed to keep its average rate count / elapsed, so the
+    time left is elapsed * max over groups of (required - count) / count.
+
+    Returns time left in units of elapsed (Timedelta for timedelta), 0 when
+    reached, inf/NaT for a group without observations; a Series with the
+    index of required when it is a Series.
+    """
+    counts = group_counts_of(group_counts)
+    required_values = np.asarray(required, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shortfall = np.where(counts > 0, np.maximum(required_values[..., None] - counts, 0) / counts, np.inf)
+    share = shortfall.max(axis=-1)
+
+    if isinstance(elapsed, (datetime.timedelta, np.timedelta64)):
+        seconds = pd.Timedelta(elapsed).total_seconds()
+        eta = pd.to_timedelta(np.where(np.isfinite(share), share * seconds, np.nan).ravel(), unit='s')
+        eta = eta if np.ndim(share) else eta[0]
+    else:
+        eta = share * elapsed
+    if isinstance(required, pd.Series):
+        return pd.Series(eta, index=required.index, name='eta')
+    return eta[()] if isinstance(eta, np.ndarray) else eta
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+class StageProfiler:
+    """Wall time, CPU time and peak allocated memory per named stage.
+
+    Use as analyze(..., profile=True) or pass an instance to share it between
+    calls; stages are recorded with `with profiler.stage(name): ...` and may be
+    nested. Peak memory is measured with tracemalloc (Python and NumPy
+    allocations above the memory in use at stage start); tracing runs only
+    while a stage is open and slows allocations down, memory=False turns it off.
+    callback(record) is called when a stage ends.
+
+    https://docs.python.org/3/library/tracemalloc.html
+    """
+
+    def __init__(self, memory=True, callback=None):
+        self.memory = memory
+        self.callback = callback
+        self.records = []
+        self.origin = time.perf_counter()
+        self._stack = []
+        self._started_tracing = False
+
+    def __repr__(self):
+        return f"StageProfiler(stages={[record['stage'] for record in self.records]})"
+
+    @contextmanager
+    def stage(self, name):
+        if self.memory:
+            self._enter_memory()
+        frame = {'stage': name, 'depth': len(self._stack), 'start': time.perf_counter(), 'cpu': time.process_time()}
+        if self.memory:
+            frame['memory_start'], frame['memory_peak'] = tracemalloc.get_traced_memory()[0], 0
+        self._stack.append(frame)
+        try:
+            yield frame
+        finally:
+            self._stack.pop()
+            record = {
+                'stage': name,
+                'depth': frame['depth'],
+                'start_s': frame['start'] - self.origin,
+                'wall_s': time.perf_counter() - frame['start'],
+                'cpu_s': time.process_time() - frame['cpu'],
+                'peak_mb': self._exit_memory(frame) if self.memory else None
+            }
+            self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def _enter_memory(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        # reset_peak() is global: fold the peak so far into the open stages first
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._stack:
+            frame['memory_peak'] = max(frame['memory_peak'], peak)
+        tracemalloc.reset_peak()
+
+    def _exit_memory(self, frame):
+        peak = max(frame['memory_peak'], tracemalloc.get_traced_memory()[1])
+        if self._stack:
+            self._stack[-1]['memory_peak'] = max(self._stack[-1]['memory_peak'], peak)
+        elif self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return max(peak - frame['memory_start'], 0) / 2 ** 20
+
+    def to_frame(self):
+        """Stages in start order: stage, depth, start_s, wall_s, cpu_s, peak_mb."""
+        import pandas as pd
+
+        columns = ['stage', 'depth', 'start_s', 'wall_s', 'cpu_s', 'peak_mb']
+        return pd.DataFrame(sorted(self.records, key=lambda record: record['start_s']), columns=columns)
+
+    def to_chrome_trace(self):
+        """Trace Event Format dict (complete 'X' events, microseconds) for chrome://tracing or Perfetto.
+
+        https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU
+        """
+        pid, tid = os.getpid(), threading.get_ident()
+        events = [
+            {
+                'name': record['stage'], 'cat': 'dgab', 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': record['start_s'] * 1e6, 'dur': record['wall_s'] * 1e6,
+                'args': {'cpu_s': record['cpu_s'], 'peak_mb': record['peak_mb']}
+            }
+            for record in sorted(self.records, key=lambda record: record['start_s'])
+        ]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
+
+
+class NullProfiler:
+    """Disabled profiler: stage() is a shared no-op context manager."""
+
+    records = []
+    _stage = nullcontext()
+
+    def __bool__(self):
+        return False
+
+    def stage(self, name):
+        return self._stage
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def make_profiler(profile):
+    """analyze(profile=...) value -> profiler: False/None - disabled, True - new StageProfiler, or the instance."""
+    if isinstance(profile, (StageProfiler, NullProfiler)):
+        return profile
+    return StageProfiler() if profile else NULL_PROFILER
@@ -10,6 +10,7 @@ def get_statistic_russian(statistic):
     statistic_ru = {
         'mean': 'среднее',
         'median': 'медиана',
+        'p90': '90-й перцентиль',
         'proportion': 'пропорция'
     }
     return statistic_ru.get(statistic, statistic)
@@ -27,52 +28,67 @@ def format_count(count):
     return f"{int(count):,}"
 
 def build_comprehensive_table(group_stats_df, diff_df, pairwise_df, statistic, significance_level, confidence_level=0.99):
-    """Build comprehensive results table universal for all data types."""
+    """Build comprehensive results table universal for all data types.
+
+    Group statistics and difference intervals are aligned to the pairwise table
+    by positions from dict lookups: with few groups the cost is per-call
+    overhead, which matters when many experiments are rendered.
+    """
     import pandas as pd
     import numpy as np
 
-    results = []
     confidence_level_int = int(confidence_level * 100)
     ci_col = f'ci_{confidence_level_int}'
-    
-    for i, row in pairwise_df.iterrows():
-        group1, group2 = row['group1'], row['group2']
-        
-        group1_stats = group_stats_df[group_stats_df['group'] == group1].iloc[0]
-        group2_stats = group_stats_df[group_stats_df['group'] == group2].iloc[0]
-        diff_row = diff_df[(diff_df['group1'] == group1) & (diff_df['group2'] == group2)]
-        
-        if len(diff_row) == 0:
-            diff_row = diff_df[(diff_df['group1'] == group2) & (diff_df['group2'] == group1)]
-            difference = -diff_row.iloc[0]['difference'] if len(diff_row) > 0 else 0
+
+    group1 = pairwise_df['group1'].to_numpy()
+    group2 = pairwise_df['group2'].to_numpy()
+    position = {group: idx for idx, group in enumerate(group_stats_df['group'])}
+    idx1 = np.array([position[group] for group in group1], dtype=int)
+    idx2 = np.array([position[group] for group in group2], dtype=int)
+    counts = group_stats_df['count'].to_numpy()
+    values = group_stats_df[statistic].to_numpy()
+    group_cis = group_stats_df[ci_col].to_numpy()
+
+    # Difference rows are matched in (group1, group2) order, falling back to the reversed pair
+    diff_position = {pair: idx for idx, pair in enumerate(zip(diff_df['group1'], diff_df['group2']))}
+    diff_values = diff_df['difference'].to_numpy()
+    diff_ci_values = diff_df[ci_col].to_numpy()
+    difference = np.zeros(len(group1))
+    diff_cis = []
+    for pair_idx, (g1, g2) in enumerate(zip(group1, group2)):
+        if (g1, g2) in diff_position:
+            difference[pair_idx] = diff_values[diff_position[(g1, g2)]]
+            diff_cis.append(diff_ci_values[diff_position[(g1, g2)]])
+        elif (g2, g1) in diff_position:
+            difference[pair_idx] = -diff_values[diff_position[(g2, g1)]]
+            diff_cis.append(diff_ci_values[diff_position[(g2, g1)]])
         else:
-            difference = diff_row.iloc[0]['difference']
-        
-        abs_difference = abs(difference)
-        comparison_result = f"{group1}>{group2}" if group1_stats[statistic] > group2_stats[statistic] else f"{group2}>{group1}"
-        
-        diff_ci = diff_row.iloc[0][ci_col] if len(diff_row) > 0 else [0, 0]
-        abs_diff_ci = [abs(diff_ci[0]), abs(diff_ci[1])]
-        abs_diff_ci.sort()
-        
-        results.append({
-            'group1': group1,
-            'group1_count': group1_stats['count'],
-            f'group1_{statistic}': np.around(group1_stats[statistic], 4),
-            f'group1_{ci_col}': group1_stats[ci_col],
-            'group2': group2,
-            'group2_count': group2_stats['count'],
-            f'group2_{statistic}': np.around(group2_stats[statistic], 4),
-            f'group2_{ci_col}': group2_stats[ci_col],
-            'abs_difference': np.around(abs_difference, 4),
-            f'abs_difference_{ci_col}': [np.around(abs_diff_ci[0], 4), np.around(abs_diff_ci[1], 4)],
-            'comparison_result': comparison_result,
-            'pvalue': row.get('pvalue', 0),
-            'corrected_pvalue': row.get('corrected_pvalue', None),
-            'significant': row.get('significant', False)
-        })
-    
-    comprehensive_results = pd.DataFrame(results)
+            diff_cis.append([0, 0])
+    abs_diff_cis = [sorted([abs(ci[0]), abs(ci[1])]) for ci in diff_cis]
+
+    group1_values = values[idx1]
+    group2_values = values[idx2]
+    comparison_result = [
+        f"{g1}>{g2}" if v1 > v2 else f"{g2}>{g1}"
+        for g1, g2, v1, v2 in zip(group1, group2, group1_values, group2_values)
+    ]
+
+    comprehensive_results = pd.DataFrame({
+        'group1': group1,
+        'group1_count': counts[idx1],
+        f'group1_{statistic}': np.around(group1_values, 4),
+        f'group1_{ci_col}': group_cis[idx1],
+        'group2': group2,
+        'group2_count': counts[idx2],
+        f'group2_{statistic}': np.around(group2_values, 4),
+        f'group2_{ci_col}': group_cis[idx2],
+        'abs_difference': np.around(np.abs(difference), 4),
+        f'abs_difference_{ci_col}': [[np.around(ci[0], 4), np.around(ci[1], 4)] for ci in abs_diff_cis],
+        'comparison_result': comparison_result,
+        'pvalue': pairwise_df['pvalue'].to_numpy() if 'pvalue' in pairwise_df else 0,
+        'corrected_pvalue': pairwise_df['corrected_pvalue'].to_numpy() if 'corrected_pvalue' in pairwise_df else None,
+        'significant': pairwise_df['significant'].to_numpy() if 'significant' in pairwise_df else False
+    }, index=pairwise_df.index)
     comprehensive_results = comprehensive_results.sort_values(['significant', f'group1_{statistic}', 'abs_difference'], ascending=[False, False, True])
     
     return comprehensive_results
@@ -147,140 +163,202 @@ def generate_confluence_css():
     """
 
 
-def generate_group_stats_table(group_stats_df, statistic, significance_level, confidence_level=0.99):
-    """Generate group statistics table HTML."""
-    confidence_level_int = int(confidence_level * 100)
-    group_stats_sorted = group_stats_df.sort_values(statistic, ascending=False).copy()
-    ci_col = f'ci_{confidence_level_int}'
-    
-    html = f"""
+GROUP_TABLE_HEADER = """
         <h4>Группы теста:</h4>
         <table>
             <tr>
                 <th>Группа</th>
                 <th class="number">Размер выборки</th>
-                <th class="center">{statistic.title()} (CI {confidence_level_int}%)</th>
-                <th class="number">{statistic.title()}</th>
+                <th class="center">{statistic_title} (CI {confidence_level_int}%)</th>
+                <th class="number">{statistic_title}</th>
             </tr>
     """
-    
-    for _, row in group_stats_sorted.iterrows():
-        html += f"""
+
+GROUP_TABLE_ROW = """
             <tr>
-                <td class="group-name">{row['group']}</td>
-                <td class="number">{format_count(row['count'])}</td>
-                <td class="center">{format_ci(row[ci_col])}</td>
-                <td class="number">{format_number(row[statistic])}</td>
+                <td class="group-name">{group}</td>
+                <td class="number">{count}</td>
+                <td class="center">{ci}</td>
+                <td class="number">{value}</td>
             </tr>
         """
-    
-    html += "</table>"
-    return html, group_stats_sorted
-
-
-def generate_2group_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level=0.99, omnibus_result=None, fig=None):
-    """Generate HTML report for 2-group A/B test."""
-    confidence_level_int = int(confidence_level * 100)
 
-    group_stats_table, group_stats_sorted = generate_group_stats_table(group_stats_df, statistic, significance_level, confidence_level)
-    best_group = group_stats_sorted.iloc[0]
-    
-    comparison = comprehensive_results.iloc[0] if not comprehensive_results.empty else None
-    
-    html = generate_confluence_css() + f"""
+REPORT_HEAD = """
     <div class="ab-report">
-        <h3>📊 A/B тест (2 группы)</h3>
+        <h3>📊 A/B тест ({title})</h3>
         
         {group_stats_table}
         
         <h4>Результаты теста:</h4>
-        <p><strong>Исследуемая статистика:</strong> {get_statistic_russian(statistic)}</p>
-        <p><strong>Лучшая группа:</strong> {best_group['group']} ({format_number(best_group[statistic])})</p>
+        <p><strong>Исследуемая статистика:</strong> {statistic_ru}</p>
+        <p><strong>Лучшая группа:</strong> {best_group} ({best_value})</p>
     """
-    
-    if comparison is not None:
-        effect_ci_col = f'abs_difference_ci_{confidence_level_int}'
-        html += f"""
-        <p><strong>Различия значимы:</strong> {'Да' if comparison['significant'] else 'Нет'}</p>
-        <p><strong>Размер эффекта:</strong> {format_number(comparison['abs_difference'])}</p>
-        <p><strong>Доверительный интервал эффекта:</strong> {format_ci(comparison[effect_ci_col])}</p>
-        """
-    
-    html += "</div>"
-    return html
-
 
-def generate_multigroup_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level=0.99, omnibus_result=None, fig=None):
-    """Generate HTML report for multi-group A/B test."""
-    confidence_level_int = int(confidence_level * 100)
+TWO_GROUP_RESULT = """
+        <p><strong>Различия значимы:</strong> {significant}</p>
+        <p><strong>Размер эффекта:</strong> {effect}</p>
+        <p><strong>Доверительный интервал эффекта:</strong> {effect_ci}</p>
+        """
 
-    group_stats_table, group_stats_sorted = generate_group_stats_table(group_stats_df, statistic, significance_level, confidence_level)
-    best_group = group_stats_sorted.iloc[0]
-    
-    html = generate_confluence_css() + f"""
-    <div class="ab-report">
-        <h3>📊 A/B тест (множественные группы)</h3>
-        
-        {group_stats_table}
-        
-        <h4>Результаты теста:</h4>
-        <p><strong>Исследуемая статистика:</strong> {get_statistic_russian(statistic)}</p>
-        <p><strong>Лучшая группа:</strong> {best_group['group']} ({format_number(best_group[statistic])})</p>
-    """
-    
-    if omnibus_result:
-        html += f"""
-        <p><strong>Общие различия значимы:</strong> {'Да' if omnibus_result['significant'] else 'Нет'}</p>
+OMNIBUS_RESULT = """
+        <p><strong>Общие различия значимы:</strong> {significant}</p>
         """
-    
-    html += f"""
+
+PAIRWISE_TABLE_HEADER = """
         
         <h4>🔍 Попарные сравнения:</h4>
         <table>
             <tr>
                 <th>Сравнение</th>
-                <th class="number">{get_statistic_russian(statistic).capitalize()} левой группы</th>
-                <th class="number">{get_statistic_russian(statistic).capitalize()} правой группы</th>
+                <th class="number">{statistic_ru} левой группы</th>
+                <th class="number">{statistic_ru} правой группы</th>
                 <th class="center">Значимо</th>
                 <th class="number">Размер эффекта</th>
                 <th class="center">Доверительный интервал эффекта</th>
             </tr>
     """
-    
-    for _, row in comprehensive_results.iterrows():
-        significant_class = "significant-yes" if row['significant'] else "significant-no"
-        significant_text = "✅ Да" if row['significant'] else "❌ Нет"
-        effect_ci_col = f'abs_difference_ci_{confidence_level_int}'
-        
-        group1_stat = row[f'group1_{statistic}']
-        group2_stat = row[f'group2_{statistic}']
-        if group1_stat > group2_stat:
-            comparison_text = f"{row['group1']}>{row['group2']}"
-            left_stat = group1_stat
-            right_stat = group2_stat
-        else:
-            comparison_text = f"{row['group2']}>{row['group1']}"
-            left_stat = group2_stat
-            right_stat = group1_stat
-        
-        html += f"""
+
+PAIRWISE_TABLE_ROW = """
             <tr>
-                <td class="group-name">{comparison_text}</td>
-                <td class="number">{format_number(left_stat)}</td>
-                <td class="number">{format_number(right_stat)}</td>
-                <td class="center {significant_class}">{significant_text}</td>
-                <td class="number">{format_number(row['abs_difference'])}</td>
-                <td class="center">{format_ci(row[effect_ci_col])}</td>
+                <td class="group-name">{comparison}</td>
+                <td class="number">{left}</td>
+                <td class="number">{right}</td>
+                <td class="center {significant_class}">{significant}</td>
+                <td class="number">{effect}</td>
+                <td class="center">{effect_ci}</td>
             </tr>
         """
+
+BATCH_DOCUMENT = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{css}
+</head>
+<body>
+<h1>{title}</h1>
+{sections}
+</body>
+</html>
+"""
+
+BATCH_SECTION = """<section id="{anchor}">
+<h2>{name}</h2>
+{body}
+</section>
+"""
+
+CONFLUENCE_CSS = generate_confluence_css()
+
+
+def generate_group_stats_table(group_stats_df, statistic, significance_level, confidence_level=0.99):
+    """Generate group statistics table HTML."""
+    confidence_level_int = int(confidence_level * 100)
+    group_stats_sorted = group_stats_df.sort_values(statistic, ascending=False).copy()
+    ci_col = f'ci_{confidence_level_int}'
     
-    html += "</table></div>"
-    return html
+    rows = [
+        GROUP_TABLE_ROW.format(group=group, count=format_count(count), ci=format_ci(ci), value=format_number(value))
+        for group, count, ci, value in zip(group_stats_sorted['group'], group_stats_sorted['count'],
+                                           group_stats_sorted[ci_col], group_stats_sorted[statistic].to_numpy())
+    ]
+    html = (GROUP_TABLE_HEADER.format(statistic_title=statistic.title(), confidence_level_int=confidence_level_int)
+            + ''.join(rows) + "</table>")
+    return html, group_stats_sorted
 
 
-def generate_html_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, unique_grps_cnt, omnibus_result=None, fig=None):
-    """Generate HTML report - routes to 2-group or multi-group version."""
+def generate_report_head(group_stats_df, statistic, significance_level, confidence_level, title):
+    """Header part shared by 2-group and multi-group reports: group table and best group."""
+    group_stats_table, group_stats_sorted = generate_group_stats_table(group_stats_df, statistic, significance_level, confidence_level)
+    best_group = group_stats_sorted.iloc[0]
+    return REPORT_HEAD.format(
+        title=title, group_stats_table=group_stats_table, statistic_ru=get_statistic_russian(statistic),
+        best_group=best_group['group'], best_value=format_number(best_group[statistic])
+    )
+
+
+def generate_2group_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level=0.99, omnibus_result=None, fig=None):
+    """2-group report without CSS (see generate_2group_report)."""
+    confidence_level_int = int(confidence_level * 100)
+    html = generate_report_head(group_stats_df, statistic, significance_level, confidence_level, '2 группы')
+    
+    if not comprehensive_results.empty:
+        comparison = comprehensive_results.iloc[0]
+        html += TWO_GROUP_RESULT.format(
+            significant='Да' if comparison['significant'] else 'Нет',
+            effect=format_number(comparison['abs_difference']),
+            effect_ci=format_ci(comparison[f'abs_difference_ci_{confidence_level_int}'])
+        )
+    
+    return html + "</div>"
+
+
+def generate_multigroup_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level=0.99, omnibus_result=None, fig=None):
+    """Multi-group report without CSS (see generate_multigroup_report)."""
+    confidence_level_int = int(confidence_level * 100)
+    html = generate_report_head(group_stats_df, statistic, significance_level, confidence_level, 'множественные группы')
+    
+    if omnibus_result:
+        html += OMNIBUS_RESULT.format(significant='Да' if omnibus_result['significant'] else 'Нет')
+    
+    html += PAIRWISE_TABLE_HEADER.format(statistic_ru=get_statistic_russian(statistic).capitalize())
+    
+    rows = []
+    for group1, group2, group1_stat, group2_stat, significant, effect, effect_ci in zip(
+            comprehensive_results['group1'], comprehensive_results['group2'],
+            comprehensive_results[f'group1_{statistic}'].to_numpy(), comprehensive_results[f'group2_{statistic}'].to_numpy(),
+            comprehensive_results['significant'], comprehensive_results['abs_difference'].to_numpy(),
+            comprehensive_results[f'abs_difference_ci_{confidence_level_int}']):
+        if group1_stat > group2_stat:
+            comparison_text, left_stat, right_stat = f"{group1}>{group2}", group1_stat, group2_stat
+        else:
+            comparison_text, left_stat, right_stat = f"{group2}>{group1}", group2_stat, group1_stat
+        rows.append(PAIRWISE_TABLE_ROW.format(
+            comparison=comparison_text,
+            left=format_number(left_stat),
+            right=format_number(right_stat),
+            significant_class="significant-yes" if significant else "significant-no",
+            significant="✅ Да" if significant else "❌ Нет",
+            effect=format_number(effect),
+            effect_ci=format_ci(effect_ci)
+        ))
+    
+    return html + ''.join(rows) + "</table></div>"
+
+
+def generate_2group_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level=0.99, omnibus_result=None, fig=None):
+    """Generate HTML report for 2-group A/B test."""
+    return CONFLUENCE_CSS + generate_2group_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, omnibus_result, fig)
+
+
+def generate_multigroup_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level=0.99, omnibus_result=None, fig=None):
+    """Generate HTML report for multi-group A/B test."""
+    return CONFLUENCE_CSS + generate_multigroup_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, omnibus_result, fig)
+
+
+def generate_report_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, unique_grps_cnt, omnibus_result=None, fig=None):
+    """Report HTML without CSS - routes to 2-group or multi-group version."""
     if unique_grps_cnt == 2:
-        return generate_2group_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, omnibus_result, fig)
+        return generate_2group_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, omnibus_result, fig)
     else:
-        return generate_multigroup_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, omnibus_result, fig)
\ No newline at end of file
+        return generate_multigroup_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, omnibus_result, fig)
+
+
+def generate_html_report(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, unique_grps_cnt, omnibus_result=None, fig=None):
+    """Generate HTML report - routes to 2-group or multi-group version."""
+    return CONFLUENCE_CSS + generate_report_body(group_stats_df, comprehensive_results, data_type, statistic, significance_level, confidence_level, unique_grps_cnt, omnibus_result, fig)
+
+
+def generate_batch_report(named_bodies, title='Результаты A/B тестов'):
+    """One HTML document for many reports: CSS embedded once, a section per report.
+
+    named_bodies: (name, report body) pairs, bodies from generate_report_body().
+    """
+    import html
+
+    sections = [
+        BATCH_SECTION.format(anchor=f"report-{idx}", name=html.escape(str(name)), body=body)
+        for idx, (name, body) in enumerate(named_bodies)
+    ]
+    return BATCH_DOCUMENT.format(title=html.escape(title), css=CONFLUENCE_CSS, sections=''.join(sections))
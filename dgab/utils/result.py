@@ -0,0 +1,163 @@
+from functools import cached_property
+
+from .confints import confint_group_statistic, confint_difference
+from .stat_tests import pairwise_tests_with_correction
+from .reports import CONFLUENCE_CSS, generate_report_body, build_comprehensive_table
+from .profiling import NULL_PROFILER
+from .bootstrap import ResamplingSession
+
+
+class AnalysisResult:
+    """Result of analyze(): per-group sufficient statistics plus lazily computed parts.
+
+    Only the sufficient statistics table is computed up front. Confidence
+    intervals, tests, the figure and the HTML report are computed on first
+    access and cached. Nothing is printed or rendered unless show() is called.
+
+    The source dataframe is kept by reference (no copy) for plots that need raw data.
+    weight_col: dataframe is a frequency table with counts in this column.
+    grouped: GroupedData of dataframe shared by raw-value consumers (plot).
+    profiler: StageProfiler that also records the lazily computed parts.
+    resampling: ResamplingSession passed to routes on per-group samples, so the
+    test and the difference interval share replicates and one process pool.
+    """
+
+    def __init__(self, plan, route, sufficient_stats, dataframe=None, weight_col=None, grouped=None,
+                 profiler=NULL_PROFILER):
+        self.plan = plan
+        self.route = route
+        self.sufficient_stats = sufficient_stats
+        self.dataframe = dataframe
+        self.weight_col = weight_col
+        self.grouped = grouped
+        self.profiler = profiler
+        self.resampling = ResamplingSession()
+
+    def __repr__(self):
+        return (f"AnalysisResult(data_type='{self.plan.data_type}', statistic='{self.plan.statistic}', "
+                f"groups={list(self.sufficient_stats.index)})")
+
+    @property
+    def unique_grps_cnt(self):
+        return len(self.sufficient_stats)
+
+    def route_params(self, params):
+        """Route parameters plus the resampling session for routes on per-group samples."""
+        if self.route.config.get('sample_required', False):
+            params['session'] = self.resampling
+        return params
+
+    @property
+    def profile(self):
+        """StageProfiler with per-stage timings, None when profiling is off."""
+        return self.profiler or None
+
+    @cached_property
+    def group_stats(self):
+        """Group statistic with confidence interval per group."""
+        with self.profiler.stage('confint_group_statistic'):
+            plan = self.plan
+            return confint_group_statistic(
+                self.sufficient_stats, plan.data_type, plan.statistic,
+                self.route.confint_func,
+                self.route_params(self.route.confint_params),
+                plan.significance_level, plan.confidence_level
+            )
+
+    @cached_property
+    def differences(self):
+        """Differences between groups with confidence intervals."""
+        with self.profiler.stage('confint_difference'):
+            plan = self.plan
+            return confint_difference(
+                self.sufficient_stats, plan.data_type, plan.statistic,
+                self.route.diff_confint_func,
+                self.route_params(self.route.diff_confint_params),
+                plan.significance_level, plan.confidence_level
+            )
+
+    @cached_property
+    def pairwise(self):
+        """Pairwise tests with multiple comparison correction."""
+        with self.profiler.stage('pairwise_tests'):
+            return pairwise_tests_with_correction(
+                self.sufficient_stats, self.route.test_func,
+                self.route.correction_func, self.plan.significance_level,
+                self.route_params(self.route.test_params)
+            )
+
+    @cached_property
+    def omnibus(self):
+        """Omnibus test result (dict) or None if route has no omnibus test."""
+        with self.profiler.stage('omnibus_test'):
+            omnibus_test = self.route.config['omnibus_test']
+            if not omnibus_test:
+                return None
+            omnibus_result = self.route.omnibus_func(self.sufficient_stats, self.plan.significance_level)
+            omnibus_result['test_name'] = omnibus_test
+            return omnibus_result
+
+    @cached_property
+    def comprehensive(self):
+        """Summary table: group statistics, differences and test results per pair."""
+        with self.profiler.stage('comprehensive_table'):
+            plan = self.plan
+            return build_comprehensive_table(
+                self.group_stats, self.differences, self.pairwise,
+                plan.statistic, plan.significance_level, plan.confidence_level
+            )
+
+    @cached_property
+    def figure(self):
+        """Plotly figure from the route visualization function.
+
+        None when raw rows are needed but not available (streamed input
+        without per-group sketches).
+        """
+        with self.profiler.stage('figure'):
+            plan = self.plan
+            if (self.dataframe is None and plan.data_type != 'binary_agg'
+                    and 'sketch' not in self.sufficient_stats.columns):
+                return None
+            return self.route.visualization_func(
+                self.dataframe, plan.group_col, plan.metric_col, group_stats=self.sufficient_stats,
+                weight_col=self.weight_col, grouped=self.grouped
+            )
+
+    @cached_property
+    def report_body(self):
+        """HTML report without CSS, for documents with many reports (render_reports)."""
+        with self.profiler.stage('html_report'):
+            plan = self.plan
+            return generate_report_body(
+                self.group_stats, self.comprehensive, plan.data_type, plan.statistic,
+                plan.significance_level, plan.confidence_level, self.unique_grps_cnt,
+                omnibus_result=self.omnibus
+            )
+
+    @cached_property
+    def html(self):
+        """HTML report."""
+        return CONFLUENCE_CSS + self.report_body
+
+    def to_frame(self, experiment=None):
+        """Comparisons in the stable export schema (see dgab.utils.export)."""
+        from .export import comparisons_frame
+
+        return comparisons_frame({experiment: self})
+
+    def to_dict(self, experiment=None):
+        """JSON-serializable result in the stable export schema."""
+        from .export import experiment_record
+
+        return experiment_record(experiment, self)
+
+    def show(self):
+        """Print and display everything: test info, tables, figure and HTML report."""
+        from ..core import run_eda_analysis, run_statistical_test, display_report
+
+        with self.profiler.stage('show'):
+            run_eda_analysis(self)
+            run_statistical_test(self)
+            display_report(self)
+        return self
@@ -0,0 +1,226 @@
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+
+from . import confints, corrections, stat_tests, visualizations
+
+
+METHODS_ROUTE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'methods_route.json')
+
+REQUIRED_ROUTE_KEYS = [
+    'test_name',
+    'omnibus_test',
+    'multiple_comparison_correction',
+    'custom_config_required',
+    'visualization_function',
+    'confint_method',
+    'confint_params'
+]
+
+
+def freeze(value):
+    """Recursively convert JSON dicts/lists to read-only mappings/tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@lru_cache(maxsize=None)
+def load_methods_route():
+    """Read methods_route.json once per process and return it as a read-only mapping.
+
+    https://docs.python.org/3/library/functools.html#functools.lru_cache
+    """
+    with open(METHODS_ROUTE_PATH, 'r') as f:
+        methods_route = json.load(f)
+    return freeze(methods_route)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Resolved route: test configuration with functions looked up once."""
+    data_type: str
+    group_key: str
+    statistic: str
+    dependency: str
+    config: MappingProxyType
+    test_func: object
+    omnibus_func: object
+    correction_func: object
+    confint_func: object
+    diff_confint_func: object
+    visualization_func: object
+    sequential: object = None
+
+    @property
+    def test_params(self):
+        return dict(self.config.get('test_params', {}))
+
+    @property
+    def confint_params(self):
+        return dict(self.config['confint_params']['statistic_value'])
+
+    @property
+    def diff_confint_params(self):
+        return dict(self.config['confint_params']['difference'])
+
+
+def resolve_function(module, name, route_path):
+    """Look up function by name in module, failing with a clear message."""
+    func = getattr(module, name, None)
+    if not callable(func):
+        raise ValueError(f"Маршрут {route_path}: функция '{name}' не найдена в {module.__name__}")
+    return func
+
+
+def compile_route(data_type, group_key, statistic, dependency, config, design=None):
+    """Validate one methods_route.json entry and resolve its functions.
+
+    An optional 'sequential' block holds the always-valid variant of the route
+    (same keys), compiled into Route.sequential.
+    """
+    route_path = '/'.join([data_type, group_key, statistic, dependency] + ([design] if design else []))
+
+    missing_keys = [key for key in REQUIRED_ROUTE_KEYS if key not in config]
+    if missing_keys:
+        raise ValueError(f"Маршрут {route_path}: отсутствуют обязательные ключи {missing_keys}")
+
+    omnibus_test = config['omnibus_test']
+    correction = config['multiple_comparison_correction']
+
+    return Route(
+        data_type=data_type,
+        group_key=group_key,
+        statistic=statistic,
+        dependency=dependency,
+        config=config,
+        test_func=resolve_function(stat_tests, config['test_name'], route_path),
+        omnibus_func=resolve_function(stat_tests, f"{omnibus_test}_test", route_path) if omnibus_test else None,
+        correction_func=resolve_function(corrections, f"{correction}_correction", route_path) if correction else None,
+        confint_func=resolve_function(confints, config['confint_method']['statistic_value'], route_path),
+        diff_confint_func=resolve_function(confints, config['confint_method']['difference'], route_path),
+        visualization_func=resolve_function(visualizations, config['visualization_function'], route_path),
+        sequential=(compile_route(data_type, group_key, statistic, dependency, config['sequential'], 'sequential')
+                    if 'sequential' in config else None)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_dispatch_table():
+    """Compile all routes once into a read-only table.
+
+    Keys are (data_type, group_key, statistic, dependency), values are Route objects.
+    """
+    table = {}
+    for data_type, by_group_key in load_methods_route().items():
+        for group_key, by_statistic in by_group_key.items():
+            for statistic, by_dependency in by_statistic.items():
+                for dependency, config in by_dependency.items():
+                    key = (data_type, group_key, statistic, dependency)
+                    table[key] = compile_route(data_type, group_key, statistic, dependency, config)
+    return MappingProxyType(table)
+
+
+def get_group_key(unique_grps_cnt):
+    """Route key for number of groups."""
+    return "2" if unique_grps_cnt == 2 else "multiple"
+
+
+def get_route(data_type, unique_grps_cnt, statistic, dependency):
+    """Resolved route for the analysis configuration and number of groups."""
+    return get_dispatch_table()[(data_type, get_group_key(unique_grps_cnt), statistic, dependency)]
+
+
+@dataclass(frozen=True)
+class AnalysisPlan:
+    """Validated analysis configuration with pre-resolved routes.
+
+    Build once with build_plan() and pass to analyze(plan=...) to skip
+    parameter validation and route resolution on repeated runs.
+    """
+    data_type: str
+    group_col: str
+    metric_col: object
+    statistic: str
+    dependency: str
+    significance_level: float
+    confidence_level: float
+    metric_config: object = None
+    sequential: bool = False
+    covariate_col: object = None
+    routes: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    def route(self, unique_grps_cnt):
+        return self.routes[get_group_key(unique_grps_cnt)]
+
+    @property
+    def sample_required(self):
+        """Routes need per-group samples (quantiles, bootstrap), not only moments."""
+        return any(route.config.get('sample_required', False) for route in self.routes.values())
+
+
+def build_plan(
+        data_type,
+        group_col,
+        metric_col=None,
+        statistic='mean',
+        dependency='independent',
+        significance_level=0.01,
+        confidence_level=0.99,
+        metric_config=None,
+        sequential=False,
+        covariate_col=None
+    ):
+    """Validate analysis parameters and resolve routes for 2 and multiple groups.
+
+    sequential=True selects the always-valid (mSPRT) variant of the routes for
+    continuous monitoring: results may be checked at every data update.
+    covariate_col: pre-period covariate for CUPED (mean routes only).
+    """
+    from .validations import validate_parameters, validate_config_requirements
+
+    # Set default statistic based on data type BEFORE validation
+    if data_type == 'binary_agg' and statistic == 'mean':
+        statistic = 'proportion'
+
+    validate_parameters(data_type, statistic, dependency)
+
+    if significance_level <= 0 or significance_level >= 1:
+        raise ValueError(f"Уровень значимости должен быть между 0 и 1, получен: {significance_level}")
+
+    table = get_dispatch_table()
+    routes = {
+        group_key: table[(data_type, group_key, statistic, dependency)]
+        for group_key in load_methods_route()[data_type]
+        if (data_type, group_key, statistic, dependency) in table
+    }
+    if sequential:
+        missing = [group_key for group_key, route in routes.items() if route.sequential is None]
+        if missing:
+            raise ValueError(f"Последовательный режим не настроен для {data_type}/{statistic}/{dependency} "
+                             f"(группы: {missing})")
+        routes = {group_key: route.sequential for group_key, route in routes.items()}
+    for route in routes.values():
+        validate_config_requirements(data_type, metric_config, route.config)
+    if covariate_col is not None and (statistic != 'mean'
+                                      or any(route.config.get('sample_required', False) for route in routes.values())):
+        raise ValueError(f"CUPED (covariate_col) поддерживается только для средних (statistic='mean'), "
+                         f"получено: {data_type}/{statistic}")
+
+    return AnalysisPlan(
+        data_type=data_type,
+        group_col=group_col,
+        metric_col=metric_col,
+        statistic=statistic,
+        dependency=dependency,
+        significance_level=significance_level,
+        confidence_level=confidence_level,
+        metric_config=metric_config,
+        sequential=sequential,
+        covariate_col=covariate_col,
+        routes=MappingProxyType(routes)
+    )
@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def mixture_variance(var1, var2, mixing_sd):
+    """Variance tau^2 of the normal mixture over the effect, in units of the metric variance.
+
+    mixing_sd is the prior standard deviation of the effect relative to the metric
+    standard deviation (0.1 = effects around a tenth of a standard deviation).
+    """
+    return mixing_sd ** 2 * (np.asarray(var1, dtype=float) + np.asarray(var2, dtype=float)) / 2
+
+
+def msprt_log_likelihood_ratio(difference, variance, tau_sq):
+    """Log of the normal-mixture likelihood ratio of mSPRT for H0: effect = 0.
+
+    difference: estimated effect, variance: its sampling variance, tau_sq: mixture variance.
+    Lambda = sqrt(V / (V + tau^2)) * exp(d^2 * tau^2 / (2 * V * (V + tau^2))).
+
+    https://arxiv.org/abs/1512.04922
+    """
+    difference = np.asarray(difference, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (0.5 * np.log(variance / (variance + tau_sq))
+                + difference ** 2 * tau_sq / (2 * variance * (variance + tau_sq)))
+
+
+def msprt_radius(variance, tau_sq, alpha):
+    """Half-width of the always-valid confidence sequence: effects with Lambda < 1/alpha.
+
+    https://arxiv.org/abs/1512.04922
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(variance * (variance + tau_sq) / tau_sq
+                       * (2 * np.log(1 / alpha) + np.log((variance + tau_sq) / variance)))
@@ -1,16 +1,28 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-import statsmodels.stats.api as sms
 from . import corrections
+from .group_stats import moments_mean_var, group_pairs
+from .sequential import mixture_variance, msprt_log_likelihood_ratio
+from .bootstrap import group_samples_of, weighted_quantile, bootstrap_quantile_difference, replicate_pvalue
+from .sketches import pair_quantiles, sketch_quantile_difference
 
 
-def welch_ttest(group1_data, group2_data, significance_level=0.01):
+def welch_ttest(group1_stats, group2_stats, significance_level=0.01):
     """Welch's t-test for two independent groups with unequal variances.
-    
-    https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.ttest_ind.html
+
+    Computed from group sufficient statistics (count, sum, m2).
+
+    https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.ttest_ind_from_stats.html
     """
-    statistic, pvalue = stats.ttest_ind(group1_data, group2_data, equal_var=False)
+    from scipy import stats
+
+    mean1, var1 = moments_mean_var(group1_stats)
+    mean2, var2 = moments_mean_var(group2_stats)
+    statistic, pvalue = stats.ttest_ind_from_stats(
+        mean1, np.sqrt(var1), group1_stats['count'],
+        mean2, np.sqrt(var2), group2_stats['count'],
+        equal_var=False
+    )
     significant = pvalue < significance_level
     return {
         'statistic': statistic,
@@ -19,14 +31,51 @@ def welch_ttest(group1_data, group2_data, significance_level=0.01):
     }
 
 
-def anova_test(dataframe, group_col, metric_col, significance_level=0.01):
-    """One-way ANOVA test for multiple groups.
-    
+def anova_test(group_stats, significance_level=0.01):
+    """One-way ANOVA test for multiple groups from group sufficient statistics.
+
     https://www.statsmodels.org/stable/generated/statsmodels.stats.oneway.anova_oneway.html
     https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.f_oneway.html
     """
-    groups = [group_data[metric_col].values for name, group_data in dataframe.groupby(group_col)]
-    statistic, pvalue = stats.f_oneway(*groups)
+    from scipy import stats
+
+    count = group_stats['count'].to_numpy(dtype=float)
+    mean, _ = moments_mean_var(group_stats)
+    grand_mean = group_stats['sum'].sum() / count.sum()
+
+    ss_between = np.sum(count * (mean - grand_mean) ** 2)
+    ss_within = group_stats['m2'].sum()
+    df_between = len(count) - 1
+    df_within = count.sum() - len(count)
+
+    statistic = (ss_between / df_between) / (ss_within / df_within)
+    pvalue = stats.f.sf(statistic, df_between, df_within)
+    significant = pvalue < significance_level
+    return {
+        'statistic': statistic,
+        'pvalue': pvalue,
+        'significant': significant
+    }
+
+
+def msprt_test(group1_stats, group2_stats, significance_level=0.01, mixing_sd=0.1):
+    """Mixture sequential probability ratio test (mSPRT) for difference of means.
+
+    Always-valid: the p-value may be checked after every update of the data
+    (hourly, daily) without inflating the false positive rate. Computed from
+    group sufficient statistics only, O(1) per pair and look. statistic is the
+    log of the mixture likelihood ratio, pvalue = min(1, 1 / likelihood ratio).
+    The running minimum of pvalue over looks is also always-valid.
+
+    https://arxiv.org/abs/1512.04922
+    """
+    mean1, var1 = moments_mean_var(group1_stats)
+    mean2, var2 = moments_mean_var(group2_stats)
+    variance = var1 / np.asarray(group1_stats['count'], dtype=float) + var2 / np.asarray(group2_stats['count'], dtype=float)
+    tau_sq = mixture_variance(var1, var2, mixing_sd)
+
+    statistic = msprt_log_likelihood_ratio(mean1 - mean2, variance, tau_sq)
+    pvalue = np.minimum(1.0, np.exp(-statistic))
     significant = pvalue < significance_level
     return {
         'statistic': statistic,
@@ -35,60 +84,103 @@ def anova_test(dataframe, group_col, metric_col, significance_level=0.01):
     }
 
 
-def pairwise_tests_with_correction(dataframe, group_col, metric_col, test_func, 
-                                  correction_method, significance_level=0.01):
-    """Perform pairwise tests with multiple comparison correction."""
-    groups = sorted(dataframe[group_col].unique())
-    results = []
-    pvalues = []
-    
-    for i in range(len(groups)):
-        for j in range(i+1, len(groups)):
-            group1_data = dataframe[dataframe[group_col] == groups[i]][metric_col]
-            group2_data = dataframe[dataframe[group_col] == groups[j]][metric_col]
-            
-            test_result = test_func(group1_data, group2_data, significance_level)
-            pvalues.append(test_result['pvalue'])
-            
-            results.append({
-                'group1': groups[i],
-                'group1_count': len(group1_data),
-                'group2': groups[j],
-                'group2_count': len(group2_data),
-                'statistic': test_result['statistic'],
-                'pvalue': test_result['pvalue']
-            })
-    
+def bootstrap_test(group1_stats, group2_stats, significance_level=0.01, quantile=0.5,
+                   n_resamples=2000, seed=42, n_jobs=1, memory_budget_mb=256, session=None):
+    """Two-sided Poisson bootstrap test for difference of quantiles (median, p90, ...).
+
+    Needs per-group samples ('values', 'weights' columns, see compute_group_samples).
+    statistic is quantile1 - quantile2, pvalue is twice the smaller share of
+    bootstrap replicates on either side of zero, ties counted half on each
+    side (replicate_pvalue). session: ResamplingSession of the analysis, shares
+    replicates with bootstrap_diff_ci and one process pool for n_jobs > 1.
+
+    https://arxiv.org/abs/1602.05822
+    """
+    statistic = np.array([
+        weighted_quantile(values1, weights1, quantile) - weighted_quantile(values2, weights2, quantile)
+        for (values1, weights1), (values2, weights2)
+        in zip(group_samples_of(group1_stats), group_samples_of(group2_stats))
+    ])
+    replicates = bootstrap_quantile_difference(group1_stats, group2_stats, quantile, n_resamples,
+                                               seed, n_jobs, memory_budget_mb, session)
+    pvalue = replicate_pvalue(replicates)
+    significant = pvalue < significance_level
+    return {
+        'statistic': statistic,
+        'pvalue': pvalue,
+        'significant': significant
+    }
+
+
+def sketch_quantile_test(group1_stats, group2_stats, significance_level=0.01, quantile=0.5,
+                         n_resamples=2000, seed=42, session=None):
+    """Two-sided test for difference of quantiles from per-group sketches (continuous data).
+
+    statistic is quantile1 - quantile2 of the sketches, pvalue is twice the
+    smaller share of replicates (sketch_quantile_replicates) on either side of
+    zero, as in bootstrap_test. Cost depends on sketch size, not on rows.
+    session: ResamplingSession shared with sketch_quantile_diff_ci.
+    """
+    statistic = pair_quantiles(group1_stats, quantile) - pair_quantiles(group2_stats, quantile)
+    replicates = sketch_quantile_difference(group1_stats, group2_stats, quantile, n_resamples, seed, session)
+    pvalue = replicate_pvalue(replicates)
+    significant = pvalue < significance_level
+    return {
+        'statistic': statistic,
+        'pvalue': pvalue,
+        'significant': significant
+    }
+
+
+def pairwise_tests_with_correction(group_stats, test_func,
+                                  correction_method, significance_level=0.01, test_params=None):
+    """Perform pairwise tests with multiple comparison correction.
+
+    All K*(K-1)/2 pairs are tested at once: test_func receives arrays of
+    per-pair statistics and the correction is applied to the whole p-value vector.
+    correction_method: correction function, its name in corrections.py or None.
+    test_params: extra keyword arguments for test_func (route 'test_params').
+    """
+    groups1, groups2, group1_stats, group2_stats = group_pairs(group_stats)
+    test_result = test_func(group1_stats, group2_stats, significance_level, **(test_params or {}))
+    pvalues = np.asarray(test_result['pvalue'], dtype=float)
+
+    results = pd.DataFrame({
+        'group1': groups1,
+        'group1_count': group1_stats['count'],
+        'group2': groups2,
+        'group2_count': group2_stats['count'],
+        'statistic': test_result['statistic'],
+        'pvalue': pvalues
+    })
+
     if correction_method:
-        correction_func = getattr(corrections, f"{correction_method}_correction")
-        corrected_pvalues = correction_func(pvalues, len(groups), significance_level)
-        for i, result in enumerate(results):
-            result['corrected_pvalue'] = corrected_pvalues[i]
-            result['significant'] = corrected_pvalues[i] < significance_level
+        if callable(correction_method):
+            correction_func = correction_method
+        else:
+            correction_func = getattr(corrections, f"{correction_method}_correction")
+        corrected_pvalues = np.asarray(correction_func(pvalues, len(group_stats), significance_level))
+        results['corrected_pvalue'] = corrected_pvalues
+        results['significant'] = corrected_pvalues < significance_level
     else:
-        for result in results:
-            result['significant'] = result['pvalue'] < significance_level
-    
-    return pd.DataFrame(results)
+        results['significant'] = pvalues < significance_level
+
+    return results
 
 
-def chi2_test(dataframe, group_col, metric_col, significance_level=0.01):
+def chi2_test(group_stats, significance_level=0.01):
     """Chi-square test of independence for multiple groups (omnibus test).
 
-    Works with transformed individual binary data (0s and 1s) by recreating aggregated counts.
+    Works with per-group trials (count) and successes (sum).
 
     https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.chi2_contingency.html
     """
     from scipy.stats import chi2_contingency
 
-    # Create contingency table from individual binary data: rows=groups, cols=[failures, successes]
-    contingency_table = []
-
-    for group in sorted(dataframe[group_col].unique()):
-        group_data = dataframe[dataframe[group_col] == group][metric_col]
-        successes = int(sum(group_data))  # Count of 1s
-        failures = int(len(group_data) - sum(group_data))  # Count of 0s
-        contingency_table.append([failures, successes])
+    # Contingency table: rows=groups, cols=[failures, successes]
+    successes = group_stats['sum'].to_numpy(dtype=np.int64)
+    failures = group_stats['count'].to_numpy(dtype=np.int64) - successes
+    contingency_table = np.column_stack([failures, successes])
 
     chi2_stat, p_value, dof, expected = chi2_contingency(contingency_table)
 
@@ -98,4 +190,4 @@ def chi2_test(dataframe, group_col, metric_col, significance_level=0.01):
         'statistic': chi2_stat,
         'pvalue': p_value,
         'significant': significant
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+from .accumulators import make_accumulator, accumulator_group_stats
+from .validations import validate_group_stats
+
+
+def iter_chunks(source, columns=None, chunksize=1_000_000):
+    """Yield DataFrame chunks from a CSV/Parquet path or an iterable of DataFrames.
+
+    Only the requested columns are read from files. Parquet requires pyarrow.
+
+    https://pandas.pydata.org/docs/reference/api/pandas.read_csv.html
+    https://arrow.apache.org/docs/python/generated/pyarrow.parquet.ParquetFile.html
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.endswith(('.parquet', '.pq')):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Для чтения Parquet требуется pyarrow: pip install pyarrow")
+
+            parquet_file = pq.ParquetFile(path)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            with pd.read_csv(path, usecols=columns, chunksize=chunksize) as reader:
+                yield from reader
+    else:
+        yield from source
+
+
+def stream_group_stats(source, data_type, group_col, metric_col=None, metric_config=None, chunksize=1_000_000,
+                       sample_required=False, covariate_col=None):
+    """Accumulate per-group sufficient statistics chunk by chunk.
+
+    Each chunk is validated, reduced to per-group statistics and merged into the
+    running state (Chan update), so memory depends on chunk size and number of
+    groups, not on total rows. sample_required: keep a frequency table per group
+    (memory grows with distinct values) and join per-group samples.
+    covariate_col: also accumulate covariate moments and co-moments (CUPED).
+    """
+    if data_type == 'binary_agg':
+        columns = [group_col, metric_config['trials_col_name'], metric_config['successes_col_name']]
+    else:
+        columns = [group_col, metric_col] + ([covariate_col] if covariate_col is not None else [])
+
+    accumulator = make_accumulator(data_type, group_col, metric_col, metric_config, sample_required, covariate_col)
+    for chunk in iter_chunks(source, columns, chunksize):
+        accumulator.update(chunk)
+
+    group_stats = accumulator_group_stats(accumulator, sample_required)
+    validate_group_stats(group_stats)
+    return group_stats
@@ -1,17 +1,25 @@
 import pandas as pd
 import numpy as np
+from .group_stats import factorize_groups
 
 
-def aggregate_to_individual_binary(dataframe, group_col, metric_config):
-    """Convert aggregated binary data to individual 0/1 observations for t-test.
+def aggregate_binary_counts(dataframe, group_col, metric_config, codes=None, groups=None):
+    """Convert aggregated binary data to per-group sufficient statistics.
+
+    Rows of the same group are summed, so the result holds one row per group
+    regardless of the number of users behind the counts. For 0/1 outcomes the
+    sufficient statistics are fully defined by trials and successes:
+    count = trials, sum = successes, m2 = successes * failures / trials,
+    min/max are 0 or 1 depending on presence of failures/successes.
 
     Args:
         dataframe: DataFrame with aggregated binary data
         group_col: Column name containing group identifiers
         metric_config: Dict with 'trials_col_name' and 'successes_col_name'
+        codes, groups: pre-computed factorize_groups() result (e.g. from validation)
 
     Returns:
-        DataFrame with individual binary observations
+        DataFrame indexed by sorted group names with columns count, sum, m2, min, max
 
     Example:
         Input:
@@ -21,30 +29,26 @@ def aggregate_to_individual_binary(dataframe, group_col, metric_config):
         | B     | 150   | 45          |
 
         Output:
-        | group | binary_outcome |
-        |-------|----------------|
-        | A     | 1              |
-        | A     | 1              |
-        | ...   | ...            |
-        | A     | 0              |
-        | B     | 1              |
-        | ...   | ...            |
-
-    https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.html
-    """
-    individual_data = []
-
-    for _, row in dataframe.iterrows():
-        group = row[group_col]
-        successes = int(row[metric_config['successes_col_name']])
-        trials = int(row[metric_config['trials_col_name']])
-        failures = trials - successes
+        | group | count | sum  | m2    | min | max |
+        |-------|-------|------|-------|-----|-----|
+        | A     | 100   | 20.0 | 16.0  | 0.0 | 1.0 |
+        | B     | 150   | 45.0 | 31.5  | 0.0 | 1.0 |
 
-        # Create individual observations: 1s for successes, 0s for failures
-        group_data = [1] * successes + [0] * failures
-
-        # Add to result with group labels
-        for outcome in group_data:
-            individual_data.append({group_col: group, 'binary_outcome': outcome})
-
-    return pd.DataFrame(individual_data)
\ No newline at end of file
+    https://numpy.org/doc/stable/reference/generated/numpy.bincount.html
+    """
+    trials_col = metric_config['trials_col_name']
+    successes_col = metric_config['successes_col_name']
+
+    if codes is None:
+        codes, groups = factorize_groups(dataframe, group_col)
+    trials = np.bincount(codes, weights=dataframe[trials_col].to_numpy(dtype=float),
+                         minlength=len(groups)).astype(np.int64)
+    successes = np.bincount(codes, weights=dataframe[successes_col].to_numpy(dtype=float), minlength=len(groups))
+
+    return pd.DataFrame({
+        'count': trials,
+        'sum': successes,
+        'm2': successes * (trials - successes) / trials,
+        'min': np.where(successes < trials, 0.0, 1.0),
+        'max': np.where(successes > 0, 1.0, 0.0)
+    }, index=pd.Index(groups, name=group_col))
@@ -1,7 +1,19 @@
-import json
-import os
 import pandas as pd
 import numpy as np
+from .routing import load_methods_route, get_route
+from .group_stats import factorize_groups
+
+
+def has_missing(series):
+    """NaN check with one min() reduction (NaN propagates through min) instead of a boolean mask.
+
+    NumPy integer and bool columns cannot hold NaN and are not scanned.
+
+    https://numpy.org/doc/stable/reference/generated/numpy.nanmin.html
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iub':
+        return False
+    return bool(np.isnan(np.min(series.to_numpy(dtype=float, na_value=np.nan))))
 
 
 def validate_dataframe(dataframe):
@@ -47,7 +59,7 @@ def validate_metric_column_type(dataframe, metric_col, data_type):
         if not pd.api.types.is_numeric_dtype(dataframe[metric_col]):
             raise ValueError(f"Колонка '{metric_col}' должна содержать численные данные (int или float) для типа '{data_type}', получен тип {dataframe[metric_col].dtype}")
         
-        if dataframe[metric_col].isna().any():
+        if has_missing(dataframe[metric_col]):
             raise ValueError(f"Колонка '{metric_col}' содержит пропущенные значения (NaN)")
 
 
@@ -60,6 +72,22 @@ def validate_group_column(dataframe, group_col):
         raise ValueError(f"Колонка с группами '{group_col}' содержит пропущенные значения (NaN)")
     
     unique_groups = dataframe[group_col].nunique()
+    validate_group_count(unique_groups)
+
+
+def validate_group_codes(codes, groups, group_col):
+    """Validate factorized group column: no NaN (code -1), 2..10 groups.
+
+    Every factorized group has at least one row, so no separate size check is needed.
+    """
+    if len(codes) and codes.min() < 0:
+        raise ValueError(f"Колонка с группами '{group_col}' содержит пропущенные значения (NaN)")
+
+    validate_group_count(len(groups))
+
+
+def validate_group_count(unique_groups):
+    """Validate number of groups is between 2 and 10."""
     if unique_groups < 2:
         raise ValueError(f"Недостаточно групп для сравнения: {unique_groups}. Минимум 2 группы")
     
@@ -68,13 +96,11 @@ def validate_group_column(dataframe, group_col):
 
 
 def validate_parameters(data_type, statistic, dependency):
-    """Validate parameter values against JSON configuration.
+    """Validate parameter values against JSON configuration (cached routing table).
     
     https://docs.python.org/3/library/json.html
     """
-    json_path = os.path.join(os.path.dirname(__file__), '..', '..', 'methods_route.json')
-    with open(json_path, 'r') as f:
-        methods_route = json.load(f)
+    methods_route = load_methods_route()
     
     available_data_types = list(methods_route.keys())
     if data_type not in available_data_types:
@@ -142,19 +168,153 @@ def validate_binary_agg_data(dataframe, metric_config):
     if not pd.api.types.is_numeric_dtype(dataframe[successes_col]):
         raise ValueError(f"Колонка successes '{successes_col}' должна содержать численные данные")
     
-    if (dataframe[trials_col] < 0).any():
+    # One min() per column and one for trials - successes instead of six masks
+    trials = dataframe[trials_col].to_numpy(dtype=float, na_value=np.nan)
+    successes = dataframe[successes_col].to_numpy(dtype=float, na_value=np.nan)
+    trials_min = np.min(trials)
+    successes_min = np.min(successes)
+    if trials_min < 0:
         raise ValueError(f"Колонка trials '{trials_col}' не может содержать отрицательные значения")
     
-    if (dataframe[successes_col] < 0).any():
+    if successes_min < 0:
         raise ValueError(f"Колонка successes '{successes_col}' не может содержать отрицательные значения")
     
-    if (dataframe[successes_col] > dataframe[trials_col]).any():
+    if np.min(trials - successes) < 0:
         raise ValueError(f"Количество успехов не может превышать количество попыток: successes <= trials")
     
-    if (dataframe[trials_col] == 0).any():
+    if trials_min == 0:
         raise ValueError(f"Колонка trials '{trials_col}' не может содержать нулевые значения")
 
 
+def validate_weight_column(dataframe, weight_col, data_type, row_checks=True):
+    """Validate frequency weights: numeric, no NaN, non-negative integers (discrete data only).
+
+    A row stands for weight_col identical observations, so fractional weights are rejected.
+
+    row_checks=False: only the data type and the column are checked (trusted input).
+
+    https://pandas.pydata.org/docs/reference/api/pandas.api.types.is_numeric_dtype.html
+    """
+    if data_type != 'discrete':
+        raise ValueError(f"weight_col поддерживается только для типа 'discrete', получен: '{data_type}'")
+
+    if weight_col not in dataframe.columns:
+        raise ValueError(f"Колонка с весами '{weight_col}' не найдена. Доступные колонки: {dataframe.columns.tolist()}")
+
+    if not row_checks:
+        return
+
+    if not pd.api.types.is_numeric_dtype(dataframe[weight_col]):
+        raise ValueError(f"Колонка с весами '{weight_col}' должна содержать численные данные")
+
+    weights = dataframe[weight_col].to_numpy(dtype=float, na_value=np.nan)
+    weights_min = np.min(weights)
+    if np.isnan(weights_min):
+        raise ValueError(f"Колонка с весами '{weight_col}' содержит пропущенные значения (NaN)")
+
+    if weights_min < 0:
+        raise ValueError(f"Колонка с весами '{weight_col}' не может содержать отрицательные значения")
+
+    if not pd.api.types.is_integer_dtype(dataframe[weight_col]) and np.any(np.mod(weights, 1) != 0):
+        raise ValueError(f"Колонка с весами '{weight_col}' должна содержать целые числа "
+                         f"(количество одинаковых наблюдений в строке)")
+
+
+def validate_covariate_column(dataframe, covariate_col, data_type, row_checks=True):
+    """Validate CUPED covariate: present, numeric, no NaN (same rules as the metric column)."""
+    if covariate_col not in dataframe.columns:
+        raise ValueError(f"Колонка с ковариатой '{covariate_col}' не найдена. Доступные колонки: {dataframe.columns.tolist()}")
+
+    if row_checks:
+        validate_metric_column_type(dataframe, covariate_col, data_type)
+
+
+def validate_chunk(chunk, data_type, group_col, metric_col, metric_config=None, covariate_col=None):
+    """Row-level validation of one chunk of streamed data.
+    
+    Group count and sample sizes are checked on accumulated statistics (validate_group_stats).
+    """
+    validate_dataframe(chunk)
+    
+    validate_required_columns(chunk, group_col, metric_col, data_type, metric_config)
+    
+    if data_type != 'binary_agg':
+        validate_metric_column_type(chunk, metric_col, data_type)
+    
+    if covariate_col is not None:
+        validate_covariate_column(chunk, covariate_col, data_type)
+    
+    if chunk[group_col].isna().any():
+        raise ValueError(f"Колонка с группами '{group_col}' содержит пропущенные значения (NaN)")
+    
+    if data_type == 'binary_agg' and metric_config:
+        validate_binary_agg_data(chunk, metric_config)
+
+
+def validate_group_stats(group_stats, min_sample_size=1):
+    """Validate number of groups and group sizes on per-group statistics."""
+    validate_group_count(len(group_stats))
+    
+    group_sizes = group_stats['count']
+    empty_groups = group_sizes[group_sizes < min_sample_size]
+    if len(empty_groups) > 0:
+        empty_group_info = empty_groups.to_dict()
+        raise ValueError(f"Пустые группы найдены: {empty_group_info}. Каждая группа должна содержать хотя бы 1 наблюдение")
+
+
+def validate_rows(
+        dataframe,
+        data_type,
+        group_col,
+        metric_col=None,
+        metric_config=None,
+        weight_col=None,
+        codes=None,
+        groups=None,
+        trusted=False,
+        covariate_col=None
+    ):
+    """Row-level validation in one pass per column; returns (codes, groups) for the analysis.
+
+    The group column is factorized once and the codes are reused by the
+    per-group statistics: NaN groups get code -1 and the number of groups is
+    len(groups), so nunique() and groupby().size() scans are not needed.
+    NaN and range checks are one min() reduction per column.
+    trusted=True (validated warehouse tables): only columns and the number of
+    groups are checked, row-level checks are skipped.
+
+    https://pandas.pydata.org/docs/reference/api/pandas.factorize.html
+    """
+    validate_dataframe(dataframe)
+
+    validate_required_columns(dataframe, group_col, metric_col, data_type, metric_config)
+
+    if weight_col is not None:
+        validate_weight_column(dataframe, weight_col, data_type, row_checks=not trusted)
+
+    if covariate_col is not None:
+        if weight_col is not None:
+            raise ValueError("CUPED (covariate_col) не поддерживается для частотных таблиц (weight_col)")
+        validate_covariate_column(dataframe, covariate_col, data_type, row_checks=not trusted)
+
+    if codes is None:
+        codes, groups = factorize_groups(dataframe, group_col)
+
+    if trusted:
+        validate_group_count(len(groups))
+        return codes, groups
+
+    if data_type != 'binary_agg':
+        validate_metric_column_type(dataframe, metric_col, data_type)
+
+    validate_group_codes(codes, groups, group_col)
+
+    if data_type == 'binary_agg' and metric_config:
+        validate_binary_agg_data(dataframe, metric_config)
+
+    return codes, groups
+
+
 def validate_inputs(
         dataframe, 
         data_type, 
@@ -163,38 +323,125 @@ def validate_inputs(
         statistic='mean', 
         dependency='independent',
         significance_level=0.01,
-        metric_config=None
+        metric_config=None,
+        weight_col=None,
+        codes=None,
+        groups=None,
+        trusted=False
     ):
-    """Main validation orchestrator function.
+    """Main validation orchestrator function: parameters, then validate_rows().
+
+    weight_col: rows are a frequency table, each row counts weight_col times.
+    Returns (codes, groups) of the factorized group column.
     
     https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.html
     """
-    validate_dataframe(dataframe)
+    validate_parameters(data_type, statistic, dependency)
     
-    validate_required_columns(dataframe, group_col, metric_col, data_type, metric_config)
+    if significance_level <= 0 or significance_level >= 1:
+        raise ValueError(f"Уровень значимости должен быть между 0 и 1, получен: {significance_level}")
     
-    if data_type != 'binary_agg':
-        validate_metric_column_type(dataframe, metric_col, data_type)
+    codes, groups = validate_rows(dataframe, data_type, group_col, metric_col, metric_config, weight_col,
+                                  codes, groups, trusted)
     
-    validate_group_column(dataframe, group_col)
+    test_config = get_route(data_type, len(groups), statistic, dependency).config
     
-    validate_parameters(data_type, statistic, dependency)
+    validate_config_requirements(data_type, metric_config, test_config)
+    return codes, groups
+
+
+def validate_many_inputs(
+        dataframe,
+        data_type,
+        group_col,
+        metric_cols,
+        statistic='mean',
+        dependency='independent',
+        significance_level=0.01,
+        trusted=False
+    ):
+    """Validation for analyze_many(): group column factorized once, each metric column by type.
+
+    Returns (codes, groups) of the factorized group column.
     
-    if significance_level <= 0 or significance_level >= 1:
-        raise ValueError(f"Уровень значимости должен быть между 0 и 1, получен: {significance_level}")
+    https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.html
+    """
+    validate_dataframe(dataframe)
     
-    validate_sample_sizes(dataframe, group_col)
+    if data_type == 'binary_agg':
+        raise ValueError("analyze_many() работает с метриками в колонках: 'binary_agg' не поддерживается, используйте analyze()")
     
-    unique_grps_cnt = dataframe[group_col].nunique()
-    group_key = "2" if unique_grps_cnt == 2 else "multiple"
+    if len(metric_cols) == 0:
+        raise ValueError("Не указаны метрики для анализа")
     
-    json_path = os.path.join(os.path.dirname(__file__), '..', '..', 'methods_route.json')
-    with open(json_path, 'r') as f:
-        methods_route = json.load(f)
+    for metric_col in metric_cols:
+        validate_required_columns(dataframe, group_col, metric_col, data_type)
+        if not trusted:
+            validate_metric_column_type(dataframe, metric_col, data_type)
     
-    test_config = methods_route[data_type][group_key][statistic][dependency]
+    validate_parameters(data_type, statistic, dependency)
     
-    validate_config_requirements(data_type, metric_config, test_config)
+    if significance_level <= 0 or significance_level >= 1:
+        raise ValueError(f"Уровень значимости должен быть между 0 и 1, получен: {significance_level}")
     
+    codes, groups = factorize_groups(dataframe, group_col)
+    if trusted:
+        validate_group_count(len(groups))
+    else:
+        validate_group_codes(codes, groups, group_col)
+    return codes, groups
+
+
+def validate_portfolio_rows(
+        dataframe,
+        data_type,
+        key_cols,
+        group_col,
+        metric_col=None,
+        metric_config=None,
+        weight_col=None,
+        trusted=False
+    ):
+    """Row-level validation for analyze_portfolio(): experiment and segment columns plus validate_rows() checks.
+
+    The number of groups is checked per experiment on the factorized cells
+    (validate_experiment_groups), not over the whole group column.
+    """
+    validate_dataframe(dataframe)
+
+    missing = [col for col in key_cols if col not in dataframe.columns]
+    if missing:
+        raise ValueError(f"Колонки экспериментов/сегментов {missing} не найдены. Доступные колонки: {dataframe.columns.tolist()}")
+
+    validate_required_columns(dataframe, group_col, metric_col, data_type, metric_config)
+
+    if weight_col is not None:
+        validate_weight_column(dataframe, weight_col, data_type, row_checks=not trusted)
+
+    if trusted:
+        return
+
+    if data_type != 'binary_agg':
+        validate_metric_column_type(dataframe, metric_col, data_type)
+
     if data_type == 'binary_agg' and metric_config:
-        validate_binary_agg_data(dataframe, metric_config)
\ No newline at end of file
+        validate_binary_agg_data(dataframe, metric_config)
+
+
+def validate_experiment_groups(column_codes, keys, cell_experiment):
+    """Validate factorized portfolio: no NaN keys or groups, 2..10 groups in every experiment (slice).
+
+    column_codes, keys: factorize_cells() result. Codes are already computed,
+    so the checks are cheap and run for trusted data too.
+    """
+    for col, codes in column_codes.items():
+        if len(codes) and codes.min() < 0:
+            raise ValueError(f"Колонка '{col}' содержит пропущенные значения (NaN)")
+
+    sizes = np.bincount(cell_experiment)
+    invalid = np.flatnonzero((sizes < 2) | (sizes > 10))
+    if len(invalid):
+        names = list(zip(*keys.values())) if len(keys) > 1 else next(iter(keys.values()), [None] * len(sizes))
+        details = {names[idx]: int(sizes[idx]) for idx in invalid[:10]}
+        raise ValueError(f"В каждом эксперименте (срезе) должно быть от 2 до 10 групп. Число групп вне диапазона "
+                         f"({len(invalid)}): {details}")
@@ -1,11 +1,126 @@
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import numpy as np
+import pandas as pd
+from .bootstrap import weighted_quantile
+from .group_stats import MAX_FREQUENCY_SPAN, compute_frequency_table, compute_group_samples, frequency_weight_col
+from .sketches import QuantileSketch, compute_group_sketches
 
 
-def plot_discrete(dataframe, group_col, metric_col, bins=None):
-    groups = sorted(dataframe[group_col].unique())  
+MAX_HISTOGRAM_BINS = 60
+MAX_TICKS = 20
+
+
+def weighted_box_stats(values, weights):
+    """Tukey box plot statistics of a frequency table: quartiles and 1.5 IQR whiskers."""
+    order = np.argsort(values, kind='stable')
+    values = np.asarray(values, dtype=float)[order]
+    weights = np.asarray(weights, dtype=float)[order]
+    present = weights > 0
+    values, weights = values[present], weights[present]
+
+    q1, median, q3 = (weighted_quantile(values, weights, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'q1': [q1],
+        'median': [median],
+        'q3': [q3],
+        'lowerfence': [inside.min()],
+        'upperfence': [inside.max()]
+    }
+
+
+def sketch_box_stats(sketch):
+    """Tukey box plot statistics from a quantile sketch; whiskers are the 1.5 IQR fences within min/max."""
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return {
+        'q1': [q1],
+        'median': [median],
+        'q3': [q3],
+        'lowerfence': [max(q1 - 1.5 * iqr, sketch.min)],
+        'upperfence': [min(q3 + 1.5 * iqr, sketch.max)]
+    }
+
+
+def histogram_edges(x_min, x_max, integer_values, bins=None, max_bins=MAX_HISTOGRAM_BINS):
+    """Common bin edges for all groups.
+
+    Integer metrics get one bin per value while the range fits into max_bins,
+    otherwise integer-aligned bins of equal width; other metrics get
+    bins (or max_bins) equal-width bins between min and max.
+
+    https://numpy.org/doc/stable/reference/generated/numpy.histogram.html
+    """
+    n_bins = bins or max_bins
+    if integer_values:
+        width = max(1, int(np.ceil((x_max - x_min + 1) / n_bins)))
+        return np.arange(x_min - 0.5, x_max + width, width)
+    if x_max == x_min:
+        return np.array([x_min - 0.5, x_max + 0.5])
+    return np.linspace(x_min, x_max, n_bins + 1)
+
+
+def nice_tick_step(span, integer_values, max_ticks=MAX_TICKS):
+    """Tick step 1, 2, 5 x 10^k giving at most max_ticks ticks over span."""
+    raw_step = max(span, 1e-12) / max_ticks
+    magnitude = 10 ** np.floor(np.log10(raw_step))
+    step = next(multiple * magnitude for multiple in (1, 2, 5, 10) if multiple * magnitude >= raw_step)
+    return max(1, int(round(step))) if integer_values else float(step)
+
+
+def plot_discrete(dataframe, group_col, metric_col, bins=None, group_stats=None, weight_col=None, grouped=None):
+    """Histogram and box plot per group with statistics computed in NumPy.
+
+    Each group is reduced to a frequency table (sorted distinct values, counts):
+    bars are per-bin shares from np.histogram, boxes are Tukey statistics
+    (quartiles, 1.5 IQR whiskers) from weighted quantiles, so figure size
+    depends on the number of bins, not on the number of rows.
+    weight_col: dataframe is already a frequency table (value, count).
+    group_stats: per-group statistics; per-group samples ('values', 'weights'
+    columns) are used as is when present. grouped: GroupedData of dataframe
+    shared with the analysis, so rows are not put in group order again.
+    bins: number of histogram bins (default: one per integer value, up to MAX_HISTOGRAM_BINS).
+    """
+    if group_stats is not None and 'values' in group_stats.columns:
+        samples = group_stats[['values', 'weights']]
+    else:
+        if weight_col is None and pd.api.types.is_integer_dtype(dataframe[metric_col]):
+            # Count integer values in one bincount pass before sorting
+            table = compute_frequency_table(dataframe, group_col, metric_col, max_span=MAX_FREQUENCY_SPAN,
+                                            grouped=grouped)
+            if table is not None:
+                dataframe, weight_col, grouped = table, frequency_weight_col(group_col, metric_col), None
+        samples = compute_group_samples(dataframe, group_col, metric_col, weight_col, grouped=grouped)
+    groups = list(samples.index)
+
+    if group_stats is not None:
+        x_min = group_stats['min'].min()
+        x_max = group_stats['max'].max()
+    else:
+        x_min = min(values.min() for values in samples['values'])
+        x_max = max(values.max() for values in samples['values'])
+    integer_values = all(np.all(np.mod(values, 1) == 0) for values in samples['values'])
+    edges = histogram_edges(x_min, x_max, integer_values, bins)
+
+    shares, boxes = [], []
+    for group in groups:
+        values, weights = samples.loc[group, 'values'], samples.loc[group, 'weights']
+        bin_counts, _ = np.histogram(values, bins=edges, weights=weights)
+        shares.append(bin_counts / weights.sum())
+        boxes.append(weighted_box_stats(values, weights))
+    return distribution_figure(metric_col, groups, edges, shares, boxes, x_min, x_max, integer_values)
+
+
+def distribution_figure(metric_col, groups, edges, shares, boxes, x_min, x_max, integer_values):
+    """Overlaid histograms (per-bin shares) and horizontal box plots of groups on a shared x axis."""
+    # plotly is imported on first plot: headless runs never load it
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     colors = px.colors.qualitative.Dark24[:len(groups)]
+    centers = (edges[:-1] + edges[1:]) / 2
+    widths = np.diff(edges)
     
     fig = make_subplots(
         rows=2, cols=1,
@@ -15,67 +130,48 @@ def plot_discrete(dataframe, group_col, metric_col, bins=None):
     )
     
     for i, group in enumerate(groups):
-        group_data = dataframe[dataframe[group_col] == group][metric_col]
-        
-        histogram_kwargs = {
-            'x': group_data,
-            'name': f'Группа {group}',
-            'legendgroup': f'group_{group}',
-            'histnorm': 'probability',
-            'marker_color': colors[i],
-            'opacity': 0.35,
-            'showlegend': True
-        }
-        
-        if bins is not None:
-            histogram_kwargs['nbinsx'] = bins
-            
-        fig.add_trace(go.Histogram(**histogram_kwargs), row=1, col=1)
+        fig.add_trace(go.Bar(
+            x=centers,
+            y=shares[i],
+            width=widths,
+            name=f'Группа {group}',
+            legendgroup=f'group_{group}',
+            marker_color=colors[i],
+            opacity=0.35,
+            showlegend=True
+        ), row=1, col=1)
     
-    max_sample_size = 5000
-    for i, group in enumerate(reversed(groups)):
+    for group in reversed(groups):
         idx = groups.index(group)
-        group_data = dataframe[dataframe[group_col] == group][metric_col]
-        
-        if len(group_data) > max_sample_size:
-            group_data = group_data.sample(n=max_sample_size, random_state=42)
-        
         fig.add_trace(go.Box(
-            x=group_data,
+            y=[f'Группа {group}'],
             name=f'Группа {group}',
             legendgroup=f'group_{group}',
             marker_color=colors[idx],
             opacity=0.35,
             showlegend=False,
-            x0=0,
-            alignmentgroup=True
+            orientation='h',
+            alignmentgroup=True,
+            **boxes[idx]
         ), row=2, col=1)
     
     fig.update_xaxes(title_text=metric_col, row=2, col=1)
     fig.update_yaxes(title_text="Вероятность", row=1, col=1)
     
-    all_data = dataframe[metric_col]
-    x_min = all_data.min()
-    x_max = all_data.max()
     x_range_start = x_min - 0.1 if x_min == 0 else x_min - 0.5
-    x_range = [x_range_start, x_max + 0.5]
+    x_range = [min(x_range_start, edges[0]), max(x_max + 0.5, edges[-1])]
+    tick_step = nice_tick_step(x_max - x_min, integer_values)
+    tick0 = np.floor(x_min / tick_step) * tick_step
     
-    fig.update_xaxes(
-        range=x_range, 
-        autorange=False,
-        showticklabels=True,
-        tick0=x_min,
-        dtick=1,
-        row=1, col=1
-    )
-    fig.update_xaxes(
-        range=x_range, 
-        autorange=False,
-        showticklabels=True,
-        tick0=x_min,
-        dtick=1,
-        row=2, col=1
-    )
+    for row in [1, 2]:
+        fig.update_xaxes(
+            range=x_range, 
+            autorange=False,
+            showticklabels=True,
+            tick0=tick0,
+            dtick=tick_step,
+            row=row, col=1
+        )
     
     fig.update_xaxes(domain=[0.01, 1], row=1, col=1)
     fig.update_xaxes(domain=[0.0, 1], row=2, col=1)
@@ -84,6 +180,7 @@ def plot_discrete(dataframe, group_col, metric_col, bins=None):
             title=f'Анализ распределения {metric_col} по группам',
             template='plotly_white',
             barmode='overlay',
+            bargap=0,
             boxgap=0.3,
             legend=dict(
                 orientation="h",
@@ -97,21 +194,55 @@ def plot_discrete(dataframe, group_col, metric_col, bins=None):
     return fig
 
 
-def plot_binary_agg(dataframe, group_col, metric_col, **kwargs):
+def plot_continuous(dataframe, group_col, metric_col, bins=None, group_stats=None, weight_col=None, grouped=None):
+    """Histogram and box plot per group from quantile sketches (continuous data).
+
+    Bin shares are differences of the sketch CDF at bin edges and boxes are
+    sketch quartiles, so the figure needs only the sketches: it is drawn for
+    streamed, merged or restored statistics as well, in memory bounded by
+    sketch size. group_stats: per-group statistics; the 'sketch' column (or
+    per-group samples 'values', 'weights') is used when present, otherwise
+    sketches are built from dataframe rows (grouped: shared GroupedData).
+    bins: number of equal-width histogram bins (default MAX_HISTOGRAM_BINS).
+    """
+    if group_stats is not None and 'sketch' in group_stats.columns:
+        sketches = group_stats['sketch']
+    elif group_stats is not None and 'values' in group_stats.columns:
+        sketches = pd.Series([QuantileSketch.from_values(values, weights)
+                              for values, weights in zip(group_stats['values'], group_stats['weights'])],
+                             index=group_stats.index)
+    else:
+        sketches = compute_group_sketches(dataframe, group_col, metric_col, grouped=grouped)['sketch']
+    sketches = sketches.sort_index()
+    groups = list(sketches.index)
+
+    x_min = min(sketch.min for sketch in sketches)
+    x_max = max(sketch.max for sketch in sketches)
+    edges = histogram_edges(x_min, x_max, False, bins)
+
+    shares, boxes = [], []
+    for sketch in sketches:
+        mass = np.diff(sketch.cdf(edges))
+        shares.append(mass / mass.sum())
+        boxes.append(sketch_box_stats(sketch))
+    return distribution_figure(metric_col, groups, edges, shares, boxes, x_min, x_max, False)
+
+
+def plot_binary_agg(dataframe, group_col, metric_col=None, group_stats=None, **kwargs):
     """
     Binary aggregated data visualization with stacked bar chart.
 
-    Input: Transformed individual binary data (0/1 values)
-    Process: Reconstruct aggregated format internally
+    Input: Per-group sufficient statistics (count = trials, sum = successes);
+           the raw dataframe is not scanned
     Output: Stacked bar chart showing conversion rates by group
     """
+    import plotly.express as px
+    import plotly.graph_objects as go
 
-    # Reconstruct aggregated data from transformed individual binary data
     groups_data = []
-    for group in sorted(dataframe[group_col].unique()):
-        group_data = dataframe[dataframe[group_col] == group][metric_col]
-        total_users = len(group_data)
-        conversions = sum(group_data)  # Sum of 1s = conversions
+    for group, row in group_stats.sort_index().iterrows():
+        total_users = int(row['count'])
+        conversions = int(row['sum'])
         failures = total_users - conversions
         groups_data.append({
             'group': group,
@@ -0,0 +1,860 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+import io
+import contextlib
+import tempfile
+sys.path.append('dgab')
+
+from scipy import stats
+import statsmodels.stats.api as sms
+from dgab.utils.transformations import aggregate_binary_counts
+from dgab.utils.group_stats import compute_group_stats
+from dgab.utils.stat_tests import welch_ttest, anova_test, chi2_test, pairwise_tests_with_correction
+from dgab.utils.confints import t_ci, welch_ci
+import dgab
+
+np.random.seed(42)
+
+binary_agg = pd.DataFrame({
+    'group': ['A', 'B', 'A', 'C'],
+    'users': [700, 1100, 500, 800],
+    'conversions': [70, 143, 50, 96]
+})
+metric_config = {'trials_col_name': 'users', 'successes_col_name': 'conversions'}
+
+# Individual 0/1 observations equivalent to binary_agg (reference only)
+individual = pd.DataFrame({
+    'group': np.repeat(binary_agg['group'], binary_agg['users']).to_numpy(),
+    'outcome': np.concatenate([
+        np.r_[np.ones(s), np.zeros(n - s)] for n, s in zip(binary_agg['users'], binary_agg['conversions'])
+    ])
+})
+
+# Test 1: binary counts match individual observations
+print("=== Test 1: binary_agg counts match individual observations ===")
+try:
+    counts = aggregate_binary_counts(binary_agg, 'group', metric_config)
+    moments = compute_group_stats(individual, 'group', 'outcome')
+    assert np.allclose(counts.to_numpy(dtype=float), moments.to_numpy(dtype=float))
+    print("✅ PASSED: Binary counts equal sufficient statistics of expanded data")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 2: Welch t-test from counts equals scipy on raw data
+print("\n=== Test 2: Welch t-test from sufficient statistics ===")
+try:
+    counts = aggregate_binary_counts(binary_agg, 'group', metric_config)
+    result = welch_ttest(counts.loc['A'], counts.loc['B'])
+    a = individual[individual['group'] == 'A']['outcome']
+    b = individual[individual['group'] == 'B']['outcome']
+    expected = stats.ttest_ind(a, b, equal_var=False)
+    assert np.isclose(result['statistic'], expected.statistic)
+    assert np.isclose(result['pvalue'], expected.pvalue)
+    print("✅ PASSED: Welch t-test matches scipy.stats.ttest_ind")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 3: chi2 from counts equals contingency of raw data
+print("\n=== Test 3: Chi-square test from counts ===")
+try:
+    counts = aggregate_binary_counts(binary_agg, 'group', metric_config)
+    result = chi2_test(counts)
+    table = pd.crosstab(individual['group'], individual['outcome'])
+    expected = stats.chi2_contingency(table.to_numpy())
+    assert np.isclose(result['statistic'], expected[0])
+    assert np.isclose(result['pvalue'], expected[1])
+    print("✅ PASSED: Chi-square matches scipy.stats.chi2_contingency")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+discrete = pd.DataFrame({
+    'group': np.repeat(['A', 'B', 'C'], 500),
+    'clicks': np.concatenate([np.random.poisson(lam, 500) for lam in [2.0, 2.2, 2.1]])
+})
+
+# Test 4: ANOVA and CIs from moments equal raw-data implementations
+print("\n=== Test 4: ANOVA and confidence intervals from moments ===")
+try:
+    moments = compute_group_stats(discrete, 'group', 'clicks')
+    samples = [discrete[discrete['group'] == g]['clicks'] for g in ['A', 'B', 'C']]
+
+    result = anova_test(moments)
+    expected = stats.f_oneway(*samples)
+    assert np.isclose(result['statistic'], expected.statistic)
+    assert np.isclose(result['pvalue'], expected.pvalue)
+
+    expected_ci = stats.t.interval(0.99, len(samples[0]) - 1, loc=np.mean(samples[0]), scale=stats.sem(samples[0]))
+    assert np.allclose(t_ci(moments.loc['A']), expected_ci)
+
+    cm = sms.CompareMeans(sms.DescrStatsW(samples[0]), sms.DescrStatsW(samples[1]))
+    expected_ci = cm.tconfint_diff(alpha=0.01, usevar='unequal')
+    assert np.allclose(welch_ci(moments.loc['A'], moments.loc['B']), expected_ci)
+    print("✅ PASSED: ANOVA, t and Welch intervals match raw-data implementations")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 5: one-pass statistics keep precision on large means and min/max per group
+print("\n=== Test 5: One-pass group statistics engine ===")
+try:
+    rng = np.random.default_rng(7)
+    engine = pd.DataFrame({'group': rng.choice(['A', 'B', 'C', 'D'], size=20000)})
+    # Large means with a small spread: sum(x^2) - sum(x)^2 / n would lose all digits
+    engine['revenue'] = 1e9 + rng.normal(0, 2.0, size=len(engine))
+    one_pass = compute_group_stats(engine, 'group', 'revenue')
+    shifted = engine.assign(revenue=engine['revenue'] - 1e9).groupby('group')['revenue']
+    assert np.allclose(one_pass['m2'] / (one_pass['count'] - 1), shifted.var(ddof=1), rtol=1e-6)
+
+    # Per-group min/max with more than two groups
+    reference = engine.groupby('group')['revenue'].agg(['min', 'max'])
+    assert list(one_pass.index) == ['A', 'B', 'C', 'D']
+    assert np.array_equal(one_pass[['min', 'max']].to_numpy(), reference.to_numpy())
+    print("✅ PASSED: variance at mean 1e9 and min/max of 4 groups match pandas")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 6: vectorized pairwise tests equal per-pair scipy tests
+print("\n=== Test 6: Pairwise Welch tests for all pairs at once ===")
+try:
+    moments = compute_group_stats(discrete, 'group', 'clicks')
+    pairwise = pairwise_tests_with_correction(moments, welch_ttest, 'bonferroni')
+    assert list(zip(pairwise['group1'], pairwise['group2'])) == [('A', 'B'), ('A', 'C'), ('B', 'C')]
+    for _, row in pairwise.iterrows():
+        a = discrete[discrete['group'] == row['group1']]['clicks']
+        b = discrete[discrete['group'] == row['group2']]['clicks']
+        expected = stats.ttest_ind(a, b, equal_var=False)
+        assert np.isclose(row['statistic'], expected.statistic)
+        assert np.isclose(row['corrected_pvalue'], min(expected.pvalue * 3, 1.0))
+    print("✅ PASSED: Vectorized pairwise tests match scipy.stats.ttest_ind per pair")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 7: prebuilt AnalysisPlan gives the same result as keyword arguments
+print("\n=== Test 7: Reusing a prebuilt analysis plan ===")
+try:
+    from dgab.utils.routing import get_route
+
+    plan = dgab.build_plan('discrete', 'group', 'clicks', significance_level=0.05, confidence_level=0.95)
+    assert plan == dgab.build_plan('discrete', 'group', 'clicks', significance_level=0.05, confidence_level=0.95)
+    for n_groups in [2, 3, 5]:
+        assert plan.route(n_groups) is get_route('discrete', n_groups, 'mean', 'independent')
+
+    # One plan reused across calls with 3 and 2 groups
+    two_groups = discrete[discrete['group'] != 'C']
+    for frame in [discrete, two_groups, discrete]:
+        planned = dgab.analyze(frame, plan=plan, show=False)
+        keyword = dgab.analyze(frame, 'discrete', 'group', 'clicks', significance_level=0.05,
+                               confidence_level=0.95, show=False)
+        assert planned.route is keyword.route
+        assert planned.html == keyword.html
+
+    # Neither plan nor data_type/group_col: nothing to analyze
+    for kwargs in [{}, {'group_col': 'group', 'metric_col': 'clicks'}, {'data_type': 'discrete'}]:
+        try:
+            dgab.analyze(discrete, show=False, **kwargs)
+            raise AssertionError(f"analyze() accepted {kwargs}")
+        except ValueError as error:
+            assert 'build_plan' in str(error)
+    print("✅ PASSED: one plan reused for 3 and 2 groups gives the keyword-call report, missing data_type raises")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 8: headless analyze() computes result parts lazily and prints nothing
+print("\n=== Test 8: Headless analyze() with lazy result ===")
+try:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False)
+    assert output.getvalue() == ""
+    assert 'figure' not in result.__dict__ and 'html' not in result.__dict__
+    assert len(result.pairwise) == 3
+    assert result.omnibus['test_name'] == 'anova'
+    assert 'figure' not in result.__dict__
+    print("✅ PASSED: Nothing rendered, tests computed on access")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 9: analyze_many() equals per-metric analyze()
+print("\n=== Test 9: Multi-metric analysis in one pass ===")
+try:
+    many = discrete.assign(launches=np.random.poisson(1.0, len(discrete)))
+    combined = dgab.analyze_many(many, 'group', metrics=['clicks', 'launches'])
+    assert len(combined) == 6
+    for metric in ['clicks', 'launches']:
+        single = dgab.analyze(many, 'discrete', 'group', metric, show=False).comprehensive
+        part = combined[combined['metric'] == metric]
+        assert np.allclose(part['pvalue'], single['pvalue'])
+    assert np.allclose(combined['cross_metric_pvalue'], np.minimum(combined['pvalue'] * 6, 1.0))
+    print("✅ PASSED: Combined table matches single-metric analyses")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 10: chunked input gives the same statistics and tests as in-memory data
+print("\n=== Test 10: Streaming chunks with merged statistics ===")
+try:
+    in_memory = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False)
+    chunks = (discrete.iloc[start:start + 317] for start in range(0, len(discrete), 317))
+    streamed = dgab.analyze(chunks, 'discrete', 'group', 'clicks', show=False)
+    assert np.allclose(streamed.sufficient_stats.to_numpy(), in_memory.sufficient_stats.to_numpy())
+    assert np.allclose(streamed.pairwise['pvalue'], in_memory.pairwise['pvalue'])
+    assert streamed.html == in_memory.html
+    print("✅ PASSED: Streamed analysis matches in-memory analysis")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 11: Chan merge of chunk statistics equals one pass
+print("\n=== Test 11: merge_group_stats equals a single pass ===")
+try:
+    from dgab.utils.group_stats import merge_group_stats
+
+    rng = np.random.default_rng(7)
+    engine = pd.DataFrame({'group': rng.choice(['A', 'B', 'C', 'D'], size=20000)})
+    engine['revenue'] = 1e9 + rng.normal(0, 2.0, size=len(engine))
+    # Group D is missing from the first chunk
+    chunks = [engine.iloc[:6000], engine.iloc[6000:13000], engine.iloc[13000:]]
+    chunks[0] = chunks[0][chunks[0]['group'] != 'D']
+    merged = None
+    for chunk in chunks:
+        merged = merge_group_stats(merged, compute_group_stats(chunk, 'group', 'revenue'))
+    full = compute_group_stats(pd.concat(chunks), 'group', 'revenue')
+    assert np.array_equal(merged['count'].to_numpy(), full['count'].to_numpy())
+    assert np.allclose(merged['sum'], full['sum'], rtol=1e-12)
+    assert np.allclose(merged['m2'], full['m2'], rtol=1e-6)
+    assert np.array_equal(merged[['min', 'max']].to_numpy(), full[['min', 'max']].to_numpy())
+    print("✅ PASSED: three merged chunks (one without a group) match one pass")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 12: accumulators merged from partitions and snapshots equal one pass
+print("\n=== Test 12: Mergeable accumulators and snapshots ===")
+try:
+    in_memory = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False)
+    for accumulator_cls in [dgab.MomentsAccumulator, dgab.FrequencyAccumulator]:
+        partitions = [discrete.iloc[start::3] for start in range(3)]
+        snapshots = [accumulator_cls('group', 'clicks').update(part).to_bytes() for part in partitions]
+        merged = dgab.GroupStatsAccumulator.from_bytes(snapshots[0])
+        for snapshot in snapshots[1:]:
+            merged.merge(dgab.GroupStatsAccumulator.from_bytes(snapshot))
+        result = dgab.analyze(merged, show=False)
+        assert np.allclose(result.sufficient_stats.to_numpy(), in_memory.sufficient_stats.to_numpy())
+        assert result.html == in_memory.html
+    print("✅ PASSED: Merged snapshots reproduce in-memory analysis")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 13: incremental runs over daily partitions equal one run on all rows
+print("\n=== Test 13: Incremental analysis from persisted state ===")
+try:
+    daily = discrete.assign(day=np.arange(len(discrete)) % 5)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_path = os.path.join(tmp_dir, 'state.json')
+        for day in range(5):
+            # Day 2 is passed as cumulative data: already processed rows are skipped
+            part = daily[daily['day'] <= day] if day == 2 else daily[daily['day'] == day]
+            result = dgab.analyze_incremental(part, 'exp', 'day', 'discrete', 'group', 'clicks',
+                                              state_path=state_path, show=False)
+    in_memory = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False)
+    assert np.allclose(result.sufficient_stats.to_numpy(), in_memory.sufficient_stats.to_numpy())
+    assert result.html == in_memory.html
+    print("✅ PASSED: Incremental state reproduces full analysis")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 14: incremental state with a datetime.date watermark column
+print("\n=== Test 14: Incremental analysis with date watermarks ===")
+try:
+    import datetime
+    import json
+
+    start = datetime.date(2024, 5, 1)
+    dated = discrete.assign(day=[start + datetime.timedelta(days=int(day)) for day in np.arange(len(discrete)) % 4])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_path = os.path.join(tmp_dir, 'state.json')
+        for day in range(4):
+            # Day 2 is passed as cumulative data: the restored Timestamp is compared with dates
+            current = start + datetime.timedelta(days=day)
+            part = dated[dated['day'] <= current] if day == 2 else dated[dated['day'] == current]
+            result = dgab.analyze_incremental(part, 'exp', 'day', 'discrete', 'group', 'clicks',
+                                              state_path=state_path, show=False)
+        with open(state_path) as f:
+            assert json.load(f)['exp']['watermark'] == {'timestamp': '2024-05-04T00:00:00'}
+    in_memory = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False)
+    assert np.allclose(result.sufficient_stats.to_numpy(), in_memory.sufficient_stats.to_numpy())
+    print("✅ PASSED: date watermarks restored as Timestamp skip processed days")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 15: sequential (mSPRT) route keeps false positive rate under daily peeking
+print("\n=== Test 15: Sequential testing under continuous monitoring ===")
+try:
+    from dgab.utils.group_stats import merge_group_stats, group_pairs
+    from dgab.utils.stat_tests import msprt_test
+    from dgab.utils.confints import msprt_diff_ci
+
+    rng = np.random.default_rng(7)
+    alpha = 0.05
+    false_positives = 0
+    for experiment in range(100):
+        running_stats = None
+        rejected = False
+        for look in range(20):
+            batch = pd.DataFrame({'group': rng.choice(['A', 'B'], 500), 'clicks': rng.poisson(3, 500)})
+            running_stats = merge_group_stats(running_stats, compute_group_stats(batch, 'group', 'clicks'))
+            _, _, group1_stats, group2_stats = group_pairs(running_stats)
+            test_result = msprt_test(group1_stats, group2_stats, alpha)
+            ci_lower, ci_upper = msprt_diff_ci(group1_stats, group2_stats, confidence_level=1 - alpha)
+            # Test and confidence sequence are inversions of each other
+            assert bool(test_result['significant'][0]) == bool(ci_lower[0] > 0 or ci_upper[0] < 0)
+            rejected |= bool(test_result['significant'][0])
+        false_positives += rejected
+    assert false_positives / 100 <= alpha
+
+    result = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False, sequential=True)
+    assert result.route.config['test_name'] == 'msprt_test'
+    assert result.omnibus is None and len(result.pairwise) == 3
+    print(f"✅ PASSED: A/A false positive rate with 20 looks: {false_positives / 100:.2f}")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 16: bootstrap route for medians and quantiles
+print("\n=== Test 16: Bootstrap median/quantile route ===")
+try:
+    from dgab.utils.bootstrap import bootstrap_quantile, weighted_quantile
+
+    latency = pd.DataFrame({'group': np.repeat(['A', 'B'], 3000)})
+    latency['ms'] = np.random.default_rng(3).lognormal(np.where(latency['group'] == 'B', 0.1, 0.0), 1.0)
+    result = dgab.analyze(latency, 'discrete', 'group', 'ms', statistic='median', show=False)
+    for group, values in latency.groupby('group')['ms']:
+        row = result.group_stats.set_index('group').loc[group]
+        assert np.isclose(row['median'], np.median(values))
+        assert row['ci_99'][0] <= row['median'] <= row['ci_99'][1]
+
+    # Block-wise Poisson draws have the same distribution as per-observation weights
+    values, counts = np.unique(latency.loc[latency['group'] == 'A', 'ms'], return_counts=True)
+    replicates = bootstrap_quantile(values, counts, 0.9, n_resamples=4000, seed=1)
+    naive_weights = np.random.default_rng(2).poisson(counts, size=(4000, len(counts)))
+    naive = weighted_quantile(values, naive_weights, 0.9)
+    assert abs(replicates.mean() - naive.mean()) < 0.1 * naive.std()
+    assert abs(replicates.std() / naive.std() - 1) < 0.1
+    assert np.array_equal(replicates, bootstrap_quantile(values, counts, 0.9, n_resamples=4000, seed=1, n_jobs=2))
+    print("✅ PASSED: Bootstrap estimates match numpy, resampling is reproducible")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 17: bootstrap p-value with zero ties, shared replicates and process pool
+print("\n=== Test 17: Bootstrap calibration and shared resampling ===")
+try:
+    from dgab.utils.bootstrap import ResamplingSession
+    from dgab.utils.stat_tests import bootstrap_test
+    from dgab.utils.confints import bootstrap_diff_ci
+
+    # A/A on Poisson(50) medians: many replicates tie at zero
+    rng = np.random.default_rng(3)
+    pvalues, excluded = [], []
+    for run in range(100):
+        samples = [np.unique(rng.poisson(50, 200), return_counts=True) for _ in range(2)]
+        pair = [{'values': pd.Series([values]).to_numpy(), 'weights': pd.Series([weights]).to_numpy()}
+                for values, weights in samples]
+        session = ResamplingSession()
+        pvalues.append(bootstrap_test(*pair, 0.05, n_resamples=500, seed=run, session=session)['pvalue'][0])
+        lower, upper = bootstrap_diff_ci(*pair, confidence_level=0.95, n_resamples=500, seed=run, session=session)
+        excluded.append(lower[0] > 0 or upper[0] < 0)
+        assert len(session.replicates) == 2
+    pvalues = np.array(pvalues)
+    assert 0 < np.mean(pvalues < 0.05) <= 0.1, np.mean(pvalues < 0.05)
+    assert 0.35 < pvalues.mean() < 0.65, pvalues.mean()
+    # Interval excluding zero implies rejection; ties at zero only make the test reject more often
+    assert all(pvalues[np.array(excluded)] < 0.05)
+
+    # One resampling per group (not per pair side) and one process pool per analysis
+    quantile_df = pd.DataFrame({'group': np.repeat(['A', 'B', 'C'], 2000),
+                                'value': np.random.default_rng(5).poisson(20, 6000)})
+    result = dgab.analyze(quantile_df, 'discrete', 'group', 'value', statistic='median', show=False)
+    result.pairwise, result.differences
+    assert len(result.resampling.replicates) == 3
+    group1, group2 = [{col: result.sufficient_stats[col].to_numpy()[idx] for col in ['values', 'weights']}
+                      for idx in ([0, 0, 1], [1, 2, 2])]
+    lower, _ = bootstrap_diff_ci(group1, group2)
+    assert np.allclose(np.array(result.differences['ci_99'].tolist())[:, 0], np.around(lower, 4))
+    session = ResamplingSession()
+    parallel = bootstrap_test(group1, group2, n_resamples=1200, n_jobs=2, memory_budget_mb=1, session=session)
+    executor = session.executor
+    bootstrap_diff_ci(group1, group2, n_resamples=1200, n_jobs=2, memory_budget_mb=1, quantile=0.9, session=session)
+    assert executor is not None and session.executor is executor
+    session.close()
+    assert np.array_equal(parallel['pvalue'], bootstrap_test(group1, group2, n_resamples=1200, memory_budget_mb=1)['pvalue'])
+
+    # analyze_many works on sufficient statistics only
+    try:
+        dgab.analyze_many(quantile_df, 'group', ['value'], statistic='median')
+        raise AssertionError("analyze_many() accepted a quantile route")
+    except ValueError as error:
+        assert 'analyze()' in str(error)
+    print(f"✅ PASSED: A/A rejection rate {np.mean(pvalues < 0.05):.2f} at alpha 0.05, mean p-value {pvalues.mean():.2f}")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 18: frequency table (value, count) gives the same analysis as raw rows
+print("\n=== Test 18: Frequency-table representation ===")
+try:
+    from dgab.utils.group_stats import compute_frequency_table
+
+    table = compute_frequency_table(discrete, 'group', 'clicks')
+    assert table['count'].sum() == len(discrete)
+    raw = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False)
+    weighted = dgab.analyze(table, 'discrete', 'group', 'clicks', weight_col='count', show=False)
+    collapsed = dgab.analyze(discrete, 'discrete', 'group', 'clicks', frequency='auto', show=False)
+    assert collapsed.weight_col == 'count' and len(collapsed.dataframe) == len(table)
+    for result in [weighted, collapsed]:
+        assert np.allclose(result.sufficient_stats.to_numpy(), raw.sufficient_stats.to_numpy())
+        assert result.html == raw.html
+        assert np.allclose(result.pairwise['pvalue'], raw.pairwise['pvalue'])
+    print(f"✅ PASSED: {len(discrete)} rows -> {len(table)} table rows, identical results")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 19: frequency tables of narrow integer dtypes (int8/int16 offsets)
+print("\n=== Test 19: Frequency table of int8/int16 metrics ===")
+try:
+    from dgab.utils.group_stats import compute_frequency_table
+
+    rng = np.random.default_rng(12)
+    narrow = pd.DataFrame({'group': rng.choice(['A', 'B'], size=3000)})
+    narrow['score'] = rng.integers(-100, 101, size=len(narrow)).astype(np.int8)
+    as_float = narrow.astype({'score': float})
+    table = compute_frequency_table(narrow, 'group', 'score')
+    assert table['count'].sum() == len(narrow) and table['score'].min() >= -100
+    raw = dgab.analyze(as_float, 'discrete', 'group', 'score', show=False)
+    for frequency in [True, 'auto']:
+        collapsed = dgab.analyze(narrow, 'discrete', 'group', 'score', frequency=frequency, show=False)
+        assert collapsed.weight_col == 'count'
+        assert np.allclose(collapsed.sufficient_stats.to_numpy(), raw.sufficient_stats.to_numpy())
+        assert np.allclose(collapsed.pairwise['pvalue'], raw.pairwise['pvalue'])
+    print(f"✅ PASSED: int8 metric spanning -100..100 collapsed to {len(table)} table rows")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 20: metric named 'count' and fractional frequency weights
+print("\n=== Test 20: Frequency table column names and weight validation ===")
+try:
+    rng = np.random.default_rng(11)
+    counted = pd.DataFrame({'group': rng.choice(['A', 'B'], size=4000)})
+    counted['count'] = rng.poisson(3, size=len(counted))
+    raw = dgab.analyze(counted.astype({'count': float}), 'discrete', 'group', 'count', show=False)
+    collapsed = dgab.analyze(counted, 'discrete', 'group', 'count', frequency=True, show=False)
+    assert collapsed.weight_col not in ('group', 'count')
+    assert np.allclose(collapsed.sufficient_stats.to_numpy(), raw.sufficient_stats.to_numpy())
+    accumulator = dgab.FrequencyAccumulator('group', 'count')
+    accumulator.update(counted)
+    assert np.allclose(accumulator.group_stats.to_numpy(), raw.sufficient_stats.to_numpy())
+
+    # A row stands for weight_col identical observations: fractional weights are rejected
+    fractional = pd.DataFrame({'group': ['a', 'a', 'b', 'b'], 'x': [1, 3, 2, 2], 'w': [0.4, 0.4, 1.0, 2.0]})
+    try:
+        dgab.analyze(fractional, 'discrete', 'group', 'x', weight_col='w', show=False)
+        raise AssertionError("fractional weights accepted")
+    except ValueError as error:
+        assert 'целые' in str(error)
+    whole = fractional.assign(w=[1.0, 2.0, 1.0, 2.0])
+    assert dgab.analyze(whole, 'discrete', 'group', 'x', weight_col='w', show=False).sufficient_stats['count'].tolist() == [3, 3]
+    print("✅ PASSED: metric 'count' collapsed without overwriting, fractional weights raise")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 21: plot_discrete sends binned shares and box statistics, not raw rows
+print("\n=== Test 21: Precomputed histogram and box statistics ===")
+try:
+    from dgab.utils.visualizations import plot_discrete, MAX_HISTOGRAM_BINS
+
+    fig = plot_discrete(discrete, 'group', 'clicks')
+    bars = {trace.name: trace for trace in fig.data if trace.type == 'bar'}
+    shares = discrete[discrete['group'] == 'A']['clicks'].value_counts(normalize=True)
+    bar_a = bars['Группа A']
+    assert np.allclose([dict(zip(bar_a.x, bar_a.y)).get(value, 0) for value in shares.index], shares.values)
+    box_a = [trace for trace in fig.data if trace.type == 'box' and trace.name == 'Группа A'][0]
+    assert np.isclose(box_a.median[0], discrete[discrete['group'] == 'A']['clicks'].median())
+
+    heavy_tail = pd.DataFrame({'group': np.repeat(['A', 'B'], 200000)})
+    heavy_tail['revenue'] = (np.random.default_rng(5).pareto(1.1, len(heavy_tail)) * 100).astype(int)
+    fig = plot_discrete(heavy_tail, 'group', 'revenue')
+    assert all(len(trace.x) <= MAX_HISTOGRAM_BINS for trace in fig.data if trace.type == 'bar')
+    assert (heavy_tail['revenue'].max() - heavy_tail['revenue'].min()) / fig.layout.xaxis.dtick <= 20
+    assert len(fig.to_json()) < 50000
+    print("✅ PASSED: Figure size bounded, shares and quartiles match raw data")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 22: default figure of narrow integer dtypes
+print("\n=== Test 22: plot_discrete on int8/int16 metrics ===")
+try:
+    from dgab.utils.visualizations import plot_discrete
+
+    rng = np.random.default_rng(13)
+    for dtype, low in [(np.int8, -100), (np.int16, -300)]:
+        narrow = pd.DataFrame({'group': rng.choice(['A', 'B', 'C'], size=3000)})
+        narrow['delta'] = rng.integers(low, -low + 1, size=len(narrow)).astype(dtype)
+        result = dgab.analyze(narrow, 'discrete', 'group', 'delta', show=False)
+        box_a = [trace for trace in result.figure.data if trace.type == 'box' and trace.name == 'Группа A'][0]
+        assert np.isclose(box_a.median[0], narrow[narrow['group'] == 'A']['delta'].median())
+        bars = [trace for trace in plot_discrete(narrow, 'group', 'delta').data if trace.type == 'bar']
+        assert all(np.isclose(np.sum(trace.y), 1) for trace in bars)
+    print("✅ PASSED: int8 and int16 metrics plotted through the bincount path")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 23: headless analysis does not import plotting or notebook modules
+print("\n=== Test 23: Lazy imports ===")
+try:
+    from benchmarks.import_time import headless_modules, FORBIDDEN_HEADLESS_MODULES
+
+    loaded = headless_modules()
+    assert not [name for name in FORBIDDEN_HEADLESS_MODULES if name in loaded], loaded
+    print("✅ PASSED: analyze(show=False) runs without plotly and IPython")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 24: benchmark generators and per-stage measurements
+print("\n=== Test 24: Benchmark suite ===")
+try:
+    from benchmarks.generators import GENERATORS
+    from benchmarks.run import run_scenario
+    from benchmarks.compare import compare
+
+    for generator_type, generator in GENERATORS.items():
+        frame = generator(10000, 5, seed=1)
+        assert len(frame) == 10000 and frame['group'].nunique() == 5
+    scenario = run_scenario('discrete', 10000, 3, repeat=1, plot=False)
+    assert all(stage['seconds'] >= 0 and stage['peak_mb'] is not None for stage in scenario['stages'].values())
+    report = {'scenarios': [scenario]}
+    assert not any(row[-1] for row in compare(report, report))
+    print(f"✅ PASSED: {len(scenario['stages'])} stages measured, total {scenario['total_seconds']:.3f}s")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 25: per-stage profiling
+print("\n=== Test 25: Stage profiling ===")
+try:
+    import json as json_module
+
+    seen = []
+    profiler = dgab.StageProfiler(callback=lambda record: seen.append(record['stage']))
+    result = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False, profile=profiler)
+    assert result.profile is profiler and dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False).profile is None
+    result.html
+    stages = profiler.to_frame()
+    expected = {'build_plan', 'validation', 'transformation', 'confint_group_statistic', 'confint_difference',
+                'pairwise_tests', 'comprehensive_table', 'html_report'}
+    assert expected <= set(stages['stage']) and set(seen) == set(stages['stage'])
+    assert (stages['wall_s'] >= 0).all() and stages['peak_mb'].notna().all()
+    html_row = stages[stages['stage'] == 'html_report'].iloc[0]
+    assert html_row['wall_s'] >= stages[stages['stage'] == 'comprehensive_table']['wall_s'].iloc[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = profiler.save_chrome_trace(os.path.join(tmp, 'trace.json'))
+        with open(path) as f:
+            events = json_module.load(f)['traceEvents']
+    assert len(events) == len(stages) and all(event['ph'] == 'X' for event in events)
+    print(f"✅ PASSED: {len(stages)} stages recorded and exported as Chrome trace")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 26: fused validation and trusted input
+print("\n=== Test 26: Fused validation, trusted mode ===")
+try:
+    from dgab.utils.validations import validate_rows
+
+    codes, groups = validate_rows(discrete, 'discrete', 'group', 'clicks')
+    assert list(groups) == sorted(discrete['group'].unique()) and len(codes) == len(discrete)
+    broken = binary_agg.copy()
+    broken.loc[broken.index[0], 'conversions'] = broken.loc[broken.index[0], 'users'] + 1
+    try:
+        dgab.analyze(broken, 'binary_agg', 'group', metric_config=metric_config, show=False)
+        raise AssertionError("successes > trials not detected")
+    except ValueError as e:
+        assert 'не может превышать' in str(e)
+    dgab.analyze(broken, 'binary_agg', 'group', metric_config=metric_config, show=False, trusted=True)
+    trusted = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False, trusted=True)
+    checked = dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False)
+    assert trusted.html == checked.html
+    print("✅ PASSED: Row checks in one pass, trusted mode skips them")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 27: group order computed once, groups are views
+print("\n=== Test 27: Sort-once grouped views ===")
+try:
+    from dgab.utils.group_stats import GroupedData, compute_group_samples, compute_group_stats_many
+
+    frame = pd.DataFrame({'group': np.random.choice(list('ABCDEFGHIJ'), 20000),
+                          'value': np.random.exponential(10, 20000).round(1),
+                          'other': np.random.normal(0, 1, 20000)})
+    grouped = GroupedData(frame, 'group')
+    for idx, group in enumerate(grouped.groups):
+        view = grouped.group('value', idx)
+        assert np.shares_memory(view, grouped.column('value'))
+        assert np.array_equal(view, frame.loc[frame['group'] == group, 'value'].to_numpy())
+    samples = compute_group_samples(frame, 'group', 'value', grouped=grouped)
+    counts = frame[frame['group'] == 'C']['value'].value_counts().sort_index()
+    assert np.array_equal(samples.loc['C', 'values'], counts.index) and np.array_equal(samples.loc['C', 'weights'], counts.values)
+    many = compute_group_stats_many(frame, 'group', ['value', 'other'], grouped=grouped)
+    assert np.allclose(many['other']['min'], frame.groupby('group')['other'].min())
+    assert np.allclose(many['value']['max'], frame.groupby('group')['value'].max())
+    print("✅ PASSED: One stable sort by group, per-group slices are views")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 28: batch rendering and export with a stable schema
+print("\n=== Test 28: Batch reports and export ===")
+try:
+    import json as json_module
+    from dgab.utils.export import COMPARISON_COLUMNS, GROUP_COLUMNS, EXPORT_SCHEMA_VERSION
+
+    results = {
+        'clicks': dgab.analyze(discrete, 'discrete', 'group', 'clicks', show=False),
+        'conversion': dgab.analyze(binary_agg, 'binary_agg', 'group', metric_config=metric_config, show=False)
+    }
+    document = dgab.render_reports(results)
+    assert document.count('<style>') == 1 and all(result.report_body in document for result in results.values())
+    assert results['clicks'].html.endswith(results['clicks'].report_body)
+
+    comparisons = dgab.comparisons_frame(results)
+    assert list(comparisons.columns) == COMPARISON_COLUMNS
+    assert list(dgab.groups_frame(results).columns) == GROUP_COLUMNS
+    clicks = comparisons[comparisons['experiment'] == 'clicks']
+    assert np.allclose(clicks['difference'], clicks['group2_value'] - clicks['group1_value'])
+    assert ((clicks['difference_ci_lower'] <= clicks['difference'] + 1e-4)
+            & (clicks['difference'] <= clicks['difference_ci_upper'] + 1e-4)).all()
+    assert np.allclose(np.sort(clicks['pvalue']), np.sort(results['clicks'].pairwise['pvalue']))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ['json', 'csv']:
+            dgab.export_results(results, os.path.join(tmp, f'results.{fmt}'))
+        with open(os.path.join(tmp, 'results.json'), encoding='utf-8') as f:
+            document = json_module.load(f)
+        assert document['schema_version'] == EXPORT_SCHEMA_VERSION and len(document['experiments']) == 2
+        assert len(pd.read_csv(os.path.join(tmp, 'results.csv'))) == len(comparisons)
+    print(f"✅ PASSED: {len(results)} reports in one document, {len(comparisons)} comparison rows exported")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 29: portfolio of experiments in one vectorized call
+print("\n=== Test 29: Portfolio analysis ===")
+try:
+    from dgab.utils.export import COMPARISON_COLUMNS
+
+    rng = np.random.default_rng(21)
+    portfolio_parts = []
+    for idx, n_groups in enumerate([2, 3, 4, 2]):
+        portfolio_parts.append(pd.DataFrame({
+            'experiment': f'exp_{idx}',
+            'group': rng.choice([f'g{i}' for i in range(n_groups)], size=300),
+            'clicks': rng.poisson(5, size=300)
+        }))
+    portfolio = pd.concat(portfolio_parts, ignore_index=True)
+
+    table = dgab.analyze_portfolio(portfolio, 'experiment', 'group', 'clicks')
+    assert list(table.columns) == COMPARISON_COLUMNS, "Portfolio table should use the export schema"
+    assert len(table) == 1 + 3 + 6 + 1, f"Expected 11 pairs, got {len(table)}"
+
+    # Same numbers as analyze() per experiment
+    expected = dgab.comparisons_frame({
+        name: dgab.analyze(frame, data_type='discrete', group_col='group', metric_col='clicks', show=False)
+        for name, frame in portfolio.groupby('experiment')
+    })
+    for column in ['pvalue', 'corrected_pvalue', 'difference_ci_lower', 'group1_ci_upper', 'omnibus_pvalue']:
+        assert np.allclose(table[column].astype(float), expected[column].astype(float), equal_nan=True), \
+            f"Column {column} differs from analyze()"
+
+    try:
+        dgab.analyze_portfolio(portfolio[portfolio['group'] != 'g1'], 'experiment', 'group', 'clicks')
+        raise AssertionError("Experiments with one group should be rejected")
+    except ValueError as e:
+        assert 'exp_0' in str(e) and 'exp_3' in str(e)
+
+    print(f"✅ PASSED: {table['experiment'].nunique()} experiments, {len(table)} comparisons in one call")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 30: segment slices analyzed in the same pass
+print("\n=== Test 30: Segment-sliced analysis ===")
+try:
+    rng = np.random.default_rng(22)
+    sliced = pd.DataFrame({
+        'country': rng.choice(['DE', 'FR', 'US'], size=6000),
+        'platform': rng.choice(['android', 'ios'], size=6000),
+        'group': rng.choice(['A', 'B', 'C'], size=6000),
+        'clicks': rng.poisson(4, size=6000)
+    })
+
+    table = dgab.analyze_portfolio(sliced, None, 'group', 'clicks', segments=['country', 'platform'])
+    assert list(table.columns[:3]) == ['experiment', 'country', 'platform'], "Segment columns follow 'experiment'"
+    assert len(table) == 3 * 2 * 3, f"Expected 18 pairs, got {len(table)}"
+
+    # One slice equals analyze() on the filtered frame
+    subset = sliced[(sliced['country'] == 'FR') & (sliced['platform'] == 'ios')]
+    expected = dgab.analyze(subset, data_type='discrete', group_col='group', metric_col='clicks', show=False).to_frame()
+    actual = table[(table['country'] == 'FR') & (table['platform'] == 'ios')]
+    for column in ['pvalue', 'corrected_pvalue', 'omnibus_pvalue', 'difference_ci_upper', 'group2_ci_lower']:
+        assert np.allclose(actual[column].astype(float), expected[column].astype(float)), \
+            f"Column {column} differs from analyze() on the slice"
+
+    print(f"✅ PASSED: {len(table) // 3} slices in one call, slice matches filtered analyze()")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 31: Holm, Hochberg, BH, BY with family labels, selectable in routes
+print("\n=== Test 31: Multiple comparison corrections ===")
+try:
+    from statsmodels.stats.multitest import multipletests
+    from dgab.utils.corrections import adjust_pvalues
+    from dgab.utils.routing import compile_route, load_methods_route
+
+    rng = np.random.default_rng(23)
+    p_values = np.concatenate([rng.uniform(size=300) ** 4, rng.uniform(size=300)])
+    families = rng.choice(['metric_a', 'metric_b', 'metric_c'], size=len(p_values))
+    statsmodels_names = {'bonferroni': 'bonferroni', 'holm': 'holm', 'hochberg': 'simes-hochberg',
+                         'benjamini_hochberg': 'fdr_bh', 'benjamini_yekutieli': 'fdr_by'}
+    for method, statsmodels_name in statsmodels_names.items():
+        assert np.allclose(adjust_pvalues(p_values, method), multipletests(p_values, method=statsmodels_name)[1])
+        by_family = adjust_pvalues(p_values, method, families=families)
+        for family in np.unique(families):
+            mask = families == family
+            assert np.allclose(by_family[mask], multipletests(p_values[mask], method=statsmodels_name)[1]), \
+                f"{method}: family {family} differs from statsmodels"
+
+    # A route with "multiple_comparison_correction": "holm" resolves and is applied to pairwise tests
+    config = dict(load_methods_route()['discrete']['multiple']['mean']['independent'])
+    config['multiple_comparison_correction'] = 'holm'
+    route = compile_route('discrete', 'multiple', 'mean', 'independent', config)
+    multi = pd.DataFrame({'group': rng.choice(['A', 'B', 'C', 'D'], size=2000), 'clicks': rng.poisson(5, size=2000)})
+    plan = dgab.build_plan('discrete', 'group', 'clicks')
+    pairwise = dgab.AnalysisResult(plan, route, compute_group_stats(multi, 'group', 'clicks')).pairwise
+    assert np.allclose(pairwise['corrected_pvalue'], multipletests(pairwise['pvalue'], method='holm')[1])
+
+    print("✅ PASSED: 5 methods match statsmodels per family, Holm selectable in a route")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 32: CUPED from per-group cross-moments, in memory, chunked and merged
+print("\n=== Test 32: CUPED variance reduction ===")
+try:
+    rng = np.random.default_rng(24)
+    pre_period = rng.poisson(5, size=20000).astype(float)
+    cuped_groups = rng.choice(['A', 'B', 'C'], size=20000)
+    cuped_df = pd.DataFrame({
+        'group': cuped_groups,
+        'clicks': 0.8 * pre_period + rng.poisson(2, size=20000) + 0.1 * (cuped_groups == 'B'),
+        'pre_clicks': pre_period
+    })
+    cuped_kwargs = dict(data_type='discrete', group_col='group', metric_col='clicks', show=False)
+
+    result = dgab.analyze(cuped_df, covariate_col='pre_clicks', **cuped_kwargs)
+    assert result.sufficient_stats.attrs['cuped_variance_reduction'] > 0.5, "Covariate should reduce variance"
+
+    # Same as Welch tests on the explicitly adjusted metric
+    theta = np.cov(cuped_df['pre_clicks'], cuped_df['clicks'])[0, 1] / cuped_df['pre_clicks'].var()
+    adjusted = cuped_df['clicks'] - theta * (cuped_df['pre_clicks'] - cuped_df['pre_clicks'].mean())
+    for _, row in result.pairwise.iterrows():
+        expected = stats.ttest_ind(adjusted[cuped_df['group'] == row['group1']],
+                                   adjusted[cuped_df['group'] == row['group2']], equal_var=False).pvalue
+        assert np.isclose(row['pvalue'], expected, rtol=1e-6), "CUPED p-value differs from adjusted-metric Welch"
+
+    # Chunks and merged partitions (through a snapshot) give the same result
+    chunked = dgab.analyze([cuped_df.iloc[i:i + 3000] for i in range(0, len(cuped_df), 3000)],
+                           covariate_col='pre_clicks', **cuped_kwargs)
+    left = dgab.MomentsAccumulator('group', 'clicks', covariate_col='pre_clicks').update(cuped_df.iloc[:7000])
+    right = dgab.MomentsAccumulator('group', 'clicks', covariate_col='pre_clicks').update(cuped_df.iloc[7000:])
+    merged = dgab.analyze(left.merge(dgab.GroupStatsAccumulator.from_bytes(right.to_bytes())), show=False)
+    for other in (chunked, merged):
+        assert np.allclose(other.pairwise['pvalue'], result.pairwise['pvalue'], rtol=1e-9)
+
+    print(f"✅ PASSED: variance reduced by {result.sufficient_stats.attrs['cuped_variance_reduction']:.0%}, "
+          f"chunked and merged match")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 33: continuous data type, quantiles from mergeable sketches
+print("\n=== Test 33: continuous quantile sketches ===")
+try:
+    rng = np.random.default_rng(25)
+    revenue = rng.lognormal(3, 1, size=200000)
+    sketch_quantiles = np.array([0.01, 0.5, 0.95, 0.99])
+
+    # Rank error of the sketch is within the documented centroid width, also after merges
+    sketch = dgab.QuantileSketch.from_values(revenue)
+    merged_sketch = dgab.QuantileSketch.from_values(revenue[:1])
+    for part in np.array_split(revenue[1:], 17):
+        merged_sketch = merged_sketch.merge(dgab.QuantileSketch.from_values(part))
+    width = 2 * np.pi * np.sqrt(sketch_quantiles * (1 - sketch_quantiles)) / sketch.compression
+    sorted_revenue = np.sort(revenue)
+    for estimate in (sketch.quantile(sketch_quantiles), merged_sketch.quantile(sketch_quantiles)):
+        rank = np.searchsorted(sorted_revenue, estimate) / len(revenue)
+        assert np.all(np.abs(rank - sketch_quantiles) <= width), "Sketch rank error above centroid width"
+    assert len(sketch.means) <= sketch.compression / 2 + 1, "Sketch is not bounded by compression"
+    small = rng.normal(size=200)
+    assert np.allclose(dgab.QuantileSketch.from_values(small).quantile(sketch_quantiles),
+                       np.quantile(small, sketch_quantiles)), "Small samples should be exact"
+
+    continuous_df = pd.DataFrame({'group': rng.choice(['A', 'B'], size=len(revenue)), 'revenue': revenue})
+    continuous_df.loc[continuous_df['group'] == 'B', 'revenue'] *= 1.1
+    continuous_kwargs = dict(data_type='continuous', group_col='group', metric_col='revenue', show=False)
+    for statistic in ('mean', 'median', 'p95'):
+        result = dgab.analyze(continuous_df, statistic=statistic, **continuous_kwargs)
+        assert result.pairwise['significant'].all(), f"10% shift of {statistic} not detected"
+        assert result.figure is not None, "Continuous figure not built"
+    expected_p95 = continuous_df.groupby('group')['revenue'].quantile(0.95).to_numpy()
+    assert np.allclose(result.group_stats['p95'], expected_p95, rtol=1e-3), "p95 differs from np.quantile"
+
+    # Partitions merged through a snapshot: same statistics, figure from sketches without rows
+    left = dgab.SketchAccumulator('group', 'revenue').update(continuous_df.iloc[:80000])
+    right = dgab.SketchAccumulator('group', 'revenue').update(continuous_df.iloc[80000:])
+    merged = dgab.analyze(left.merge(dgab.GroupStatsAccumulator.from_bytes(right.to_bytes())),
+                          statistic='p95', show=False)
+    assert np.allclose(merged.group_stats['p95'], expected_p95, rtol=1e-3), "Merged p95 differs"
+    assert merged.figure is not None, "Figure should be drawn from merged sketches"
+
+    print(f"✅ PASSED: rank error within centroid width, p95 = {np.round(expected_p95, 2)}, merged matches")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+# Test 34: power and sample-size planner on the analyze() routes
+print("\n=== Test 34: sample-size planner ===")
+try:
+    import time
+    from statsmodels.stats.power import TTestIndPower
+    from dgab.utils.corrections import bonferroni_correction
+
+    grid = dgab.sample_size_grid(baseline=10, std=4, mde=[0.02, 0.05], n_groups=[2, 3, 5],
+                                 significance_level=[0.01, 0.05], power=[0.8, 0.9])
+    assert len(grid) == 24, "Grid should be the Cartesian product of the axes"
+    # Family size of the multi-group route is the one bonferroni_correction applies
+    for groups in (3, 5):
+        rows = grid[grid['n_groups'] == groups]
+        family = bonferroni_correction(np.array([1e-6]), groups)[0] / 1e-6
+        assert np.allclose(rows['comparison_alpha'], rows['significance_level'] / family)
+    for _, row in grid.iterrows():
+        expected = TTestIndPower().solve_power(effect_size=row['effect'] / row['std'],
+                                               alpha=row['comparison_alpha'], power=row['power'])
+        assert abs(row['sample_size'] - np.ceil(expected)) <= 1, "Sample size differs from statsmodels"
+
+    # Thousands of scenarios at once; MDE grid is the inverse
+    started = time.perf_counter()
+    proportions = dgab.sample_size_grid(baseline=np.linspace(0.02, 0.5, 25), mde=np.linspace(0.02, 0.2, 20),
+                                        n_groups=[2, 3, 4, 10], significance_level=[0.01, 0.05],
+                                        power=[0.8, 0.9], data_type='binary_agg')
+    elapsed = time.perf_counter() - started
+    assert len(proportions) == 8000 and elapsed < 1, f"8000 scenarios took {elapsed:.2f}s"
+    planned = proportions[(proportions['baseline'] == 0.02) & (proportions['n_groups'] == 2)
+                          & (proportions['significance_level'] == 0.01) & (proportions['power'] == 0.8)]
+    detectable = dgab.mde_grid(sample_size=planned['sample_size'], baseline=0.02, data_type='binary_agg')
+    assert np.allclose(detectable['mde'], planned['effect'], rtol=0.01), "MDE grid is not the inverse"
+
+    # ETA: groups A (1000 rows) and B (800 rows) after 4 days, 2000 per group needed
+    eta = dgab.sample_size_eta({'A': 1000, 'B': 800}, 4, 2000)
+    assert np.isclose(eta, 4 * (2000 - 800) / 800), "ETA should follow the slowest group"
+
+    print(f"✅ PASSED: matches statsmodels, 8000 scenarios in {elapsed * 1000:.0f} ms, ETA {eta:.1f} days")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
+
+print("\n=== All tests completed ===")